@@ -0,0 +1,154 @@
+"""
+Loop latency of a telemetry-like worker which logs every iteration, writing its log file
+itself or through AsyncLogWriter, with the disk idle or busy with another writer. To run:
+```
+python -m benchmarks.benchmark_async_log
+```
+"""
+
+import logging
+import multiprocessing as mp
+import os
+import pathlib
+import tempfile
+import time
+
+from benchmarks import benchmark_utils
+from modules.common.modules.logger import logger
+from utilities.workers import async_log
+
+
+LOOP_PERIOD = 0.01  # seconds, 100 Hz telemetry
+ITERATIONS = 500
+DISK_LOAD_BLOCK_SIZE = 4 * 1024 * 1024  # bytes
+DISK_LOAD_FILE_SIZE = 1024 * 1024 * 1024  # bytes
+STOP_TIMEOUT = 5.0  # seconds
+LOG_DIRECTORY = pathlib.Path("logs")
+
+
+def create_file_logger(name: str, path: pathlib.Path) -> logger.Logger:
+    """
+    Logger which writes only to the file, like a worker logger.
+    """
+    _, file_logger = logger.Logger.create(name, False)
+    assert file_logger is not None
+
+    # Only the file is measured
+    file_logger.logger.propagate = False
+    for handler in list(file_logger.logger.handlers):
+        file_logger.logger.removeHandler(handler)
+
+    file_handler = logging.FileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(asctime)s: [%(levelname)s] %(message)s"))
+    file_logger.logger.addHandler(file_handler)
+    return file_logger
+
+
+def telemetry_loop(
+    worker_logger: logger.Logger,
+    log_writer: async_log.AsyncLogWriter | None,
+    latencies: "mp.Queue",
+) -> None:
+    """
+    Logs a telemetry sized message every period, measuring the work of each iteration.
+    """
+    if log_writer is not None:
+        log_writer.redirect(worker_logger)
+
+    iteration_latencies = []
+    for index in range(ITERATIONS):
+        start = time.perf_counter()
+        worker_logger.info(
+            f"Sent telemetry data: time_since_boot: {index}, x: 1.0, y: 2.0, z: 3.0, "
+            f"x_velocity: 0.1, y_velocity: 0.2, z_velocity: 0.3, roll: 0.01, pitch: 0.02, "
+            f"yaw: 0.03, roll_speed: 0.0, pitch_speed: 0.0, yaw_speed: 0.0",
+            True,
+        )
+        iteration_latencies.append(time.perf_counter() - start)
+        time.sleep(LOOP_PERIOD)
+
+    latencies.put(iteration_latencies)
+
+
+def disk_load(directory: pathlib.Path) -> None:
+    """
+    Keeps the disk busy rewriting a file, so that dirty pages reach the limit at which
+    the kernel makes every writer wait for writeback.
+    """
+    block = os.urandom(DISK_LOAD_BLOCK_SIZE)
+    path = directory / "disk_load.bin"
+    while True:
+        with open(path, "wb") as load_file:
+            for _ in range(DISK_LOAD_FILE_SIZE // DISK_LOAD_BLOCK_SIZE):
+                load_file.write(block)
+
+
+def run_trial(directory: pathlib.Path, main_logger: logger.Logger, is_async: bool) -> "list[float]":
+    """
+    Runs the loop in a worker process.
+
+    Returns the latency of each iteration in seconds.
+    """
+    mode = "async" if is_async else "sync"
+    worker_logger = create_file_logger(f"benchmark_async_log_{mode}", directory / f"{mode}.log")
+
+    log_writer = None
+    if is_async:
+        _, log_writer = async_log.AsyncLogWriter.create(main_logger)
+        assert log_writer is not None
+        log_writer.start()
+
+    latencies = mp.Queue()
+    worker = mp.Process(target=telemetry_loop, args=(worker_logger, log_writer, latencies))
+    worker.start()
+    iteration_latencies = latencies.get()
+    worker.join()
+
+    if log_writer is not None:
+        log_writer.stop(STOP_TIMEOUT)
+
+    return iteration_latencies
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    result, main_logger = logger.Logger.create("benchmark_async_log", False)
+    if not result:
+        print("ERROR: Failed to create logger")
+        return -1
+
+    assert main_logger is not None
+
+    print(f"{'disk':<6} {'logging':<8} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    # Logs are on disk, not a memory file system like /tmp may be
+    with tempfile.TemporaryDirectory(dir=LOG_DIRECTORY) as directory_name:
+        directory = pathlib.Path(directory_name)
+        for is_disk_busy in [False, True]:
+            load = None
+            if is_disk_busy:
+                load = mp.Process(target=disk_load, args=(directory,), daemon=True)
+                load.start()
+
+            for is_async in [False, True]:
+                latencies = run_trial(directory, main_logger, is_async)
+                print(
+                    f"{'busy' if is_disk_busy else 'idle':<6} "
+                    f"{'async' if is_async else 'sync':<8} "
+                    f"{benchmark_utils.percentile(latencies, 0.50) * 1e6:>9.1f} "
+                    f"{benchmark_utils.percentile(latencies, 0.99) * 1e6:>9.1f} "
+                    f"{max(latencies) * 1e6:>9.1f}"
+                )
+
+            if load is not None:
+                load.kill()
+                load.join()
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
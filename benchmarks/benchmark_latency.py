@@ -0,0 +1,172 @@
+"""
+Latency of telemetry from frame receipt to command send by stage, through the telemetry and
+command workers, with a simulated drone replaying a telemetry stream which keeps the drone below
+the target altitude, so that every telemetry causes a command. To run:
+```
+python -m benchmarks.benchmark_latency
+```
+Returns an error status if the end to end p99 is over END_TO_END_P99_BUDGET.
+"""
+
+import multiprocessing as mp
+import threading
+import time
+
+from pymavlink import mavutil
+
+from modules.command import command
+from modules.command import command_worker
+from modules.telemetry import telemetry_worker
+from utilities.workers import latency_trace
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+
+
+DRONE_CONNECTION_STRING = "tcpin:localhost:12347"
+CONNECTION_STRING = "tcp:localhost:12347"
+
+TELEMETRY_PERIODS = [0.2, 0.1]  # seconds
+TRIAL_DURATION = 10.0  # seconds
+QUEUE_SIZE = 10
+TARGET = command.Position(10, 20, 30)
+
+# p99 was under 10 ms on a single core host
+END_TO_END_P99_BUDGET = 0.020  # seconds
+
+
+def replay_drone(telemetry_period: float) -> None:
+    """
+    Accepts a connection, then replays ATTITUDE and LOCAL_POSITION_NED every period until
+    terminated, reading and discarding the commands.
+    """
+    connection = mavutil.mavlink_connection(
+        DRONE_CONNECTION_STRING, source_system=1, source_component=0
+    )
+    # Accepts on first receive
+    connection.recv_match(blocking=True)
+
+    index = 0
+    next_time = time.monotonic()
+    while True:
+        time_boot_ms = int(index * telemetry_period * 1000)
+        # Never at the target altitude, so every telemetry causes a command
+        connection.mav.attitude_send(time_boot_ms, 0.0, 0.0, 0.1 * (index % 10), 0.0, 0.0, 0.0)
+        connection.mav.local_position_ned_send(
+            time_boot_ms, 0.0, 0.0, float(index % 20), 0.0, 0.0, -1.0
+        )
+        while connection.recv_match(blocking=False) is not None:
+            pass
+
+        index += 1
+        next_time += telemetry_period
+        time.sleep(max(next_time - time.monotonic(), 0.0))
+
+
+def drain_reports(
+    report_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Reads command reports, as main does.
+    """
+    while not controller.is_exit_requested():
+        report_queue.get_many(QUEUE_SIZE, True, 0.1)
+
+
+def run_trial(telemetry_period: float) -> "dict[str, latency_trace.LatencySummary]":
+    """
+    Runs the telemetry and command workers against the replayed stream.
+
+    Returns the latency summary of each stage.
+    """
+    drone = mp.Process(target=replay_drone, args=(telemetry_period,), daemon=True)
+    drone.start()
+    # Listening socket must exist before connecting
+    time.sleep(0.5)
+
+    connection = mavutil.mavlink_connection(CONNECTION_STRING)
+    connection.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+
+    controller = worker_controller.WorkerController()
+    telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_backends.QueueBackend.PIPE
+    )
+    report_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_backends.QueueBackend.PIPE
+    )
+    telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+    latency_statistics = latency_trace.LatencyStatistics()
+
+    workers = [
+        mp.Process(
+            target=command_worker.command_worker,
+            args=(
+                connection,
+                TARGET,
+                telemetry_selector,
+                None,
+                latency_statistics,
+                telemetry_queue,
+                report_queue,
+                controller,
+            ),
+        ),
+        mp.Process(
+            target=telemetry_worker.telemetry_worker,
+            args=(connection, None, telemetry_queue, controller),
+        ),
+    ]
+    reader = threading.Thread(target=drain_reports, args=(report_queue, controller))
+    reader.start()
+    for worker in workers:
+        worker.start()
+
+    time.sleep(TRIAL_DURATION)
+
+    # Telemetry worker exits within a read, the command worker selector wakes on exit
+    controller.request_exit()
+    for worker in workers:
+        worker.join()
+    reader.join()
+
+    drone.terminate()
+    drone.join()
+    connection.close()
+
+    return latency_statistics.get_summary()
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    end_to_end_p99 = 0.0
+    for telemetry_period in TELEMETRY_PERIODS:
+        print(f"Telemetry every {telemetry_period * 1e3:.0f}ms")
+        print(f"{'stage':<12} {'count':>6} {'mean ms':>9} {'p50 <= ms':>10} {'p99 <= ms':>10}")
+        for stage, summary in run_trial(telemetry_period).items():
+            print(
+                f"{stage:<12} {summary.count:>6} {summary.mean() * 1e3:>9.3f} "
+                f"{summary.percentile(0.50) * 1e3:>10.3f} {summary.percentile(0.99) * 1e3:>10.3f}"
+            )
+            if stage == "end to end":
+                end_to_end_p99 = max(end_to_end_p99, summary.percentile(0.99))
+
+    if end_to_end_p99 > END_TO_END_P99_BUDGET:
+        print(
+            f"Regression: end to end p99 {end_to_end_p99 * 1e3:.1f}ms "
+            f"is over {END_TO_END_P99_BUDGET * 1e3:.0f}ms"
+        )
+        return -1
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
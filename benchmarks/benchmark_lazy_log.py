@@ -0,0 +1,99 @@
+"""
+CPU time of logging each telemetry sample, formatting every message up front or only
+when emitted (utilities/workers/lazy_log.py), with the level enabled or filtered out. To run:
+```
+python -m benchmarks.benchmark_lazy_log
+```
+"""
+
+import logging
+import os
+import time
+
+from modules.common.modules.logger import logger
+from modules.telemetry import telemetry
+from utilities.workers import lazy_log
+
+
+ITERATIONS = 20000
+TELEMETRY_RATE = 100  # Hz
+
+
+def log_eager(local_logger: logger.Logger, telemetry_data: telemetry.TelemetryData) -> None:
+    """
+    Formats before the level is checked.
+    """
+    local_logger.info(f"Sent telemetry data: {telemetry_data}", True)
+
+
+def log_lazy(local_logger: logger.Logger, telemetry_data: telemetry.TelemetryData) -> None:
+    """
+    Formats only if emitted.
+    """
+    lazy_log.log_object(local_logger, logging.INFO, "Sent telemetry data", telemetry_data)
+
+
+def measure(
+    local_logger: logger.Logger,
+    log_function: "(logger.Logger, telemetry.TelemetryData) -> None",  # type: ignore
+) -> float:
+    """
+    Returns the CPU time of a call in seconds.
+    """
+    telemetry_data = telemetry.TelemetryData(
+        0, 1.0, 2.0, 3.0, 0.1, 0.2, 0.3, 0.01, 0.02, 0.03, 0.0, 0.0, 0.0, 1
+    )
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        log_function(local_logger, telemetry_data)
+
+    return (time.process_time() - start) / ITERATIONS
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    result, local_logger = logger.Logger.create("benchmark_lazy_log", False)
+    if not result:
+        print("ERROR: Failed to create logger")
+        return -1
+
+    assert local_logger is not None
+
+    # Only the formatting and a file write are measured
+    local_logger.logger.propagate = False
+    for handler in list(local_logger.logger.handlers):
+        local_logger.logger.removeHandler(handler)
+
+    with open(os.devnull, "w", encoding="utf-8") as null_file:
+        text_handler = logging.StreamHandler(null_file)
+        text_handler.setFormatter(logging.Formatter("%(asctime)s: [%(levelname)s] %(message)s"))
+        structured_handler = logging.StreamHandler(null_file)
+        structured_handler.setFormatter(lazy_log.StructuredFormatter())
+
+        print(f"{'level':<9} {'format':<11} {'eager us':>9} {'lazy us':>9} {'lazy CPU %':>11}")
+        for level, handler in [
+            (logging.INFO, text_handler),
+            (logging.INFO, structured_handler),
+            (logging.WARNING, text_handler),
+        ]:
+            local_logger.logger.setLevel(level)
+            local_logger.logger.addHandler(handler)
+            eager = measure(local_logger, log_eager)
+            lazy = measure(local_logger, log_lazy)
+            local_logger.logger.removeHandler(handler)
+
+            print(
+                f"{logging.getLevelName(level):<9} "
+                f"{'structured' if handler is structured_handler else 'text':<11} "
+                f"{eager * 1e6:>9.1f} {lazy * 1e6:>9.1f} {lazy * TELEMETRY_RATE * 100:>11.3f}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
@@ -0,0 +1,243 @@
+"""
+Sweeps the rate of synthetic MAVLink load from many simulated vehicles against the workers of
+bootcamp_main, and reports the lowest rate at which the ground station drops telemetry. To run:
+```
+python -m benchmarks.benchmark_load_sweep [--rates 20 50 ...] [--vehicles 4]
+    [--mix ATTITUDE=1,LOCAL_POSITION_NED=1,SYS_STATUS=0.5] [--duration 5] [--all]
+    [--output results.jsonl]
+```
+Writes one JSON object per rate and line, for comparing runs:
+* rate_per_s, vehicles, mix: Offered messages per second of all vehicles (plus their heartbeats),
+  and how they are split, see mavlink_load.create_streams().
+* sent_per_s, link_dropped: Frames the ground station took, and frames refused when it fell behind.
+* late_fraction, max_lag_ms, generator_cpu_percent: Pacing of the load generator. A generator near
+  100% CPU did not offer the full rate, so the rate is beyond what this host can test.
+* pairs, assembled, delivered, queue_dropped: Telemetry pairs sent, TelemetryData put in and got
+  from telemetry_queue, and dropped by its overflow policy.
+* delivered_fraction, is_dropping: Assembled of pairs, and whether any telemetry was lost.
+
+Telemetry lost at the lowest rate is not caused by load, e.g. the heartbeat receiver reading
+telemetry off the connection it shares with the telemetry worker. The sweep then reports no
+threshold and writes no records, as they would not be comparable.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import queue
+import time
+
+from benchmarks import benchmark_pipeline
+from benchmarks import mavlink_load
+
+
+DEFAULT_RATES = [10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 2000.0, 5000.0]
+DEFAULT_MIX = "ATTITUDE=1,LOCAL_POSITION_NED=1"
+DEFAULT_DURATION = 5.0  # seconds
+
+# Ground station keeps running after the load ends, to read what is still buffered
+DRAIN_PERIOD = 1.0  # seconds
+# Telemetry counts as dropped when fewer pairs than this are assembled
+DELIVERY_THRESHOLD = 0.95
+
+# Time for the load generator to listen before connecting
+GENERATOR_START_DELAY = 0.5  # seconds
+TIMEOUT = 10.0  # seconds
+
+
+def parse_mix(text: str) -> "dict[str, float]":
+    """
+    Parses `TYPE=weight,...`, see mavlink_load.MESSAGE_ENCODERS for the types.
+    """
+    mix = {}
+    for item in text.split(","):
+        message_type, _, weight = item.partition("=")
+        if message_type not in mavlink_load.MESSAGE_ENCODERS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown message type {message_type}, "
+                f"expected one of {', '.join(mavlink_load.MESSAGE_ENCODERS)}"
+            )
+
+        try:
+            mix[message_type] = float(weight)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(f"Invalid weight of {message_type}: {e}") from e
+
+        if mix[message_type] < 0.0:
+            raise argparse.ArgumentTypeError(f"Negative weight of {message_type}")
+
+    if sum(mix.values()) <= 0.0:
+        raise argparse.ArgumentTypeError("Mix has no weight")
+
+    return mix
+
+
+def run_ground_station(duration: float, result_queue: "mp.Queue") -> None:
+    """
+    Runs the workers of bootcamp_main against the load generator for the duration,
+    then reports the telemetry they assembled and delivered.
+    """
+    connection = benchmark_pipeline.connect()
+    graph, main_selector, _ = benchmark_pipeline.start_ground_station(
+        connection, benchmark_pipeline.create_logger("benchmark_load_sweep")
+    )
+
+    benchmark_pipeline.run_main_loop(graph, main_selector, duration)
+
+    summary = graph.get_queue_statistics()["telemetry_queue"]
+    queue_dropped = graph.get_drop_counts()["telemetry_queue"]
+    graph.stop()
+    connection.close()
+    result_queue.put(
+        {
+            "assembled": summary.put_count,
+            "delivered": summary.get_count,
+            "queue_dropped": queue_dropped,
+        }
+    )
+
+
+def run_rate(
+    rate: float, mix: "dict[str, float]", vehicle_count: int, duration: float
+) -> "dict[str, object] | None":
+    """
+    Runs the load generator and the ground station at a rate, each in a new process.
+
+    Returns the record, None if either did not finish.
+    """
+    generator_queue = mp.Queue()
+    generator = mp.Process(
+        target=mavlink_load.run_load,
+        args=(rate, mix, vehicle_count, duration, generator_queue),
+        daemon=True,
+    )
+    generator.start()
+    # Listening socket must exist before connecting
+    time.sleep(GENERATOR_START_DELAY)
+
+    ground_station_queue = mp.Queue()
+    ground_station = mp.Process(
+        target=run_ground_station, args=(duration + DRAIN_PERIOD, ground_station_queue)
+    )
+    ground_station.start()
+    try:
+        load_report = generator_queue.get(timeout=duration + TIMEOUT)
+        ground_station_report = ground_station_queue.get(timeout=DRAIN_PERIOD + TIMEOUT)
+    except queue.Empty:
+        load_report = None
+        ground_station_report = None
+
+    ground_station.join(TIMEOUT)
+    if ground_station.is_alive():
+        ground_station.kill()
+        ground_station.join()
+
+    generator.terminate()
+    generator.join()
+
+    if load_report is None or ground_station_report is None:
+        return None
+
+    pairs = load_report["pairs"]
+    assembled = ground_station_report["assembled"]
+    delivered_fraction = assembled / pairs if pairs > 0 else None
+    return {
+        "rate_per_s": rate,
+        "vehicles": vehicle_count,
+        "mix": mix,
+        "sent_per_s": sum(load_report["sent"].values()) / load_report["duration_s"],
+        "link_dropped": load_report["dropped"],
+        "late_fraction": load_report["late_fraction"],
+        "max_lag_ms": load_report["max_lag_ms"],
+        "generator_cpu_percent": load_report["cpu_percent"],
+        "pairs": pairs,
+        "assembled": assembled,
+        "delivered": ground_station_report["delivered"],
+        "queue_dropped": ground_station_report["queue_dropped"],
+        "delivered_fraction": delivered_fraction,
+        "is_dropping": (
+            load_report["dropped"] > 0
+            or ground_station_report["queue_dropped"] > 0
+            or (delivered_fraction is not None and delivered_fraction < DELIVERY_THRESHOLD)
+        ),
+    }
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    parser = argparse.ArgumentParser(description="Load generator rate sweep")
+    parser.add_argument(
+        "--rates",
+        nargs="+",
+        type=float,
+        default=DEFAULT_RATES,
+        help="Messages per second of all vehicles, in increasing order",
+    )
+    parser.add_argument("--vehicles", type=int, default=1, help="Simulated vehicles")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=DEFAULT_MIX, help="Relative rate of each message type"
+    )
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds per rate")
+    parser.add_argument(
+        "--all", action="store_true", help="Keep sweeping after the ground station drops"
+    )
+    parser.add_argument("--output", help="Appends the records to this file instead of printing")
+    args = parser.parse_args()
+
+    if args.vehicles < 1 or args.duration <= 0.0 or min(args.rates) <= 0.0:
+        print("ERROR: Vehicles, duration and rates must be greater than zero")
+        return -1
+
+    first_dropping_rate = None
+    records = []
+    for rate in args.rates:
+        record = run_rate(rate, args.mix, args.vehicles, args.duration)
+        if record is None:
+            print(f"ERROR: Rate {rate} did not finish")
+            return -1
+
+        record["time"] = time.time()
+        record["host"] = platform.node()
+        records.append(record)
+        print(
+            f"{rate:.0f}/s: sent {record['sent_per_s']:.0f}/s, "
+            f"pairs {record['pairs']}, assembled {record['assembled']}, "
+            f"link dropped {record['link_dropped']}, queue dropped {record['queue_dropped']}, "
+            f"generator CPU {record['generator_cpu_percent']:.0f}%"
+        )
+
+        if len(records) == 1 and record["is_dropping"]:
+            print(
+                f"ERROR: Ground station lost telemetry at the lowest rate {rate:.0f}/s, "
+                f"assembled {record['assembled']} of {record['pairs']} pairs, so its drops are "
+                "not caused by load. No threshold reported"
+            )
+            return -1
+
+        if record["is_dropping"] and first_dropping_rate is None:
+            first_dropping_rate = rate
+            if not args.all:
+                break
+
+    lines = [json.dumps(record) for record in records]
+    if args.output is None:
+        print("\n".join(lines))
+    else:
+        with open(args.output, "a", encoding="utf-8") as output_file:
+            output_file.write("\n".join(lines) + "\n")
+
+    if first_dropping_rate is None:
+        print(f"No drops up to {args.rates[-1]:.0f} messages/s")
+    else:
+        print(f"Ground station starts dropping at {first_dropping_rate:.0f} messages/s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
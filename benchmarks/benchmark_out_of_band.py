@@ -0,0 +1,184 @@
+"""
+Large payloads through QueueProxyWrapper, pickled into the queue or passed out-of-band
+through shared memory segments, see utilities/workers/out_of_band.py. To run:
+```
+python -m benchmarks.benchmark_out_of_band
+```
+
+Payloads below the threshold, like telemetry, are pickled once by out_of_band.pack() and queued
+in-band, which the smallest payload measures against the plain pipe.
+
+Copies are the payload sized buffers allocated while putting and getting an item (tracemalloc),
+plus the bytes written to the pipe per item, which the kernel copies in and out again.
+Segments are mapped memory, which tracemalloc does not count, so the out-of-band copy into
+a segment is not included.
+"""
+
+import ctypes
+import multiprocessing as mp
+import pickle
+import time
+import tracemalloc
+import typing
+
+from benchmarks import benchmark_utils
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+
+
+PAYLOAD_SIZES = [64, 1024, 64 * 1024, 1024 * 1024, 10 * 1024 * 1024]  # bytes
+TRIAL_BYTES = 256 * 1024 * 1024
+MIN_ITEMS = 20
+MAX_ITEMS = 10000
+COPY_ITEMS = 10
+QUEUE_MAX_SIZE = 8
+OUT_OF_BAND_THRESHOLD = 512  # bytes
+
+# Name, backend, out-of-band threshold
+# The ring pickled in-band would need slots of the largest payload
+TRANSPORTS = [
+    ("pipe", queue_backends.QueueBackend.PIPE, 0),
+    ("pipe out-of-band", queue_backends.QueueBackend.PIPE, OUT_OF_BAND_THRESHOLD),
+    ("ring out-of-band", queue_backends.QueueBackend.SHARED_MEMORY_RING, OUT_OF_BAND_THRESHOLD),
+]
+
+
+class Frame:
+    """
+    Raw frame chunk, which pickles its data as a buffer like a NumPy array.
+    """
+
+    def __init__(self, sent: float, data: "bytearray | memoryview") -> None:
+        """
+        sent: Time the frame was put, from time.perf_counter().
+        data: Payload.
+        """
+        self.sent = sent
+        self.data = data
+
+    def __reduce_ex__(self, protocol: "typing.SupportsIndex") -> "tuple":
+        """
+        Out-of-band capable from protocol 5.
+        """
+        if int(protocol) >= 5:
+            return Frame, (self.sent, pickle.PickleBuffer(self.data))
+
+        return Frame, (self.sent, bytearray(self.data))
+
+
+def producer(
+    item_count: int,
+    payload_size: int,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    put_copies: "ctypes.Array | None",
+) -> None:
+    """
+    Puts timestamped frames as fast as the queue allows.
+
+    put_copies: If given, each put is measured and the peak allocation and the bytes written
+        to the pipe, in payloads, are stored in it.
+    """
+    data = bytearray(payload_size)
+    for _ in range(item_count):
+        frame = Frame(time.perf_counter(), data)
+        if put_copies is None:
+            output_queue.put(frame)
+            continue
+
+        written_before = read_written_bytes()
+        tracemalloc.start()
+        output_queue.put(frame)
+        put_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        put_copies[0] = max(put_copies[0], put_peak / payload_size)
+        put_copies[1] = max(put_copies[1], (read_written_bytes() - written_before) / payload_size)
+
+
+def run_trial(
+    backend: queue_backends.QueueBackend,
+    threshold: int,
+    payload_size: int,
+    item_count: int,
+    put_copies: "ctypes.Array | None",
+) -> "tuple[float, list[float], float]":
+    """
+    Transfers frames from a producer process to this process.
+
+    put_copies: If given, copies are measured, see producer().
+
+    Returns the throughput in items per second, the latencies in seconds,
+    and the peak allocation of a get in payloads if measured.
+    """
+    input_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None,
+        QUEUE_MAX_SIZE,
+        backend,
+        out_of_band_threshold=threshold,
+    )
+    worker = mp.Process(target=producer, args=(item_count, payload_size, input_queue, put_copies))
+
+    latencies = []
+    get_peak = 0
+    worker.start()
+    start = time.perf_counter()
+    for _ in range(item_count):
+        if put_copies is None:
+            frame = input_queue.get()
+        else:
+            tracemalloc.start()
+            frame = input_queue.get()
+            get_peak = max(get_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        latencies.append(time.perf_counter() - frame.sent)  # type: ignore
+    elapsed = time.perf_counter() - start
+    worker.join()
+
+    return item_count / elapsed, latencies, get_peak / payload_size
+
+
+def read_written_bytes() -> int:
+    """
+    Bytes this process has passed to write system calls, from /proc (Linux only).
+    """
+    try:
+        with open("/proc/self/io", encoding="utf-8") as io_counters:
+            for line in io_counters:
+                name, _, value = line.partition(":")
+                if name == "wchar":
+                    return int(value)
+    except OSError:
+        pass
+
+    return 0
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    print(
+        f"{'transport':<18} {'payload B':>10} {'items/s':>9} {'MB/s':>8} {'p50 us':>9} "
+        f"{'p99 us':>9} {'put copies':>10} {'get copies':>10} {'pipe copies':>11}"
+    )
+    for name, backend, threshold in TRANSPORTS:
+        for payload_size in PAYLOAD_SIZES:
+            item_count = min(max(TRIAL_BYTES // payload_size, MIN_ITEMS), MAX_ITEMS)
+            throughput, latencies, _ = run_trial(backend, threshold, payload_size, item_count, None)
+            put_copies = mp.RawArray(ctypes.c_double, 2)
+            _, _, get_copies = run_trial(backend, threshold, payload_size, COPY_ITEMS, put_copies)
+            p50 = benchmark_utils.percentile(latencies, 0.50) * 1e6
+            p99 = benchmark_utils.percentile(latencies, 0.99) * 1e6
+            print(
+                f"{name:<18} {payload_size:>10} {throughput:>9.0f} "
+                f"{throughput * payload_size / 1e6:>8.0f} {p50:>9.0f} {p99:>9.0f} "
+                f"{put_copies[0]:>10.2f} {get_copies:>10.2f} {put_copies[1]:>11.2f}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
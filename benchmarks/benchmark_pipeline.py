@@ -0,0 +1,490 @@
+"""
+Throughput, CPU, memory and latency of each stage of the pipeline, and of the whole bootcamp_main
+topology, with synthetic MAVLink load from a simulated drone over a local socket. To run:
+```
+python -m benchmarks.benchmark_pipeline [--stages decode telemetry ...] [--output results.jsonl]
+```
+Writes one JSON object per stage and line, for comparing runs:
+* stage, unit: What was counted, e.g. telemetry for TelemetryData assembled.
+* count, duration_s, rate_per_s: Units processed, in seconds, and per second.
+* cpu_percent: CPU time of all processes of the stage over the duration, 100 is one core.
+* rss_bytes, pss_bytes: Resident and proportional set size of all processes at the end.
+* latency_p50_ms, latency_p90_ms, latency_p99_ms, latency_max_ms: Per unit, see each stage.
+
+The pipeline stage also writes offered_rate_per_s and delivered_fraction, telemetry assembled of
+pairs offered. Below DELIVERY_THRESHOLD the ground station lost telemetry regardless of load, e.g.
+to the heartbeat receiver reading off the connection it shares with the telemetry worker, so the
+record is printed as a warning instead of written, as it is no baseline for comparing runs.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import time
+
+from pymavlink import mavutil
+
+from benchmarks import benchmark_utils
+from benchmarks import mavlink_load
+from modules.common.modules.logger import logger
+from modules.common.modules.read_yaml import read_yaml
+from modules.command import command
+from modules.telemetry import telemetry
+from utilities.workers import latency_trace
+from utilities.workers import pipeline_graph
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+
+
+PIPELINE_CONFIG_FILE_PATH = "config.yaml"
+TELEMETRY_TYPES = ["ATTITUDE", "LOCAL_POSITION_NED"]
+TARGET = command.Position(10, 20, 30)
+
+DECODE_MESSAGE_COUNT = 20000
+TELEMETRY_COUNT = 5000
+QUEUE_ITEM_COUNT = 20000
+QUEUE_SIZE = 10
+COMMAND_COUNT = 20000
+# Half the most the telemetry worker reads, as it waits 0.1 seconds after each put
+PIPELINE_RATE = 5.0  # telemetry pairs per second
+PIPELINE_DURATION = 10.0  # seconds
+# Pipeline stage records which delivered less of the offered telemetry are not written
+DELIVERY_THRESHOLD = 0.95
+
+# Time for the simulated drone to listen before connecting
+DRONE_START_DELAY = 0.5  # seconds
+TIMEOUT = 5.0  # seconds
+
+
+def create_record(
+    stage: str,
+    unit: str,
+    count: int,
+    duration: float,
+    cpu_time: float,
+    memory: "list[tuple[int, int]]",
+    latencies: "list[float]",
+) -> "dict[str, object]":
+    """
+    Result of a stage, measured in a process of the stage.
+
+    count: Units processed.
+    duration: Seconds.
+    cpu_time: Seconds of CPU time of all processes of the stage.
+    memory: RSS and PSS of each process of the stage, see benchmark_utils.process_memory().
+    latencies: Seconds per unit, see the stage, empty if not measured.
+    """
+    if len(latencies) == 0:
+        latency_record: "dict[str, float | None]" = {
+            "latency_p50_ms": None,
+            "latency_p90_ms": None,
+            "latency_p99_ms": None,
+            "latency_max_ms": None,
+        }
+    else:
+        latency_record = {
+            "latency_p50_ms": benchmark_utils.percentile(latencies, 0.50) * 1e3,
+            "latency_p90_ms": benchmark_utils.percentile(latencies, 0.90) * 1e3,
+            "latency_p99_ms": benchmark_utils.percentile(latencies, 0.99) * 1e3,
+            "latency_max_ms": max(latencies) * 1e3,
+        }
+
+    return {
+        "stage": stage,
+        "unit": unit,
+        "count": count,
+        "duration_s": duration,
+        "rate_per_s": count / duration if duration > 0.0 else 0.0,
+        "cpu_percent": 100.0 * cpu_time / duration if duration > 0.0 else 0.0,
+        "rss_bytes": sum(rss for rss, _ in memory),
+        "pss_bytes": sum(pss for _, pss in memory),
+        **latency_record,
+    }
+
+
+def connect() -> mavutil.mavfile:
+    """
+    Connects to the simulated drone as the ground station.
+    """
+    connection = mavutil.mavlink_connection(mavlink_load.CONNECTION_STRING)
+    connection.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+    return connection
+
+
+def create_logger(name: str) -> logger.Logger:
+    """
+    Logger of the classes under test, as in a worker.
+    """
+    _, local_logger = logger.Logger.create(name, False)
+    assert local_logger is not None
+    return local_logger
+
+
+def benchmark_decode(result_queue: "mp.Queue") -> None:
+    """
+    Reads and decodes telemetry messages sent as fast as possible.
+    Latency is of each recv_match() which returned a telemetry message.
+    """
+    connection = connect()
+
+    latencies = []
+    start_cpu_time = time.process_time()
+    start_time = time.perf_counter()
+    while len(latencies) < DECODE_MESSAGE_COUNT:
+        call_time = time.perf_counter()
+        message = connection.recv_match(blocking=True, timeout=TIMEOUT)
+        if message is None:
+            break
+
+        if message.get_type() in TELEMETRY_TYPES:
+            latencies.append(time.perf_counter() - call_time)
+
+    duration = time.perf_counter() - start_time
+    result_queue.put(
+        create_record(
+            "decode",
+            "messages",
+            len(latencies),
+            duration,
+            time.process_time() - start_cpu_time,
+            [benchmark_utils.process_memory(os.getpid())],
+            latencies,
+        )
+    )
+
+
+def benchmark_telemetry(result_queue: "mp.Queue") -> None:
+    """
+    Assembles TelemetryData from pairs sent as fast as possible.
+    Latency is of each Telemetry.run().
+    """
+    connection = connect()
+    _, tele = telemetry.Telemetry.create(connection, create_logger("benchmark_pipeline_telemetry"))
+    assert tele is not None
+
+    latencies = []
+    start_cpu_time = time.process_time()
+    start_time = time.perf_counter()
+    for _ in range(TELEMETRY_COUNT):
+        call_time = time.perf_counter()
+        result, _ = tele.run()
+        if not result:
+            break
+
+        latencies.append(time.perf_counter() - call_time)
+
+    duration = time.perf_counter() - start_time
+    result_queue.put(
+        create_record(
+            "telemetry",
+            "telemetry",
+            len(latencies),
+            duration,
+            time.process_time() - start_cpu_time,
+            [benchmark_utils.process_memory(os.getpid())],
+            latencies,
+        )
+    )
+
+
+def put_telemetry(
+    telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    cpu_time: "mp.Value",
+    done_event: "mp.Event",  # type: ignore
+) -> None:
+    """
+    Producer of the queue stage, stamps every item when it is put.
+    Waits for the consumer to be done before exiting, so that its memory can be measured.
+    """
+    start_cpu_time = time.process_time()
+    for index in range(QUEUE_ITEM_COUNT):
+        now = time.monotonic()
+        trace = latency_trace.TraceContext(now, now)
+        trace.assembled = now
+        telemetry_queue.put(
+            telemetry.TelemetryData(time_since_boot=index, x=0.0, y=0.0, z=0.0, trace=trace)
+        )
+
+    cpu_time.value = time.process_time() - start_cpu_time
+    done_event.wait(TIMEOUT)
+
+
+def benchmark_queue(result_queue: "mp.Queue") -> None:
+    """
+    Passes TelemetryData between processes through a queue of the backend of telemetry_queue.
+    Latency is from put to get.
+    """
+    telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_backends.QueueBackend.SHARED_MEMORY_RING
+    )
+    producer_cpu_time = mp.Value("d", 0.0)
+    done_event = mp.Event()
+    producer = mp.Process(
+        target=put_telemetry, args=(telemetry_queue, producer_cpu_time, done_event)
+    )
+
+    latencies = []
+    start_cpu_time = time.process_time()
+    start_time = time.perf_counter()
+    producer.start()
+    while len(latencies) < QUEUE_ITEM_COUNT:
+        items = telemetry_queue.get_many(QUEUE_SIZE, True, TIMEOUT)
+        if len(items) == 0:
+            break
+
+        now = time.monotonic()
+        latencies.extend(now - item.trace.assembled for item in items)  # type: ignore
+
+    duration = time.perf_counter() - start_time
+    cpu_time = time.process_time() - start_cpu_time
+    memory = [benchmark_utils.process_memory(pid) for pid in [os.getpid(), producer.pid]]
+    done_event.set()
+    producer.join()
+    result_queue.put(
+        create_record(
+            "queue",
+            "items",
+            len(latencies),
+            duration,
+            cpu_time + producer_cpu_time.value,
+            memory,  # type: ignore
+            latencies,
+        )
+    )
+
+
+def benchmark_command(result_queue: "mp.Queue") -> None:
+    """
+    Decides on telemetry which always causes a command, sent to the simulated drone.
+    Latency is of each Command.run().
+    """
+    connection = connect()
+    _, cmd = command.Command.create(connection, TARGET, create_logger("benchmark_pipeline_command"))
+    assert cmd is not None
+
+    telemetry_data = [
+        telemetry.TelemetryData(
+            x=0.01 * index,
+            y=0.0,
+            z=mavlink_load.TELEMETRY_Z,
+            yaw=0.0,
+            x_velocity=1.0,
+            y_velocity=0.0,
+            z_velocity=0.0,
+            system_id=1,
+        )
+        for index in range(COMMAND_COUNT)
+    ]
+
+    latencies = []
+    start_cpu_time = time.process_time()
+    start_time = time.perf_counter()
+    for data in telemetry_data:
+        call_time = time.perf_counter()
+        cmd.run(data)
+        latencies.append(time.perf_counter() - call_time)
+
+    duration = time.perf_counter() - start_time
+    result_queue.put(
+        create_record(
+            "command",
+            "decisions",
+            len(latencies),
+            duration,
+            time.process_time() - start_cpu_time,
+            [benchmark_utils.process_memory(os.getpid())],
+            latencies,
+        )
+    )
+
+
+def start_ground_station(
+    connection: mavutil.mavfile, local_logger: logger.Logger
+) -> tuple[
+    pipeline_graph.PipelineGraph, queue_select.QueueSelector, latency_trace.LatencyStatistics
+]:
+    """
+    Starts the workers of bootcamp_main with its configuration on the connection.
+
+    Returns the graph, the selector of the queues main reads, see run_main_loop(),
+    and the latency statistics recorded by the command workers.
+    """
+    _, config = read_yaml.open_config(PIPELINE_CONFIG_FILE_PATH)
+    assert config is not None
+
+    controller = worker_controller.WorkerController()
+    _, graph = pipeline_graph.PipelineGraph.create(
+        config["pipeline"], controller, None, local_logger
+    )
+    assert graph is not None
+
+    telemetry_queue = graph.get_queue("telemetry_queue")
+    heartbeat_queue = graph.get_queue("heartbeat_queue")
+    report_queue = graph.get_queue("report_queue")
+    assert telemetry_queue is not None and heartbeat_queue is not None and report_queue is not None
+    telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+    main_selector = queue_select.QueueSelector([heartbeat_queue, report_queue])
+    latency_statistics = latency_trace.LatencyStatistics()
+
+    graph.create_stages(
+        {
+            "heartbeat_sender": (connection, None),
+            "heartbeat_receiver": (connection, None),
+            "telemetry": (connection, None),
+            "command": (connection, TARGET, telemetry_selector, None, latency_statistics),
+        }
+    )
+    graph.start()
+    return graph, main_selector, latency_statistics
+
+
+def run_main_loop(
+    graph: pipeline_graph.PipelineGraph, main_selector: queue_select.QueueSelector, duration: float
+) -> None:
+    """
+    Reads the output queues for the duration, as the main loop of bootcamp_main does.
+    """
+    heartbeat_queue = graph.get_queue("heartbeat_queue")
+    report_queue = graph.get_queue("report_queue")
+    assert heartbeat_queue is not None and report_queue is not None
+
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < duration:
+        main_selector.wait(duration - (time.perf_counter() - start_time))
+        heartbeat_queue.get_many(QUEUE_SIZE, False)
+        report_queue.get_many(QUEUE_SIZE, False)
+
+
+def benchmark_pipeline(result_queue: "mp.Queue") -> None:
+    """
+    Runs the workers of bootcamp_main with its configuration, reading the output queues
+    as its main loop does, against telemetry at PIPELINE_RATE.
+    Count and latency are of telemetry which reached the command worker, latency is end to end
+    from frame receipt to command send, to the resolution of the latency histogram.
+    """
+    connection = connect()
+    graph, main_selector, latency_statistics = start_ground_station(
+        connection, create_logger("benchmark_pipeline")
+    )
+
+    workers = mp.active_children()
+    start_cpu_times = [benchmark_utils.process_cpu_time(worker.pid) for worker in workers]
+    start_cpu_time = time.process_time()
+    start_time = time.perf_counter()
+    run_main_loop(graph, main_selector, PIPELINE_DURATION)
+
+    duration = time.perf_counter() - start_time
+    cpu_time = time.process_time() - start_cpu_time
+    for worker, worker_start_cpu_time in zip(workers, start_cpu_times):
+        cpu_time += benchmark_utils.process_cpu_time(worker.pid) - worker_start_cpu_time
+
+    summary = latency_statistics.get_summary()["end to end"]
+    memory = [
+        benchmark_utils.process_memory(pid)
+        for pid in [os.getpid()] + [worker.pid for worker in workers]  # type: ignore
+    ]
+    record = create_record("pipeline", "telemetry", summary.count, duration, cpu_time, memory, [])
+    if summary.count > 0:
+        record["latency_p50_ms"] = summary.percentile(0.50) * 1e3
+        record["latency_p90_ms"] = summary.percentile(0.90) * 1e3
+        record["latency_p99_ms"] = summary.percentile(0.99) * 1e3
+    record["offered_rate_per_s"] = PIPELINE_RATE
+    telemetry_summary = graph.get_queue_statistics(False)["telemetry_queue"]
+    record["delivered_fraction"] = telemetry_summary.put_count / (PIPELINE_RATE * duration)
+    graph.stop()
+    connection.close()
+    result_queue.put(record)
+
+
+# Benchmark and simulated drone arguments (rate, pair count) of each stage, None for no drone
+STAGES = {
+    "decode": (benchmark_decode, (0.0, DECODE_MESSAGE_COUNT // 2 + 1)),
+    "telemetry": (benchmark_telemetry, (0.0, TELEMETRY_COUNT + 1)),
+    "queue": (benchmark_queue, None),
+    "command": (benchmark_command, (0.0, 0)),
+    "pipeline": (benchmark_pipeline, (PIPELINE_RATE, None)),
+}
+
+
+def run_stage(stage: str) -> "dict[str, object] | None":
+    """
+    Runs the benchmark of a stage in a new process, with a new simulated drone.
+
+    Returns the record, None if the stage did not finish.
+    """
+    benchmark, drone_arguments = STAGES[stage]
+
+    drone = None
+    if drone_arguments is not None:
+        drone = mp.Process(target=mavlink_load.run_drone, args=drone_arguments, daemon=True)
+        drone.start()
+        # Listening socket must exist before connecting
+        time.sleep(DRONE_START_DELAY)
+
+    result_queue = mp.Queue()
+    runner = mp.Process(target=benchmark, args=(result_queue,))
+    runner.start()
+    try:
+        record = result_queue.get(timeout=PIPELINE_DURATION + 10 * TIMEOUT)
+    except queue.Empty:
+        record = None
+
+    runner.join(TIMEOUT)
+    if runner.is_alive():
+        runner.kill()
+        runner.join()
+
+    if drone is not None:
+        drone.terminate()
+        drone.join()
+
+    return record
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    parser = argparse.ArgumentParser(description="Pipeline stage benchmarks")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--output", help="Appends the records to this file instead of printing")
+    args = parser.parse_args()
+
+    records = []
+    for stage in args.stages:
+        record = run_stage(stage)
+        if record is None:
+            print(f"ERROR: Stage {stage} did not finish")
+            return -1
+
+        record["time"] = time.time()
+        record["host"] = platform.node()
+        if record.get("delivered_fraction", 1.0) < DELIVERY_THRESHOLD:  # type: ignore
+            print(
+                f"WARNING: Stage {stage} lost telemetry regardless of load, not written: {record}"
+            )
+            continue
+
+        records.append(record)
+
+    lines = [json.dumps(record) for record in records]
+    if args.output is None:
+        print("\n".join(lines))
+    else:
+        with open(args.output, "a", encoding="utf-8") as output_file:
+            output_file.write("\n".join(lines) + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
@@ -0,0 +1,97 @@
+"""
+Throughput and latency of each QueueProxyWrapper backend across payload sizes. To run:
+```
+python -m benchmarks.benchmark_queue_backends
+```
+"""
+
+import multiprocessing as mp
+import time
+
+from benchmarks import benchmark_utils
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+
+
+PAYLOAD_SIZES = [64, 1024, 16 * 1024]  # bytes
+THROUGHPUT_ITEMS = 5000
+LATENCY_ITEMS = 500
+LATENCY_PERIOD = 0.001  # seconds
+QUEUE_MAX_SIZE = 100
+
+
+def producer(
+    item_count: int,
+    payload_size: int,
+    period: float,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> None:
+    """
+    Puts timestamped payloads, waiting `period` seconds between puts.
+    """
+    payload = bytes(payload_size)
+    for _ in range(item_count):
+        output_queue.put((time.perf_counter(), payload))
+        if period > 0.0:
+            time.sleep(period)
+
+
+def run_trial(
+    backend: queue_backends.QueueBackend,
+    mp_manager: "mp.managers.SyncManager",
+    item_count: int,
+    payload_size: int,
+    period: float,
+) -> "tuple[float, list[float]]":
+    """
+    Transfers items from a producer process to this process.
+
+    Returns the throughput in items per second and the latencies in seconds.
+    """
+    input_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        mp_manager,
+        QUEUE_MAX_SIZE,
+        backend,
+        max_item_size=payload_size + 256,
+    )
+    worker = mp.Process(target=producer, args=(item_count, payload_size, period, input_queue))
+
+    latencies = []
+    worker.start()
+    start = time.perf_counter()
+    for _ in range(item_count):
+        sent, _ = input_queue.get()
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    worker.join()
+
+    return item_count / elapsed, latencies
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    mp_manager = mp.Manager()
+
+    print(f"{'backend':<20} {'payload B':>10} {'items/s':>10} {'p50 us':>10} {'p99 us':>10}")
+    for backend in queue_backends.QueueBackend:
+        for payload_size in PAYLOAD_SIZES:
+            throughput, _ = run_trial(backend, mp_manager, THROUGHPUT_ITEMS, payload_size, 0.0)
+            _, latencies = run_trial(
+                backend, mp_manager, LATENCY_ITEMS, payload_size, LATENCY_PERIOD
+            )
+            p50 = benchmark_utils.percentile(latencies, 0.50) * 1e6
+            p99 = benchmark_utils.percentile(latencies, 0.99) * 1e6
+            print(
+                f"{backend.value:<20} {payload_size:>10} {throughput:>10.0f} {p50:>10.1f} {p99:>10.1f}"
+            )
+
+    mp_manager.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
@@ -0,0 +1,78 @@
+"""
+Throughput of single versus batched transfers on the manager queue backend. To run:
+```
+python -m benchmarks.benchmark_queue_batching
+```
+"""
+
+import multiprocessing as mp
+import time
+
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+
+
+ITEM_COUNT = 5000
+BATCH_SIZES = [1, 10, 100]
+QUEUE_MAX_SIZE = 1000
+
+
+def producer(
+    batch_size: int,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> None:
+    """
+    Puts ITEM_COUNT items in batches of `batch_size`.
+    """
+    for start in range(0, ITEM_COUNT, batch_size):
+        if batch_size == 1:
+            output_queue.put(start)
+            continue
+
+        output_queue.put_many(list(range(start, min(start + batch_size, ITEM_COUNT))))
+
+
+def run_trial(mp_manager: "mp.managers.SyncManager", batch_size: int) -> float:
+    """
+    Transfers ITEM_COUNT items from a producer process to this process.
+
+    Returns the throughput in items per second.
+    """
+    input_queue = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE)
+    worker = mp.Process(target=producer, args=(batch_size, input_queue))
+
+    worker.start()
+    start = time.perf_counter()
+    received = 0
+    while received < ITEM_COUNT:
+        if batch_size == 1:
+            input_queue.get()
+            received += 1
+            continue
+
+        received += len(input_queue.get_many(batch_size))
+    elapsed = time.perf_counter() - start
+    worker.join()
+
+    return ITEM_COUNT / elapsed
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    mp_manager = queue_backends.create_manager()
+
+    print(f"{'batch size':>10} {'items/s':>10}")
+    for batch_size in BATCH_SIZES:
+        throughput = run_trial(mp_manager, batch_size)
+        print(f"{batch_size:>10} {throughput:>10.0f}")
+
+    mp_manager.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
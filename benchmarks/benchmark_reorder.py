@@ -0,0 +1,216 @@
+"""
+Throughput and order of a stateless stage run by parallel workers, with and without
+reordering in the consumer, and the delay added by waiting for gaps.
+To run:
+```
+python -m benchmarks.benchmark_reorder
+```
+"""
+
+import os
+import random
+import time
+
+from benchmarks import benchmark_utils
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import reorder_buffer
+from utilities.workers import worker_controller
+from utilities.workers import worker_manager
+
+
+ITEM_COUNT = 2000
+QUEUE_MAX_SIZE = 100
+BATCH_SIZE = 100
+CLOSE_POLL_PERIOD = 0.01  # seconds
+# Stands in for AddRandom, work varies per item so workers finish out of order
+MIN_WORK_TIME = 0.0002  # seconds
+MAX_WORK_TIME = 0.002  # seconds
+REORDER_WINDOW = 64
+GAP_TIMEOUT = 0.05  # seconds
+
+# Worker count, whether main reorders, fraction of items a worker has no output for,
+# fraction of items lost without a trace (e.g. dropped by an overflow policy)
+CONFIGURATIONS = {
+    "1 worker": (1, False, 0.0, 0.0),
+    "4 workers": (4, False, 0.0, 0.0),
+    "4 workers, reordered": (4, True, 0.0, 0.0),
+    "4 workers, reordered, 5% no output": (4, True, 0.05, 0.0),
+    "4 workers, reordered, 1% lost": (4, True, 0.0, 0.01),
+}
+
+
+def source_stage(
+    counter: reorder_buffer.SequenceCounter,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for countup_worker: tags each item at the source.
+    """
+    for value in range(ITEM_COUNT):
+        if controller.is_exit_requested():
+            return
+
+        controller.check_pause()
+        output_queue.put(counter.tag((value, time.perf_counter())))
+
+
+def stateless_stage(
+    no_output_fraction: float,
+    lost_fraction: float,
+    input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for add_random_worker: keeps the tag of each item on its result.
+    """
+    rng = random.Random(os.getpid())
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        for sequenced_item in input_queue.get_many(BATCH_SIZE):
+            # Woken to exit once drained, see WorkerManager.request_close()
+            if sequenced_item is None:
+                continue
+
+            time.sleep(rng.uniform(MIN_WORK_TIME, MAX_WORK_TIME))
+
+            draw = rng.random()
+            if draw < lost_fraction:
+                continue
+
+            if draw < lost_fraction + no_output_fraction:
+                output_queue.put(sequenced_item.with_item(None))  # type: ignore
+                continue
+
+            output_queue.put(sequenced_item)
+
+
+def run_configuration(
+    worker_count: int,
+    is_reordered: bool,
+    no_output_fraction: float,
+    lost_fraction: float,
+    local_logger: logger.Logger,
+) -> "tuple[float, int, list[float], int, int]":
+    """
+    Runs the items through the stage and reads the results in main.
+
+    Returns items per second, items out of order, delay in seconds from source to main
+    of each item, and the gaps skipped and late items discarded by the reorder buffer.
+    """
+    controller = worker_controller.WorkerController()
+    counter = reorder_buffer.SequenceCounter()
+    source_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+    )
+    result_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+    )
+
+    managers = []
+    for count, target, work_arguments, input_queues, output_queues in [
+        (
+            worker_count,
+            stateless_stage,
+            (no_output_fraction, lost_fraction),
+            [source_queue],
+            [result_queue],
+        ),
+        (1, source_stage, (counter,), [], [source_queue]),
+    ]:
+        _, properties = worker_manager.WorkerProperties.create(
+            count=count,
+            target=target,
+            work_arguments=work_arguments,
+            input_queues=input_queues,
+            output_queues=output_queues,
+            controller=controller,
+            local_logger=local_logger,
+        )
+        assert properties is not None
+        _, manager = worker_manager.WorkerManager.create(properties, local_logger)
+        assert manager is not None
+        managers.append(manager)
+
+    buffer = reorder_buffer.ReorderBuffer(REORDER_WINDOW, GAP_TIMEOUT)
+
+    start = time.perf_counter()
+    for manager in managers:
+        manager.start_workers()
+
+    stage_manager = managers[0]
+    source_manager = managers[1]
+
+    values = []
+    delays = []
+    while True:
+        sequenced_items = result_queue.get_many(BATCH_SIZE, True, CLOSE_POLL_PERIOD)
+        if is_reordered:
+            buffer.push_many(sequenced_items)  # type: ignore
+            items = buffer.release()
+        else:
+            items = [
+                sequenced_item.item  # type: ignore
+                for sequenced_item in sequenced_items
+                if sequenced_item is not None and sequenced_item.item is not None  # type: ignore
+            ]
+
+        now = time.perf_counter()
+        for value, source_time in items:  # type: ignore
+            values.append(value)
+            delays.append(now - source_time)
+
+        # Stage is closed once the source is done, see WorkerManager.request_close()
+        if not source_manager.join_workers(0.0):
+            continue
+
+        stage_manager.request_close()
+        if len(sequenced_items) == 0 and stage_manager.join_workers(0.0):
+            if not is_reordered or buffer.get_statistics()[0] == 0:
+                break
+
+            # Only gaps remain, wait them out
+            time.sleep(buffer.get_timeout() or 0.0)
+
+    elapsed = time.perf_counter() - start
+    out_of_order_count = sum(1 for earlier, later in zip(values, values[1:]) if later < earlier)
+    _, skipped_count, late_count = buffer.get_statistics()
+    return len(values) / elapsed, out_of_order_count, delays, skipped_count, late_count
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    _, local_logger = logger.Logger.create("benchmark_reorder", False)
+    assert local_logger is not None
+
+    print(
+        f"CPUs: {len(os.sched_getaffinity(0))}, items: {ITEM_COUNT}, "
+        f"window: {REORDER_WINDOW}, gap timeout: {GAP_TIMEOUT * 1e3:.0f}ms"
+    )
+    print(
+        f"{'configuration':<36} {'items/s':>8} {'out of order':>13} {'p50 ms':>8} "
+        f"{'p99 ms':>8} {'gaps':>5} {'late':>5}"
+    )
+    for name, configuration in CONFIGURATIONS.items():
+        rate, out_of_order_count, delays, skipped_count, late_count = run_configuration(
+            *configuration, local_logger
+        )
+        print(
+            f"{name:<36} {rate:>8.0f} {out_of_order_count:>13} "
+            f"{benchmark_utils.percentile(delays, 0.5) * 1e3:>8.2f} "
+            f"{benchmark_utils.percentile(delays, 0.99) * 1e3:>8.2f} "
+            f"{skipped_count:>5} {late_count:>5}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
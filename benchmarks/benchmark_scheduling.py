@@ -0,0 +1,207 @@
+"""
+Jitter of the telemetry to command control loop under background CPU load,
+with and without CPU pinning and priority.
+To run (Linux only):
+```
+python -m benchmarks.benchmark_scheduling
+```
+Lowering the nice value and SCHED_FIFO need root or CAP_SYS_NICE, otherwise a
+warning is logged and those configurations run like the unpinned one.
+"""
+
+import math
+import multiprocessing as mp
+import os
+import queue
+import time
+
+from benchmarks import benchmark_utils
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+from utilities.workers import worker_manager
+from utilities.workers import worker_scheduling
+
+
+DURATION = 3.0  # seconds
+LOOP_PERIOD = 0.01  # seconds
+QUEUE_MAX_SIZE = 10
+# Busy processes per CPU
+LOAD_PER_CPU = 2
+
+# CPU for the control loop, the load runs on the others when pinned (all if there is only one)
+ALL_CPUS = sorted(os.sched_getaffinity(0))
+LOOP_CPUS = {ALL_CPUS[0]}
+LOAD_CPUS = set(ALL_CPUS[1:]) or LOOP_CPUS
+
+# Background load, scheduling of the telemetry and command workers
+CONFIGURATIONS = {
+    "no load": (False, None, None, None),
+    "load": (True, None, None, None),
+    "load, pinned": (True, LOOP_CPUS, None, None),
+    "load, nice -10": (True, None, -10, None),
+    "load, pinned, SCHED_FIFO": (True, LOOP_CPUS, None, 10),
+}
+
+
+def telemetry_stage(
+    telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for telemetry_worker: sends the scheduled time of every period.
+    """
+    deadline = time.monotonic()
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        deadline += LOOP_PERIOD
+        controller.wait_for_exit(max(deadline - time.monotonic(), 0.0))
+        telemetry_queue.put(deadline)
+
+
+def command_stage(
+    telemetry_selector: queue_select.QueueSelector,
+    telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    report_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for command_worker: reports how late the decision for each telemetry is.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        telemetry_selector.wait()
+        for deadline in telemetry_queue.get_many(QUEUE_MAX_SIZE, False):
+            if deadline is None:
+                return
+
+            report_queue.put(time.monotonic() - deadline, False)
+
+
+def background_load(cpus: "set[int]") -> None:
+    """
+    Spins forever on the CPUs.
+    """
+    os.sched_setaffinity(0, cpus)
+    value = 0
+    while True:
+        value = (value + 1) % 1000003
+
+
+def run_configuration(
+    has_load: bool,
+    scheduling: "worker_scheduling.WorkerScheduling | None",
+    local_logger: logger.Logger,
+) -> "list[float]":
+    """
+    Runs the control loop for the duration.
+
+    Returns the lateness in seconds of every decision, from the scheduled telemetry time.
+    """
+    load_processes = []
+    if has_load:
+        # Pinned workers get their CPUs to themselves
+        load_cpus = LOAD_CPUS if scheduling is not None else set(ALL_CPUS)
+        for _ in range(LOAD_PER_CPU * len(ALL_CPUS)):
+            load_process = mp.Process(target=background_load, args=(load_cpus,), daemon=True)
+            load_process.start()
+            load_processes.append(load_process)
+
+    controller = worker_controller.WorkerController()
+    telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+    )
+    # Main reads after the run, so sized for all decisions
+    report_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 0, queue_backends.QueueBackend.SIMPLE_QUEUE
+    )
+    telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+
+    managers = []
+    for target, work_arguments, input_queues, output_queues in [
+        (command_stage, (telemetry_selector,), [telemetry_queue], [report_queue]),
+        (telemetry_stage, (), [], [telemetry_queue]),
+    ]:
+        _, properties = worker_manager.WorkerProperties.create(
+            count=1,
+            target=target,
+            work_arguments=work_arguments,
+            input_queues=input_queues,
+            output_queues=output_queues,
+            controller=controller,
+            local_logger=local_logger,
+            scheduling=scheduling,
+        )
+        assert properties is not None
+        _, manager = worker_manager.WorkerManager.create(properties, local_logger)
+        assert manager is not None
+        managers.append(manager)
+
+    for manager in managers:
+        manager.start_workers()
+
+    time.sleep(DURATION)
+
+    controller.request_exit()
+    for manager in reversed(managers):
+        manager.request_close()
+        manager.join_workers()
+
+    for load_process in load_processes:
+        load_process.kill()
+        load_process.join()
+
+    lateness = []
+    while True:
+        try:
+            lateness.append(report_queue.get(False))
+        except queue.Empty:
+            break
+
+    return lateness
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    _, local_logger = logger.Logger.create("benchmark_scheduling", False)
+    assert local_logger is not None
+
+    print(
+        f"CPUs: {ALL_CPUS}, loop period: {LOOP_PERIOD * 1e3:.0f}ms, "
+        f"load: {LOAD_PER_CPU} busy processes per CPU"
+    )
+    print(
+        f"{'configuration':<26} {'decisions':>10} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'max ms':>8} {'stdev ms':>9}"
+    )
+    for name, (has_load, cpu_affinity, nice, realtime_priority) in CONFIGURATIONS.items():
+        scheduling = None
+        if cpu_affinity is not None or nice is not None or realtime_priority is not None:
+            result, scheduling = worker_scheduling.WorkerScheduling.create(
+                cpu_affinity, nice, realtime_priority, local_logger
+            )
+            if not result:
+                print(f"{name:<26} invalid scheduling")
+                continue
+
+        lateness = run_configuration(has_load, scheduling, local_logger)
+        mean = sum(lateness) / max(len(lateness), 1)
+        stdev = math.sqrt(sum((value - mean) ** 2 for value in lateness) / max(len(lateness), 1))
+        print(
+            f"{name:<26} {len(lateness):>10} "
+            f"{benchmark_utils.percentile(lateness, 0.5) * 1e3:>8.2f} "
+            f"{benchmark_utils.percentile(lateness, 0.99) * 1e3:>8.2f} "
+            f"{max(lateness, default=math.nan) * 1e3:>8.2f} {stdev * 1e3:>9.2f}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
@@ -0,0 +1,169 @@
+"""
+Decisions per second against command worker count, with telemetry sharded by vehicle
+or with all workers reading one shared queue.
+To run:
+```
+python -m benchmarks.benchmark_sharding
+```
+"""
+
+import os
+import time
+
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import sharded_queue
+from utilities.workers import worker_controller
+from utilities.workers import worker_manager
+
+
+VEHICLE_COUNT = 16
+ITEMS_PER_VEHICLE = 500
+QUEUE_MAX_SIZE = 100
+BATCH_SIZE = 100
+CLOSE_POLL_PERIOD = 0.01  # seconds
+# Stands in for Command.run()
+DECISION_WORK = 2000
+
+# Command worker count, whether telemetry is sharded by vehicle
+CONFIGURATIONS = {
+    "shared, 1 worker": (1, False),
+    "shared, 4 workers": (4, False),
+    "sharded, 1 worker": (1, True),
+    "sharded, 2 workers": (2, True),
+    "sharded, 4 workers": (4, True),
+}
+
+
+class Telemetry:
+    """
+    Stands in for TelemetryData.
+    """
+
+    def __init__(self, system_id: int, sequence: int) -> None:
+        self.system_id = system_id
+        self.sequence = sequence
+
+
+def command_stage(
+    telemetry_queue: "queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue",
+    result_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for command_worker: makes a decision for every telemetry item and checks
+    that each vehicle's telemetry arrives in order.
+
+    Puts the decision count, out of order items and the vehicles seen on exit.
+    """
+    decision_count = 0
+    out_of_order_count = 0
+    last_sequences: "dict[int, int]" = {}
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        for telemetry in telemetry_queue.get_many(BATCH_SIZE):
+            # Woken to exit once drained, see WorkerManager.request_close()
+            if telemetry is None:
+                continue
+
+            value = 0
+            for step in range(DECISION_WORK):
+                value += step
+
+            # Anything but the next sample means the average is over a subset
+            if telemetry.sequence != last_sequences.get(telemetry.system_id, -1) + 1:  # type: ignore
+                out_of_order_count += 1
+            last_sequences[telemetry.system_id] = telemetry.sequence  # type: ignore
+            decision_count += 1
+
+    result_queue.put((decision_count, out_of_order_count, set(last_sequences)))
+
+
+def run_configuration(
+    worker_count: int, is_sharded: bool, local_logger: logger.Logger
+) -> "tuple[float, int, int]":
+    """
+    Sends every vehicle's telemetry through the command workers.
+
+    Returns decisions per second, items out of order or skipped within a vehicle,
+    and the number of vehicles seen by more than one worker.
+    """
+    controller = worker_controller.WorkerController()
+    shards = [
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.SHARED_MEMORY_RING
+        )
+        for _ in range(worker_count if is_sharded else 1)
+    ]
+    telemetry_queue: "queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue" = (
+        sharded_queue.ShardedQueue(shards, "system_id") if is_sharded else shards[0]
+    )
+    result_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, 0, queue_backends.QueueBackend.SIMPLE_QUEUE
+    )
+
+    _, properties = worker_manager.WorkerProperties.create(
+        count=worker_count,
+        target=command_stage,
+        work_arguments=(),
+        input_queues=[telemetry_queue],
+        output_queues=[result_queue],
+        controller=controller,
+        local_logger=local_logger,
+    )
+    assert properties is not None
+    _, manager = worker_manager.WorkerManager.create(properties, local_logger)
+    assert manager is not None
+    manager.start_workers()
+
+    start = time.perf_counter()
+    for sequence in range(ITEMS_PER_VEHICLE):
+        telemetry_queue.put_many(
+            [Telemetry(system_id, sequence) for system_id in range(VEHICLE_COUNT)]
+        )
+
+    # Workers exit once the telemetry is drained
+    manager.request_close()
+    while not manager.join_workers(CLOSE_POLL_PERIOD):
+        manager.request_close()
+
+    elapsed = time.perf_counter() - start
+    results = [result_queue.get() for _ in range(worker_count)]
+
+    decision_count = sum(result[0] for result in results)  # type: ignore
+    out_of_order_count = sum(result[1] for result in results)  # type: ignore
+    worker_vehicles = [result[2] for result in results]  # type: ignore
+    split_vehicle_count = sum(
+        1
+        for system_id in range(VEHICLE_COUNT)
+        if sum(system_id in vehicles for vehicles in worker_vehicles) > 1
+    )
+    return decision_count / elapsed, out_of_order_count, split_vehicle_count
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    _, local_logger = logger.Logger.create("benchmark_sharding", False)
+    assert local_logger is not None
+
+    print(
+        f"CPUs: {len(os.sched_getaffinity(0))}, vehicles: {VEHICLE_COUNT}, "
+        f"items: {VEHICLE_COUNT * ITEMS_PER_VEHICLE}"
+    )
+    print(f"{'configuration':<20} {'decisions/s':>12} {'out of order':>13} {'split vehicles':>15}")
+    for name, (worker_count, is_sharded) in CONFIGURATIONS.items():
+        rate, out_of_order_count, split_vehicle_count = run_configuration(
+            worker_count, is_sharded, local_logger
+        )
+        print(f"{name:<20} {rate:>12.0f} {out_of_order_count:>13} {split_vehicle_count:>15}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
@@ -0,0 +1,172 @@
+"""
+Startup time of the bootcamp_main pipeline against a simulated drone, with the heartbeat handshake
+done before starting workers (sequential) or while workers set up (overlapped). To run:
+```
+python -m benchmarks.benchmark_startup
+```
+"""
+
+import multiprocessing as mp
+import time
+
+from pymavlink import mavutil
+
+from modules.common.modules.logger import logger
+from modules.common.modules.read_yaml import read_yaml
+from modules.command import command
+from utilities.workers import pipeline_graph
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+
+
+DRONE_CONNECTION_STRING = "tcpin:localhost:12346"
+CONNECTION_STRING = "tcp:localhost:12346"
+PIPELINE_CONFIG_FILE_PATH = "config.yaml"
+
+# Simulated link and autopilot latency before the first heartbeat
+HANDSHAKE_DELAY = 0.5  # seconds
+HEARTBEAT_PERIOD = 1.0  # seconds
+TELEMETRY_PERIOD = 0.1  # seconds
+
+TIMEOUT = 10.0  # seconds
+TRIALS = 5
+TARGET = command.Position(10, 20, 30)
+
+
+def simulated_drone() -> None:
+    """
+    Accepts a connection, then sends heartbeats and telemetry until terminated.
+    """
+    connection = mavutil.mavlink_connection(
+        DRONE_CONNECTION_STRING, source_system=1, source_component=0
+    )
+    # Accepts on first receive, the ground station sends heartbeats once started
+    connection.recv_match(blocking=True)
+    time.sleep(HANDSHAKE_DELAY)
+
+    next_heartbeat = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= next_heartbeat:
+            connection.mav.heartbeat_send(
+                mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+            )
+            next_heartbeat += HEARTBEAT_PERIOD
+
+        time_boot_ms = int(now * 1000) % 2**32
+        connection.mav.attitude_send(time_boot_ms, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        connection.mav.local_position_ned_send(time_boot_ms, 0.0, 0.0, -10.0, 0.0, 0.0, 0.0)
+        time.sleep(TELEMETRY_PERIOD)
+
+
+def run_trial(is_overlapped: bool, result_queue: "mp.Queue") -> None:
+    """
+    Starts the pipeline as bootcamp_main does and stops it after the first telemetry.
+
+    is_overlapped: Whether workers are started before the heartbeat handshake.
+
+    Puts the seconds until heartbeat, ready, and first telemetry, NaN if not reached.
+    """
+    start = time.perf_counter()
+
+    _, local_logger = logger.Logger.create("benchmark_startup", False)
+    assert local_logger is not None
+    _, config = read_yaml.open_config(PIPELINE_CONFIG_FILE_PATH)
+    assert config is not None
+
+    # The simulated drone accepts before the ground station sends anything
+    connection = mavutil.mavlink_connection(CONNECTION_STRING)
+    # Sent by heartbeat_sender_worker once running, needed here when sequential
+    connection.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+
+    heartbeat_time = float("nan")
+    if not is_overlapped:
+        connection.wait_heartbeat(timeout=TIMEOUT)
+        heartbeat_time = time.perf_counter() - start
+
+    controller = worker_controller.WorkerController()
+    _, graph = pipeline_graph.PipelineGraph.create(
+        config["pipeline"], controller, None, local_logger
+    )
+    assert graph is not None
+
+    telemetry_queue = graph.get_queue("telemetry_queue")
+    assert telemetry_queue is not None
+    telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+    first_telemetry_event = mp.Event()
+    telemetry_queue.add_listener(first_telemetry_event)
+
+    graph.create_stages(
+        {
+            "heartbeat_sender": (connection, None),
+            "heartbeat_receiver": (connection, None),
+            "telemetry": (connection, None),
+            "command": (connection, TARGET, telemetry_selector, None, None),
+        }
+    )
+
+    controller.request_pause()
+    graph.start()
+
+    if is_overlapped:
+        connection.wait_heartbeat(timeout=TIMEOUT)
+        heartbeat_time = time.perf_counter() - start
+
+    ready_time = float("nan")
+    if graph.wait_until_ready(TIMEOUT):
+        ready_time = time.perf_counter() - start
+
+    controller.request_resume()
+
+    first_telemetry_time = float("nan")
+    if first_telemetry_event.wait(TIMEOUT):
+        first_telemetry_time = time.perf_counter() - start
+
+    graph.stop()
+    connection.close()
+
+    result_queue.put((heartbeat_time, ready_time, first_telemetry_time))
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    result_queue = mp.Queue()
+
+    print(f"{'startup':<12} {'heartbeat ms':>13} {'ready ms':>9} {'first telemetry ms':>19}")
+    for is_overlapped in [False, True]:
+        results = []
+        for _ in range(TRIALS):
+            drone = mp.Process(target=simulated_drone, daemon=True)
+            drone.start()
+            # Listening socket must exist before connecting
+            time.sleep(0.5)
+
+            runner = mp.Process(target=run_trial, args=(is_overlapped, result_queue))
+            runner.start()
+            results.append(result_queue.get())
+            runner.join()
+
+            drone.terminate()
+            drone.join()
+
+        # Mean over trials
+        heartbeat_time, ready_time, first_telemetry_time = (
+            sum(values) / len(values) for values in zip(*results)
+        )
+        name = "overlapped" if is_overlapped else "sequential"
+        print(
+            f"{name:<12} {heartbeat_time * 1e3:>13.1f} {ready_time * 1e3:>9.1f} "
+            f"{first_telemetry_time * 1e3:>19.1f}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
@@ -0,0 +1,97 @@
+"""
+Shared helpers for benchmarks.
+"""
+
+import math
+import os
+import pathlib
+
+
+def percentile(values: "list[float]", fraction: float) -> float:
+    """
+    Nearest rank percentile.
+
+    values: Samples, does not need to be sorted.
+    fraction: Between 0 and 1, e.g. 0.99 for p99.
+
+    Returns the percentile, or NaN if there are no samples.
+    """
+    if len(values) == 0:
+        return math.nan
+
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def process_memory(pid: int) -> "tuple[int, int]":
+    """
+    Resident and proportional set size of a process, from /proc (Linux only).
+    Proportional set size splits pages shared with forked processes between them,
+    so it can be summed over processes unlike resident set size.
+
+    pid: Process ID.
+
+    Returns RSS and PSS in bytes, zeros if unavailable.
+    """
+    rss = 0
+    pss = 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as smaps:
+            for line in smaps:
+                name, _, value = line.partition(":")
+                if name == "Rss":
+                    rss = int(value.split()[0]) * 1024
+                elif name == "Pss":
+                    pss = int(value.split()[0]) * 1024
+    except OSError:
+        return 0, 0
+
+    return rss, pss
+
+
+def process_cpu_time(pid: int) -> float:
+    """
+    User and system CPU time of a process, from /proc (Linux only).
+
+    pid: Process ID.
+
+    Returns seconds, 0 if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as stat:
+            # Command name may contain spaces, fields after it are space separated
+            fields = stat.read().rpartition(")")[2].split()
+    except OSError:
+        return 0.0
+
+    # utime and stime are fields 14 and 15, the first after the name is field 3
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def descendant_processes(pid: int) -> "list[int]":
+    """
+    Children of a process, their children and so on, from /proc (Linux only).
+
+    pid: Process ID.
+
+    Returns process IDs, each after its parent.
+    """
+    children: "dict[int, list[int]]" = {}
+    for stat_path in pathlib.Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # Parent ID is field 4, the second after the command name
+            parent_id = int(stat_path.read_text(encoding="utf-8").rpartition(")")[2].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+        children.setdefault(parent_id, []).append(int(stat_path.parent.name))
+
+    descendants = []
+    pending = [pid]
+    while len(pending) > 0:
+        for child in children.get(pending.pop(0), []):
+            descendants.append(child)
+            pending.append(child)
+
+    return descendants
@@ -0,0 +1,114 @@
+"""
+Microbenchmark of the per-iteration cost of WorkerController in a worker loop. To run:
+```
+python -m benchmarks.benchmark_worker_controller
+```
+"""
+
+import ctypes
+import multiprocessing as mp
+import time
+
+from utilities.workers import worker_controller
+
+
+ITERATIONS = 200_000
+EXIT_LATENCY_TRIALS = 20
+
+
+class LegacyWorkerController:
+    """
+    Previous queue and semaphore based implementation, kept for comparison.
+    """
+
+    __QUEUE_DELAY = 0.1  # seconds
+
+    def __init__(self) -> None:
+        self.__pause = mp.BoundedSemaphore(1)
+        self.__exit_queue = mp.Queue(1)
+
+    def check_pause(self) -> None:
+        """
+        Acquire and release of the pause semaphore.
+        """
+        self.__pause.acquire()
+        self.__pause.release()
+
+    def request_exit(self) -> None:
+        """
+        Sleeps and then puts into the exit queue.
+        """
+        time.sleep(self.__QUEUE_DELAY)
+        if self.__exit_queue.empty():
+            self.__exit_queue.put(None)
+
+    def is_exit_requested(self) -> bool:
+        """
+        Queue empty check.
+        """
+        return not self.__exit_queue.empty()
+
+
+def loop_overhead(
+    controller: "LegacyWorkerController | worker_controller.WorkerController",
+) -> float:
+    """
+    Runs an empty worker loop.
+
+    Returns the mean cost of one iteration in nanoseconds.
+    """
+    start = time.perf_counter_ns()
+    for _ in range(ITERATIONS):
+        if controller.is_exit_requested():
+            break
+        controller.check_pause()
+    return (time.perf_counter_ns() - start) / ITERATIONS
+
+
+def exit_latency(
+    controller: "LegacyWorkerController | worker_controller.WorkerController",
+) -> float:
+    """
+    Time taken by request_exit() to return.
+
+    Returns the mean latency in milliseconds.
+    """
+    total = 0.0
+    for _ in range(EXIT_LATENCY_TRIALS):
+        start = time.perf_counter()
+        controller.request_exit()
+        total += time.perf_counter() - start
+        # Reset for next trial
+        if isinstance(controller, worker_controller.WorkerController):
+            controller.clear_exit()
+        else:
+            controller = LegacyWorkerController()
+    return total / EXIT_LATENCY_TRIALS * 1000
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    controllers = {
+        "legacy": LegacyWorkerController(),
+        "current": worker_controller.WorkerController(),
+        # Bound to a worker slot, as started by WorkerManager
+        "bound": worker_controller.WorkerController().bind_worker(
+            mp.RawArray(ctypes.c_uint64, 1), 0
+        ),
+    }
+
+    print(f"{'controller':<10} {'loop ns/iter':>14} {'request_exit ms':>16}")
+    for name, controller in controllers.items():
+        overhead = loop_overhead(controller)
+        latency = exit_latency(controller)
+        print(f"{name:<10} {overhead:>14.1f} {latency:>16.3f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
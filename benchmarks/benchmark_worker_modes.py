@@ -0,0 +1,203 @@
+"""
+Startup time and memory of the bootcamp_main topology with workers as processes or threads.
+To run (Linux only, memory is read from /proc):
+```
+python -m benchmarks.benchmark_worker_modes
+```
+"""
+
+import multiprocessing as mp
+import os
+import time
+
+# Imported by every real worker, included for a representative memory footprint
+from pymavlink import mavutil  # pylint: disable=unused-import
+
+from benchmarks import benchmark_utils
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+from utilities.workers import worker_manager
+
+
+SETTLE_TIME = 1.0  # seconds
+QUEUE_MAX_SIZE = 10
+
+PROCESS = worker_manager.WorkerMode.PROCESS
+THREAD = worker_manager.WorkerMode.THREAD
+
+# Mode of heartbeat sender, heartbeat receiver, telemetry, and command
+CONFIGURATIONS = {
+    "all processes": (PROCESS, PROCESS, PROCESS, PROCESS),
+    "I/O stages in threads": (THREAD, THREAD, THREAD, PROCESS),
+    "all threads": (THREAD, THREAD, THREAD, THREAD),
+}
+
+
+def heartbeat_sender_stage(controller: worker_controller.WorkerController) -> None:
+    """
+    Stands in for heartbeat_sender_worker: sends every second.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        controller.wait_for_exit(1.0)
+
+
+def heartbeat_receiver_stage(
+    heartbeat_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for heartbeat_receiver_worker: reports status every second.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        heartbeat_queue.put("Connected")
+        controller.wait_for_exit(1.0)
+
+
+def telemetry_stage(
+    telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for telemetry_worker: produces telemetry at 10 Hz.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        telemetry_queue.put((time.time(), 0.0, 0.0, 0.0))
+        controller.wait_for_exit(0.1)
+
+
+def command_stage(
+    telemetry_selector: queue_select.QueueSelector,
+    telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    report_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Stands in for command_worker: reports a decision for every telemetry item.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        telemetry_selector.wait()
+        for telemetry in telemetry_queue.get_many(QUEUE_MAX_SIZE, False):
+            if telemetry is None:
+                return
+
+            report_queue.put(telemetry[0])
+
+
+def run_configuration(
+    modes: "tuple[worker_manager.WorkerMode, ...]", start_method: str, result_queue: "mp.Queue"
+) -> None:
+    """
+    Starts the topology, waits until every worker has looped once, and measures memory.
+    Run in a fresh interpreter so the baseline of main is the same for every configuration.
+
+    start_method: Start method for worker processes, as a spawned interpreter defaults to spawn.
+
+    Puts startup time in seconds, and RSS and PSS in bytes summed over all processes.
+    """
+    mp.set_start_method(start_method, force=True)
+
+    _, local_logger = logger.Logger.create("benchmark_worker_modes", False)
+    assert local_logger is not None
+
+    controller = worker_controller.WorkerController()
+    heartbeat_queue, telemetry_queue, report_queue = (
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        for _ in range(3)
+    )
+    telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+
+    stages = [
+        (heartbeat_sender_stage, (), [], []),
+        (heartbeat_receiver_stage, (), [], [heartbeat_queue]),
+        (telemetry_stage, (), [], [telemetry_queue]),
+        (command_stage, (telemetry_selector,), [telemetry_queue], [report_queue]),
+    ]
+
+    managers = []
+    for mode, (target, work_arguments, input_queues, output_queues) in zip(modes, stages):
+        _, properties = worker_manager.WorkerProperties.create(
+            count=1,
+            target=target,
+            work_arguments=work_arguments,
+            input_queues=input_queues,
+            output_queues=output_queues,
+            controller=controller,
+            local_logger=local_logger,
+            mode=mode,
+        )
+        assert properties is not None
+        _, manager = worker_manager.WorkerManager.create(properties, local_logger)
+        assert manager is not None
+        managers.append(manager)
+
+    # Downstream first, as PipelineGraph does
+    start = time.perf_counter()
+    for manager in reversed(managers):
+        manager.start_workers()
+
+    # Command loops once telemetry arrives, so this includes the first item through the pipeline
+    while not all(
+        progress > 0 for manager in managers for _, progress in manager.get_worker_status()
+    ):
+        time.sleep(0.001)
+    startup_time = time.perf_counter() - start
+
+    time.sleep(SETTLE_TIME)
+    total_rss = 0
+    total_pss = 0
+    for pid in [os.getpid()] + [child.pid for child in mp.active_children()]:
+        rss, pss = benchmark_utils.process_memory(pid)
+        total_rss += rss
+        total_pss += pss
+
+    controller.request_exit()
+    for output_queue in [heartbeat_queue, telemetry_queue, report_queue]:
+        output_queue.fill_and_drain_queue()
+    for manager in managers:
+        manager.join_workers()
+
+    result_queue.put((startup_time, total_rss, total_pss))
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    spawn_context = mp.get_context("spawn")
+    result_queue = spawn_context.Queue()
+
+    start_method = mp.get_start_method()
+    print(f"Worker process start method: {start_method}")
+    print(
+        f"{'configuration':<24} {'processes':>10} {'startup ms':>11} {'RSS MiB':>8} {'PSS MiB':>8}"
+    )
+    for name, modes in CONFIGURATIONS.items():
+        runner = spawn_context.Process(
+            target=run_configuration, args=(modes, start_method, result_queue)
+        )
+        runner.start()
+        startup_time, total_rss, total_pss = result_queue.get()
+        runner.join()
+
+        process_count = 1 + modes.count(PROCESS)
+        print(
+            f"{name:<24} {process_count:>10} {startup_time * 1e3:>11.1f} "
+            f"{total_rss / 2**20:>8.1f} {total_pss / 2**20:>8.1f}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
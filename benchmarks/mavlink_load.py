@@ -0,0 +1,301 @@
+"""
+Synthetic MAVLink load for benchmarks: a simulated drone which sends heartbeats and telemetry
+over a local socket at a set rate, or as fast as the socket takes it, and a load generator which
+simulates many vehicles sending a mix of messages at up to several kHz.
+"""
+
+import heapq
+import multiprocessing as mp
+import time
+
+from pymavlink import mavutil
+
+
+DRONE_CONNECTION_STRING = "tcpin:localhost:12348"
+CONNECTION_STRING = "tcp:localhost:12348"
+
+HEARTBEAT_PERIOD = 1.0  # seconds
+# Telemetry sent between reads of incoming commands when not paced
+UNPACED_DRAIN_EVERY = 256
+
+# Far from the target altitude of bootcamp_main, so that every telemetry causes a command
+TELEMETRY_Z = -10.0  # m
+
+# System ID of the first simulated vehicle of the load generator, the others follow
+FIRST_SYSTEM_ID = 1
+# Sends later than this after they were due count as late
+LATE_THRESHOLD = 0.001  # seconds
+
+
+def encode_heartbeat(
+    mav: mavutil.mavlink.MAVLink, _index: int, _time_boot_ms: int
+) -> mavutil.mavlink.MAVLink_message:
+    """
+    Heartbeat of a quadrotor.
+    """
+    return mav.heartbeat_encode(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+    )
+
+
+def encode_attitude(
+    mav: mavutil.mavlink.MAVLink, index: int, time_boot_ms: int
+) -> mavutil.mavlink.MAVLink_message:
+    """
+    Attitude with a yaw which varies with the index.
+    """
+    return mav.attitude_encode(time_boot_ms, 0.0, 0.0, 0.001 * (index % 1000), 0.0, 0.0, 0.0)
+
+
+def encode_local_position_ned(
+    mav: mavutil.mavlink.MAVLink, index: int, time_boot_ms: int
+) -> mavutil.mavlink.MAVLink_message:
+    """
+    Local position at TELEMETRY_Z which varies with the index.
+    """
+    return mav.local_position_ned_encode(
+        time_boot_ms, 0.01 * (index % 1000), 0.0, TELEMETRY_Z, 1.0, 0.0, 0.0
+    )
+
+
+def encode_global_position_int(
+    mav: mavutil.mavlink.MAVLink, index: int, time_boot_ms: int
+) -> mavutil.mavlink.MAVLink_message:
+    """
+    Global position near the origin which varies with the index.
+    """
+    return mav.global_position_int_encode(time_boot_ms, index % 1000, 0, 10000, 10000, 0, 0, 0, 0)
+
+
+def encode_sys_status(
+    mav: mavutil.mavlink.MAVLink, _index: int, _time_boot_ms: int
+) -> mavutil.mavlink.MAVLink_message:
+    """
+    System status of a healthy vehicle.
+    """
+    return mav.sys_status_encode(0, 0, 0, 500, 12000, 1000, 80, 0, 0, 0, 0, 0, 0)
+
+
+def encode_vfr_hud(
+    mav: mavutil.mavlink.MAVLink, index: int, _time_boot_ms: int
+) -> mavutil.mavlink.MAVLink_message:
+    """
+    HUD values of a hovering vehicle.
+    """
+    return mav.vfr_hud_encode(0.0, 0.0, index % 360, 50, -TELEMETRY_Z, 0.0)
+
+
+# Messages of the load generator, by type
+MESSAGE_ENCODERS = {
+    "HEARTBEAT": encode_heartbeat,
+    "ATTITUDE": encode_attitude,
+    "LOCAL_POSITION_NED": encode_local_position_ned,
+    "GLOBAL_POSITION_INT": encode_global_position_int,
+    "SYS_STATUS": encode_sys_status,
+    "VFR_HUD": encode_vfr_hud,
+}
+
+
+def send_telemetry(connection: mavutil.mavfile, index: int, time_boot_ms: int) -> None:
+    """
+    Sends an ATTITUDE and a LOCAL_POSITION_NED, which Telemetry assembles into one TelemetryData.
+
+    index: Number of the pair, varies the values.
+    time_boot_ms: Timestamp of both messages.
+    """
+    connection.mav.send(encode_attitude(connection.mav, index, time_boot_ms))
+    connection.mav.send(encode_local_position_ned(connection.mav, index, time_boot_ms))
+
+
+def run_drone(rate: float, pair_count: "int | None" = None) -> None:
+    """
+    Accepts a connection, then sends telemetry until pair_count pairs are sent or terminated,
+    reading and discarding the commands of the ground station.
+
+    rate: Telemetry pairs per second, <= 0 for as fast as the socket takes them.
+    pair_count: Pairs to send, None for no limit.
+    """
+    connection = mavutil.mavlink_connection(
+        DRONE_CONNECTION_STRING, source_system=1, source_component=0
+    )
+    # Accepts on first receive, the ground station sends a heartbeat once connected
+    connection.recv_match(blocking=True)
+
+    period = 1.0 / rate if rate > 0.0 else 0.0
+    start_time = time.monotonic()
+    next_time = start_time
+    next_heartbeat_time = start_time
+    index = 0
+    while pair_count is None or index < pair_count:
+        now = time.monotonic()
+        if now >= next_heartbeat_time:
+            connection.mav.heartbeat_send(
+                mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+            )
+            next_heartbeat_time += HEARTBEAT_PERIOD
+
+        send_telemetry(connection, index, int((now - start_time) * 1000) % 2**32)
+        index += 1
+
+        if period > 0.0 or index % UNPACED_DRAIN_EVERY == 0:
+            while connection.recv_match(blocking=False) is not None:
+                pass
+
+        if period > 0.0:
+            next_time += period
+            time.sleep(max(next_time - time.monotonic(), 0.0))
+
+    # Ground station may still be reading
+    while True:
+        connection.recv_match(blocking=True)
+
+
+def send_frame(connection: mavutil.mavfile, message: mavutil.mavlink.MAVLink_message) -> bool:
+    """
+    Sends a message without blocking, as a radio drops frames when the link is saturated.
+    Unlike `connection.mav.send()`, reports whether the frame was dropped.
+
+    Returns whether the socket took the whole frame, a partial frame is dropped by the receiver.
+    """
+    frame = message.pack(connection.mav)
+    connection.mav.seq = (connection.mav.seq + 1) % 256
+    try:
+        return connection.port.send(frame) == len(frame)
+    except BlockingIOError:
+        return False
+
+
+def create_streams(
+    rate: float, mix: "dict[str, float]", vehicle_count: int
+) -> "list[tuple[float, int, str]]":
+    """
+    Splits the load between the vehicles and message types.
+
+    rate: Messages per second of all vehicles, excluding the heartbeats every vehicle sends
+        every HEARTBEAT_PERIOD.
+    mix: Relative rate of each message type, see MESSAGE_ENCODERS.
+    vehicle_count: Simulated vehicles, with consecutive system IDs from FIRST_SYSTEM_ID.
+
+    Returns the period, system ID and message type of every stream.
+    """
+    mix_total = sum(mix.values())
+    streams = []
+    for system_id in range(FIRST_SYSTEM_ID, FIRST_SYSTEM_ID + vehicle_count):
+        streams.append((HEARTBEAT_PERIOD, system_id, "HEARTBEAT"))
+        for message_type, weight in mix.items():
+            if weight > 0.0:
+                streams.append(
+                    (vehicle_count * mix_total / (rate * weight), system_id, message_type)
+                )
+
+    return streams
+
+
+def run_load(
+    rate: float,
+    mix: "dict[str, float]",
+    vehicle_count: int,
+    duration: float,
+    result_queue: "mp.Queue",
+) -> None:
+    """
+    Accepts a connection, then sends the load for the duration, reading and discarding the
+    commands of the ground station. Puts a report in the result queue and keeps the connection
+    open until terminated.
+
+    Every stream (vehicle and message type) is due at fixed times from the start, so pacing does
+    not drift. Sleep overshoot delays sends by the scheduling granularity of the host, after which
+    the sends due meanwhile go out together.
+
+    rate, mix, vehicle_count: See create_streams().
+    duration: Seconds of load.
+    result_queue: Gets the report, a dictionary of:
+        * sent: Frames taken by the socket, by message type.
+        * dropped: Frames the socket did not take because the ground station fell behind.
+        * pairs: ATTITUDE and LOCAL_POSITION_NED pairs sent, the most TelemetryData possible.
+        * duration_s, cpu_percent: Time spent sending, and CPU time of the generator over it.
+        * late_fraction, max_lag_ms: Of sends, late after LATE_THRESHOLD, and the latest.
+    """
+    connection = mavutil.mavlink_connection(
+        DRONE_CONNECTION_STRING, source_system=FIRST_SYSTEM_ID, source_component=0
+    )
+    # Accepts on first receive, the ground station sends a heartbeat once connected
+    connection.recv_match(blocking=True)
+
+    streams = create_streams(rate, mix, vehicle_count)
+    start_cpu_time = time.process_time()
+    start_time = time.monotonic()
+    end_time = start_time + duration
+    # Staggered, so that the streams do not all start together
+    schedule = [
+        (start_time + period * index / len(streams), index)
+        for index, (period, _, _) in enumerate(streams)
+    ]
+    heapq.heapify(schedule)
+
+    sent_counts = [0] * len(streams)
+    drop_count = 0
+    late_count = 0
+    max_lag = 0.0
+    send_count = 0
+    while True:
+        now = time.monotonic()
+        due_time, index = schedule[0]
+        if due_time >= end_time:
+            break
+
+        if due_time > now:
+            while connection.recv_match(blocking=False) is not None:
+                pass
+
+            time.sleep(max(due_time - time.monotonic(), 0.0))
+            continue
+
+        period, system_id, message_type = streams[index]
+        heapq.heapreplace(schedule, (due_time + period, index))
+
+        connection.mav.srcSystem = system_id
+        message = MESSAGE_ENCODERS[message_type](
+            connection.mav, sent_counts[index], int((now - start_time) * 1000) % 2**32
+        )
+        if send_frame(connection, message):
+            sent_counts[index] += 1
+        else:
+            drop_count += 1
+
+        lag = now - due_time
+        max_lag = max(max_lag, lag)
+        if lag > LATE_THRESHOLD:
+            late_count += 1
+        send_count += 1
+
+        # Ground station commands are read while sleeping, or between sends when behind
+        if send_count % UNPACED_DRAIN_EVERY == 0:
+            while connection.recv_match(blocking=False) is not None:
+                pass
+
+    duration = time.monotonic() - start_time
+    sent_by_type: "dict[str, int]" = {}
+    pair_counts: "dict[int, dict[str, int]]" = {}
+    for (_, system_id, message_type), count in zip(streams, sent_counts):
+        sent_by_type[message_type] = sent_by_type.get(message_type, 0) + count
+        pair_counts.setdefault(system_id, {})[message_type] = count
+
+    result_queue.put(
+        {
+            "sent": sent_by_type,
+            "dropped": drop_count,
+            "pairs": sum(
+                min(counts.get("ATTITUDE", 0), counts.get("LOCAL_POSITION_NED", 0))
+                for counts in pair_counts.values()
+            ),
+            "duration_s": duration,
+            "cpu_percent": (time.process_time() - start_cpu_time) / duration * 100.0,
+            "late_fraction": late_count / max(send_count, 1),
+            "max_lag_ms": max_lag * 1e3,
+        }
+    )
+
+    # Ground station may still be reading
+    while True:
+        connection.recv_match(blocking=True)
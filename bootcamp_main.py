@@ -5,7 +5,8 @@ Main process to setup and manage all the other working processes
 """
 
 import multiprocessing as mp
-import queue
+import pathlib
+import signal
 import time
 
 from pymavlink import mavutil
@@ -14,31 +15,46 @@ from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
 from modules.command import command
-from modules.command import command_worker
-from modules.heartbeat import heartbeat_receiver_worker
-from modules.heartbeat import heartbeat_sender_worker
-from modules.telemetry import telemetry_worker
-from utilities.workers import queue_proxy_wrapper
+from utilities.workers import async_log
+from utilities.workers import latency_trace
+from utilities.workers import metrics_export
+from utilities.workers import pipeline_graph
+from utilities.workers import queue_backends
+from utilities.workers import queue_select
 from utilities.workers import worker_controller
-from utilities.workers import worker_manager
+from utilities.workers import worker_supervisor
 
 
 # MAVLink connection
 CONNECTION_STRING = "tcp:localhost:12345"
+HEARTBEAT_TIMEOUT = 30  # seconds
+
+# Startup, see benchmarks/benchmark_startup.py
+READY_TIMEOUT = 10  # seconds
+FIRST_TELEMETRY_TIMEOUT = 10  # seconds
+
+# Shutdown
+STAGE_CLOSE_TIMEOUT = 2.0  # seconds
+LOG_WRITER_STOP_TIMEOUT = 2.0  # seconds
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
-# Set queue max sizes (<= 0 for infinity)
-HEART_MAX = 10
-TELE_MAX = 10
-REPORT_MAX = 10
+# Queues and workers are configured in the pipeline section of this file
+PIPELINE_CONFIG_FILE_PATH = pathlib.Path("config.yaml")
+
+# Maximum items main reads from each queue per loop
+MAIN_BATCH_SIZE = 100
+
+# Workers queue their log records to a writer thread in main instead of writing the files,
+# for hosts where log writes block the loop (e.g. SD cards), see benchmarks/benchmark_async_log.py
+ASYNC_LOGGING = False
+
+# Period of logging the latency of telemetry from frame receipt to command send, by stage
+LATENCY_EXPORT_PERIOD = 10.0  # seconds
 
-# Set worker counts
-HEART_SEND_WORKER = 1
-HEART_REC_WORKER = 1
-TELE_WORKER = 1
-CMD_WORKER = 1
+# Live metrics for Prometheus on http://localhost:<port>/metrics, see metrics_export.py
+METRICS_PORT = 9464
 
 # Any other constants
 TARGET = command.Position(10, 20, 30)
@@ -48,10 +64,36 @@ RUNTIME = 100
 # =================================================================================================
 
 
+def log_latency(
+    latency_statistics: latency_trace.LatencyStatistics, main_logger: logger.Logger
+) -> None:
+    """
+    Logs the latency histograms of each stage since start.
+    """
+    for stage, summary in latency_statistics.get_summary().items():
+        main_logger.info(f"Latency {stage} {summary}", True)
+
+
+def toggle_profiling(
+    controller: worker_controller.WorkerController, main_logger: logger.Logger
+) -> None:
+    """
+    Starts profiling the workers, or stops it so that they write their profiles to logs/.
+    """
+    if controller.is_profile_requested():
+        controller.request_profile_stop()
+        main_logger.info("Requested workers to stop profiling", True)
+    else:
+        controller.request_profile_start()
+        main_logger.info("Requested workers to start profiling", True)
+
+
 def main() -> int:
     """
     Main function.
     """
+    launch_time = time.time()
+
     # Configuration settings
     result, config = read_yaml.open_config(logger.CONFIG_FILE_PATH)
     if not result:
@@ -68,206 +110,252 @@ def main() -> int:
 
     assert main_logger is not None
 
-    # Connect to the drone
+    # Connect to the drone, the heartbeat handshake is done once workers are starting
     connection = mavutil.mavlink_connection(CONNECTION_STRING)
-    connection.wait_heartbeat(timeout=30)
 
     # =============================================================================================
     #                          ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
     # =============================================================================================
     controller = worker_controller.WorkerController()
 
-    mp_manager = mp.Manager()
-
-    # Removed .create() for the queues (Review)
-    heartbeat_queue = queue_proxy_wrapper.QueueProxyWrapper(
-        mp_manager,
-        HEART_MAX,
-    )
-
-    telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(
-        mp_manager,
-        TELE_MAX,
-    )
-
-    report_queue = queue_proxy_wrapper.QueueProxyWrapper(
-        mp_manager,
-        REPORT_MAX,
-    )
-
-    # Worker properties
-    # Added .create() to worker properties (Review)
-    # Added return type of a tuple [bool, object] (Review)
-    # Removed the line True, as function itself should return a tuple (Review)
-
-    # Heartbeat Sender
-    # Heartbeat Receiver
-    result, heartbeat_sender_properties = worker_manager.WorkerProperties.create(
-        controller=controller,
-        count=HEART_SEND_WORKER,
-        target=heartbeat_sender_worker.heartbeat_sender_worker,
-        work_arguments={
-            "connection": connection,
-            "controller": controller,
-        },
-        input_queues=[],
-        output_queues=[],
-        local_logger=main_logger,
-    )
-
-    if not result:
-        main_logger.error("Failed to create HeartbeatSender properties")
-        return -1
-
-    # Heartbeat Receiver
-    result, heartbeat_receiver_properties = worker_manager.WorkerProperties.create(
-        controller=controller,
-        count=HEART_REC_WORKER,
-        target=heartbeat_receiver_worker.heartbeat_receiver_worker,
-        work_arguments={
-            "connection": connection,
-            "heartbeat_queue": heartbeat_queue,
-            "controller": controller,
-        },
-        input_queues=[],
-        output_queues=[heartbeat_queue],
-        local_logger=main_logger,
-    )
-
-    if not result:
-        main_logger.error("Failed to create HeartbeatReceiver properties")
-        return -1
-
-    # Telemetry
-    result, telemetry_properties = worker_manager.WorkerProperties.create(
-        controller=controller,
-        count=TELE_WORKER,
-        target=telemetry_worker.telemetry_worker,
-        work_arguments={
-            "connection": connection,
-            "telemetry_queue": telemetry_queue,
-            "controller": controller,
-        },
-        input_queues=[],
-        output_queues=[telemetry_queue],
-        local_logger=main_logger,
-    )
-
-    if not result:
-        main_logger.error("Failed to create Telemetry properties")
-        return -1
+    # Workers profile themselves between two SIGUSR1 to main (`kill -USR1 <pid>`),
+    # see utilities/workers/worker_profiler.py
+    # Applied by the main loop, the handler must not take the controller lock main may hold
+    is_profile_toggle_requested = [False]
 
-    # Command
-    result, command_properties = worker_manager.WorkerProperties.create(
-        controller=controller,
-        count=CMD_WORKER,
-        target=command_worker.command_worker,
-        work_arguments={
-            "connection": connection,
-            "target": TARGET,
-            "telemetry_queue": telemetry_queue,
-            "report_queue": report_queue,
-            "controller": controller,
-        },
-        input_queues=[telemetry_queue],
-        output_queues=[report_queue],
-        local_logger=main_logger,
-    )
+    def request_profile_toggle(_signal_number: int, _frame: object) -> None:
+        is_profile_toggle_requested[0] = True
 
-    if not result:
-        main_logger.error("Failed to create Command properties")
-        return -1
-
-    # Create worker managers
-    # UPDATE: ADDED .create() to each (Review)
-    # UPDATE: ADDED return of tuple of a bool and the object (Review)
-    # UPDATE: Only checks the result boolean and not the instance (Review)
-    result, heartbeat_sender_manager = worker_manager.WorkerManager.create(
-        worker_properties=heartbeat_sender_properties,
-        local_logger=main_logger,
-    )
-    if not result:
-        main_logger.error("Failed to create HeartbeatSender manager")
-        return -1
+    signal.signal(signal.SIGUSR1, request_profile_toggle)
 
-    result, heartbeat_receiver_manager = worker_manager.WorkerManager.create(
-        worker_properties=heartbeat_receiver_properties,
-        local_logger=main_logger,
-    )
+    result, pipeline_config = read_yaml.open_config(PIPELINE_CONFIG_FILE_PATH)
     if not result:
-        main_logger.error("Failed to create HeartbeatReceiver manager")
+        main_logger.error("Failed to load pipeline configuration file")
         return -1
 
-    result, telemetry_manager = worker_manager.WorkerManager.create(
-        worker_properties=telemetry_properties,
-        local_logger=main_logger,
-    )
-    if not result:
-        main_logger.error("Failed to create Telemetry manager")
-        return -1
+    assert pipeline_config is not None
 
-    result, command_manager = worker_manager.WorkerManager.create(
-        worker_properties=command_properties,
-        local_logger=main_logger,
-    )
-    if not result:
-        main_logger.error("Failed to create Command manager")
+    try:
+        pipeline_section = pipeline_config["pipeline"]
+    except (KeyError, TypeError) as e:
+        main_logger.error(f"Pipeline configuration file is missing {e}")
         return -1
 
-    # Start all workers
-    heartbeat_sender_manager.start_workers()
-    heartbeat_receiver_manager.start_workers()
-    telemetry_manager.start_workers()
-    command_manager.start_workers()
-
-    main_logger.info("Started")
-
-    # Main's work: read from all queues that output to main, and log any commands that we make
-    # Continue running for 100 seconds or until the drone disconnects
-    # Fixed logic to check if drone is disconnected (Review)
-    # Put the two try/except blocks into one (Review)
-    start_time = time.time()
-    while (time.time() - start_time) < RUNTIME:
-        # Read heartbeat updates
-        try:
-            # Read heartbeat queue
-            if not heartbeat_queue.queue.empty():
-                hb_status = heartbeat_queue.queue.get_nowait()
+    log_writer = None
+    metrics_exporter = None
+    supervisor = None
+    is_graph_started = False
+    if ASYNC_LOGGING:
+        result, log_writer = async_log.AsyncLogWriter.create(main_logger)
+        if not result:
+            main_logger.error("Failed to create log writer")
+            return -1
+
+    # Manager server process only if a queue is backed by it
+    mp_manager = None
+    if pipeline_graph.requires_manager(pipeline_section):
+        mp_manager = queue_backends.create_manager()
+
+    try:
+        # Creates the queues, stages are created below
+        result, graph = pipeline_graph.PipelineGraph.create(
+            pipeline_section,
+            controller,
+            mp_manager,
+            main_logger,
+        )
+        if not result:
+            main_logger.error("Failed to create pipeline")
+            return -1
+
+        assert graph is not None
+
+        heartbeat_queue = graph.get_queue("heartbeat_queue")
+        telemetry_queue = graph.get_queue("telemetry_queue")
+        report_queue = graph.get_queue("report_queue")
+        assert (
+            heartbeat_queue is not None and telemetry_queue is not None and report_queue is not None
+        )
+
+        # Selectors must exist before workers start, producers signal them on put
+        main_selector = queue_select.QueueSelector([heartbeat_queue, report_queue])
+        telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+
+        # Recorded by the command workers when a trace ends
+        latency_statistics = latency_trace.LatencyStatistics()
+
+        # Work arguments are positional, followed by input queues, output queues, and controller
+        result = graph.create_stages(
+            {
+                "heartbeat_sender": (connection, log_writer),
+                "heartbeat_receiver": (connection, log_writer),
+                "telemetry": (connection, log_writer),
+                "command": (connection, TARGET, telemetry_selector, log_writer, latency_statistics),
+            }
+        )
+        if not result:
+            main_logger.error("Failed to create pipeline stages")
+            return -1
+
+        # Counted by main from the queues it reads, workers count in shared memory
+        main_metrics = metrics_export.MetricValues()
+        main_metrics.declare("heartbeat_connected", "gauge", "1 while the drone is connected.")
+        main_metrics.declare("command_reports_total", "counter", "Command reports read by main.")
+        main_metrics.declare(
+            "worker_restarts_total", "counter", "Workers restarted by the supervisor."
+        )
+
+        # Flying without metrics is better than not flying
+        result, metrics_exporter = metrics_export.MetricsExporter.create(
+            METRICS_PORT,
+            [
+                lambda: metrics_export.collect_queues(graph),
+                lambda: metrics_export.collect_latency(latency_statistics),
+                main_metrics.collect,
+            ],
+            main_logger,
+        )
+        if result:
+            assert metrics_exporter is not None
+            metrics_exporter.start()
+        else:
+            main_logger.warning("Running without metrics endpoint")
+
+        # Main only waits for the first telemetry, later puts do not set the event
+        first_telemetry_event = mp.Event()
+        telemetry_queue.add_listener(first_telemetry_event, True)
+
+        if log_writer is not None:
+            log_writer.start()
+
+        # Start all workers, consumers before producers
+        # Workers set up while paused, so that they do not read the handshake heartbeat
+        controller.request_pause()
+        # Also stops the stages started before a failure, see finally
+        is_graph_started = True
+        graph.start()
+
+        main_logger.info(f"Started workers after {time.time() - launch_time:.3f}s")
+
+        # Heartbeat handshake overlaps with worker setup
+        if connection.wait_heartbeat(timeout=HEARTBEAT_TIMEOUT) is None:
+            main_logger.error("No heartbeat from drone")
+            return -1
+
+        main_logger.info(f"Received drone heartbeat after {time.time() - launch_time:.3f}s")
+
+        # Readiness barrier: every worker has finished setup
+        if not graph.wait_until_ready(READY_TIMEOUT):
+            main_logger.error("Workers failed to become ready")
+            return -1
+
+        controller.request_resume()
+        main_logger.info(f"Ready after {time.time() - launch_time:.3f}s")
+
+        if first_telemetry_event.wait(FIRST_TELEMETRY_TIMEOUT):
+            main_logger.info(f"First telemetry after {time.time() - launch_time:.3f}s")
+        else:
+            main_logger.warning(f"No telemetry within {FIRST_TELEMETRY_TIMEOUT}s")
+
+        # Restart dead or hung workers while running
+        result, supervisor = worker_supervisor.WorkerSupervisor.create(
+            graph.get_worker_managers(),
+            main_logger,
+        )
+        if not result:
+            main_logger.error("Failed to create supervisor")
+            return -1
+
+        supervisor.start()
+
+        # Main's work: read from all queues that output to main, and log any commands that we make
+        # Continue running for 100 seconds or until the drone disconnects
+        # Fixed logic to check if drone is disconnected (Review)
+        # Put the two try/except blocks into one (Review)
+        start_time = time.time()
+        next_latency_export_time = start_time + LATENCY_EXPORT_PERIOD
+        is_disconnected = False
+        while not is_disconnected:
+            remaining_time = RUNTIME - (time.time() - start_time)
+            if remaining_time <= 0.0:
+                break
+
+            # Sleeps until either queue has data, the next export, or the runtime is over
+            main_selector.wait(
+                max(min(remaining_time, next_latency_export_time - time.time()), 0.0)
+            )
+
+            if time.time() >= next_latency_export_time:
+                next_latency_export_time += LATENCY_EXPORT_PERIOD
+                log_latency(latency_statistics, main_logger)
+
+            if is_profile_toggle_requested[0]:
+                is_profile_toggle_requested[0] = False
+                toggle_profiling(controller, main_logger)
+
+            main_metrics.set("worker_restarts_total", supervisor.get_statistics()[0])
+
+            # Read all queued heartbeat updates
+            for hb_status in heartbeat_queue.get_many(MAIN_BATCH_SIZE, False):
                 main_logger.info(f"Heartbeat status: {hb_status}", True)
+                main_metrics.set("heartbeat_connected", int(hb_status == "Connected"))
 
                 if hb_status == "Disconnected":
                     main_logger.warning("Drone disconnected, exiting", True)
+                    is_disconnected = True
                     break
 
-            # Read command reports
-            if not report_queue.queue.empty():
-                report = report_queue.queue.get_nowait()
+            # Read all queued command reports
+            for report in report_queue.get_many(MAIN_BATCH_SIZE, False):
                 main_logger.info(f"Command report: {report}", True)
-
-        except queue.Empty:
-            pass
-
-        time.sleep(0.1)
-
-    # Stop all workers
-    controller.request_exit()
-    main_logger.info("Requested exit")
-
-    # Drain queues
-    # UPDATE: CHANGED ORDER (Review)
-    heartbeat_queue.fill_and_drain_queue()
-    telemetry_queue.fill_and_drain_queue()
-    report_queue.fill_and_drain_queue()
-    main_logger.info("Queues cleared")
-
-    # Join worker processes
-    command_manager.join_workers()
-    telemetry_manager.join_workers()
-    heartbeat_receiver_manager.join_workers()
-    heartbeat_sender_manager.join_workers()
-
-    main_logger.info("Stopped")
-    controller.clear_exit()  # added exit (Review)
+                main_metrics.increment("command_reports_total")
+
+        # Stop restarting workers before they are asked to exit
+        supervisor.stop()
+        restart_count, mean_time_to_recovery = supervisor.get_statistics()
+        main_logger.info(
+            f"Worker restarts: {restart_count}, mean time to recovery: {mean_time_to_recovery:.2f}s",
+            True,
+        )
+
+        # Stop all workers, producers before consumers
+        # Each stage drains its input and is terminated if it has not exited by the timeout
+        shutdown_time = graph.stop(STAGE_CLOSE_TIMEOUT)
+        is_graph_started = False
+
+        main_logger.info(f"Stopped in {shutdown_time:.3f}s")
+
+        if log_writer is not None and log_writer.get_drop_count() > 0:
+            main_logger.warning(
+                f"Log writer dropped {log_writer.get_drop_count()} records when full", True
+            )
+
+        for queue_name, drop_count in graph.get_drop_counts().items():
+            if drop_count > 0:
+                main_logger.warning(f"{queue_name} dropped {drop_count} items when full", True)
+
+        # For sizing the queues, see instrument in the pipeline configuration
+        for queue_name, summary in graph.get_queue_statistics().items():
+            main_logger.info(f"{queue_name} {summary}", True)
+
+        log_latency(latency_statistics, main_logger)
+    finally:
+        # Workers still running after an early return or an error, before their queues go
+        if supervisor is not None:
+            supervisor.stop()
+
+        if is_graph_started:
+            graph.stop(STAGE_CLOSE_TIMEOUT)
+
+        # Once the workers have stopped, or were never started
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+
+        if mp_manager is not None:
+            mp_manager.shutdown()
+
+        if log_writer is not None and not log_writer.stop(LOG_WRITER_STOP_TIMEOUT):
+            main_logger.warning("Log writer did not finish writing", True)
 
     # =============================================================================================
     #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
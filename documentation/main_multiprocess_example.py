@@ -5,7 +5,6 @@ python -m documentation.main_multiprocess_example
 ```
 """
 
-import multiprocessing as mp
 import time
 
 from documentation.multiprocess_example.add_random import add_random_worker
@@ -14,7 +13,9 @@ from documentation.multiprocess_example.countup import countup_worker
 from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
+from utilities.workers import queue_backends
 from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_autoscaler
 from utilities.workers import worker_controller
 from utilities.workers import worker_manager
 
@@ -25,9 +26,13 @@ ADD_RANDOM_TO_CONCATENATOR_QUEUE_MAX_SIZE = 5
 
 # Play with these numbers to see process bottlenecks
 COUNTUP_WORKER_COUNT = 2
-ADD_RANDOM_WORKER_COUNT = 2
+ADD_RANDOM_WORKER_COUNT = 1
 CONCATENATOR_WORKER_COUNT = 2
 
+# Add Random is the slowest stage, so the autoscaler adds workers until it keeps up
+ADD_RANDOM_MIN_WORKER_COUNT = 1
+ADD_RANDOM_MAX_WORKER_COUNT = 4
+
 
 # main() is required for early return
 def main() -> int:
@@ -60,7 +65,8 @@ def main() -> int:
     # caused by its implementation (background thread work)
     # so a queue from a SyncManager is used instead
     # See 2nd note: https://docs.python.org/3/library/multiprocessing.html#pipes-and-queues
-    mp_manager = mp.Manager()
+    # This manager also supports batched put_many() and get_many() in a single round-trip
+    mp_manager = queue_backends.create_manager()
 
     # Queue maxsize should always be >= the larger of producers/consumers count
     # Example: Producers 3, consumers 2, so queue maxsize minimum is 3
@@ -105,6 +111,8 @@ def main() -> int:
         output_queues=[add_random_to_concatenator_queue],
         controller=controller,
         local_logger=main_logger,
+        min_count=ADD_RANDOM_MIN_WORKER_COUNT,  # Optional bounds for scaling
+        max_count=ADD_RANDOM_MAX_WORKER_COUNT,
     )
     if not result:
         print("Failed to create arguments for Add Random")
@@ -181,8 +189,26 @@ def main() -> int:
 
     main_logger.info("Started", True)
 
+    # Scale worker counts to the load while running
+    # Only managers with a worker count range are scaled
+    result, autoscaler = worker_autoscaler.WorkerAutoscaler.create(
+        worker_managers,
+        main_logger,
+        check_period=0.5,
+        sustain_checks=2,
+        cooldown=1.0,
+    )
+    if not result:
+        print("Failed to create autoscaler")
+        return -1
+
+    # Get Pylance to stop complaining
+    assert autoscaler is not None
+
+    autoscaler.start()
+
     # Run for some time and then pause
-    time.sleep(2)
+    time.sleep(6)
     controller.request_pause()
 
     main_logger.info("Paused", True)
@@ -193,6 +219,11 @@ def main() -> int:
 
     time.sleep(2)
 
+    main_logger.info(f"Add Random workers: {add_random_manager.get_worker_count()}", True)
+
+    # Stop scaling before the processes, otherwise exiting workers may be replaced
+    autoscaler.stop()
+
     # Stop the processes
     controller.request_exit()
 
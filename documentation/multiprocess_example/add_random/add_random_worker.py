@@ -52,7 +52,7 @@ def add_random_worker(
         # Get an item from the queue
         # If the queue is empty, the worker process will block
         # until the queue is non-empty
-        term = input_queue.queue.get()
+        term = input_queue.get()
 
         # Exit on sentinel
         if term is None:
@@ -70,4 +70,4 @@ def add_random_worker(
         # Put an item into the queue
         # If the queue is full, the worker process will block
         # until the queue is non-empty
-        output_queue.queue.put(value)
+        output_queue.put(value)
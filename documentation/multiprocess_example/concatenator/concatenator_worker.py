@@ -48,7 +48,7 @@ def concatenator_worker(
         # Get an item from the queue
         # If the queue is empty, the worker process will block
         # until the queue is non-empty
-        input_data = input_queue.queue.get()
+        input_data = input_queue.get()
 
         # Exit on sentinel
         if input_data is None:
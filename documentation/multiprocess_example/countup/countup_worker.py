@@ -58,4 +58,4 @@ def countup_worker(
         # Put an item into the queue
         # If the queue is full, the worker process will block
         # until the queue is non-empty
-        output_queue.queue.put(value)
+        output_queue.put(value)
@@ -2,9 +2,15 @@
 Decision-making logic.
 """
 
+import logging
 import math
+import time
+
 from pymavlink import mavutil
 
+from utilities.workers import latency_trace
+from utilities.workers import lazy_log
+from utilities.workers import log_throttle
 from ..common.modules.logger import logger
 from ..telemetry import telemetry
 
@@ -21,6 +27,10 @@ class Position:
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Telemetry of each vehicle arrives at up to 10 Hz, about 1 line a second for each
+LOG_SAMPLE_EVERY = 10
+
+
 class Command:  # pylint: disable=too-many-instance-attributes
     """
     Command class to make a decision based on received telemetry,
@@ -58,27 +68,60 @@ class Command:  # pylint: disable=too-many-instance-attributes
         self.connection = connection
         self.target = target
         self.local_logger = local_logger
+        # Logs 1 in LOG_SAMPLE_EVERY of the averages of each vehicle
+        self.log_throttle = log_throttle.LogThrottle(local_logger)
 
-        self.velocity_sum = Position(0.0, 0.0, 0.0)
-        self.sample_count = 0
+        # By vehicle system ID, a worker receives every sample of each of its vehicles
+        self.velocity_sums: "dict[int | None, Position]" = {}
+        self.sample_counts: "dict[int | None, int]" = {}
+
+    def __send_command(
+        self, trace: latency_trace.TraceContext | None, *command_args: float | int
+    ) -> None:
+        """
+        Sends a COMMAND_LONG, stamping the end of the decision and the send in the trace.
+        """
+        if trace is not None:
+            trace.decided = time.monotonic()
+
+        self.connection.mav.command_long_send(*command_args)
+
+        if trace is not None:
+            trace.sent = time.monotonic()
 
     def run(self, telemetry_data: telemetry.TelemetryData) -> str | None:
         """Make a decision based on received telemetry data."""
-        self.velocity_sum.x += telemetry_data.x_velocity or 0
-        self.velocity_sum.y += telemetry_data.y_velocity or 0
-        self.velocity_sum.z += telemetry_data.z_velocity or 0
-        self.sample_count += 1
-
-        avg_vx = self.velocity_sum.x / self.sample_count
-        avg_vy = self.velocity_sum.y / self.sample_count
-        avg_vz = self.velocity_sum.z / self.sample_count
-        self.local_logger.info(
-            f"Average velocity so far: ({avg_vx:.2f}, {avg_vy:.2f}, {avg_vz:.2f})", True
-        )
+        trace = telemetry_data.trace
+        if trace is not None:
+            trace.dequeued = time.monotonic()
+
+        system_id = telemetry_data.system_id
+        velocity_sum = self.velocity_sums.setdefault(system_id, Position(0.0, 0.0, 0.0))
+        velocity_sum.x += telemetry_data.x_velocity or 0
+        velocity_sum.y += telemetry_data.y_velocity or 0
+        velocity_sum.z += telemetry_data.z_velocity or 0
+        sample_count = self.sample_counts.get(system_id, 0) + 1
+        self.sample_counts[system_id] = sample_count
+
+        avg_vx = velocity_sum.x / sample_count
+        avg_vy = velocity_sum.y / sample_count
+        avg_vz = velocity_sum.z / sample_count
+        # Formatted only if emitted
+        if self.log_throttle.is_sampled(f"Average velocity {system_id}", LOG_SAMPLE_EVERY):
+            lazy_log.log(
+                self.local_logger,
+                logging.INFO,
+                "Average velocity so far of system {}: ({:.2f}, {:.2f}, {:.2f})",
+                system_id,
+                avg_vx,
+                avg_vy,
+                avg_vz,
+            )
 
         delta_z = self.target.z - telemetry_data.z
         if abs(delta_z) > 0.5:
-            self.connection.mav.command_long_send(
+            self.__send_command(
+                trace,
                 1,  # Hardcoded to 1 and 0 as per documentation (Review)
                 0,
                 mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT,
@@ -111,7 +154,8 @@ class Command:  # pylint: disable=too-many-instance-attributes
             direction = 1
 
         if abs(yaw_error) > 5:
-            self.connection.mav.command_long_send(
+            self.__send_command(
+                trace,
                 1,  # Hardcoded to 1 and 0 as per documentation (Review)
                 0,
                 mavutil.mavlink.MAV_CMD_CONDITION_YAW,
@@ -126,6 +170,9 @@ class Command:  # pylint: disable=too-many-instance-attributes
             )
             return f"CHANGE YAW: {yaw_error:.2f}"
 
+        if trace is not None:
+            trace.decided = time.monotonic()
+
         return None
 
 
@@ -2,13 +2,16 @@
 Command worker to make decisions based on Telemetry Data.
 """
 
-import time
 import os
 import pathlib
 
 from pymavlink import mavutil
+from utilities.workers import async_log
+from utilities.workers import latency_trace
 from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
 from utilities.workers import worker_controller
+from utilities.workers import worker_profiler
 from ..common.modules.logger import logger
 from . import command
 
@@ -16,9 +19,15 @@ from . import command
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+TELEMETRY_BATCH_SIZE = 100
+
+
 def command_worker(
     connection: mavutil.mavfile,
     target: command.Position,
+    telemetry_selector: queue_select.QueueSelector,
+    log_writer: async_log.AsyncLogWriter | None,
+    latency_statistics: latency_trace.LatencyStatistics | None,
     telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
     report_queue: queue_proxy_wrapper.QueueProxyWrapper,
     controller: worker_controller.WorkerController,
@@ -40,6 +49,11 @@ def command_worker(
         return
 
     assert local_logger is not None
+
+    # Log file writes move to the writer thread in main
+    if log_writer is not None:
+        log_writer.redirect(local_logger)
+
     local_logger.info("Logger initialized", True)
 
     # =============================================================================================
@@ -59,21 +73,36 @@ def command_worker(
     # cmd.set_target(target) (Review)
     local_logger.info("Command Created YAY!", True)
 
+    # Profiles this worker while main requests it
+    profiler = worker_profiler.WorkerProfiler(controller, worker_name, local_logger)
+
     while not controller.is_exit_requested():
         controller.check_pause()
+        profiler.check()
+
+        # Sleeps until telemetry arrives or exit is requested
+        telemetry_selector.wait()
 
-        if not telemetry_queue.queue.empty():
-            telemetry_data = telemetry_queue.queue.get()
+        # Takes everything already queued
+        telemetry_batch = telemetry_queue.get_many(TELEMETRY_BATCH_SIZE, False)
 
+        decisions = []
+        for telemetry_data in telemetry_batch:
             if telemetry_data is None:
                 continue
 
             decision = cmd.run(telemetry_data)
             if decision is not None:
-                report_queue.queue.put(decision)
-        else:
-            time.sleep(0.01)
+                decisions.append(decision)
+
+            # Traces end here, with or without a command
+            if latency_statistics is not None and telemetry_data.trace is not None:
+                latency_statistics.record(telemetry_data.trace)
+
+        if len(decisions) > 0:
+            report_queue.put_many(decisions)
 
+    profiler.stop()
     local_logger.info("Command worker exiting", True)
 
 
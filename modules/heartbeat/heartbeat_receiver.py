@@ -2,7 +2,11 @@
 Heartbeat receiving logic.
 """
 
+import logging
+
 from pymavlink import mavutil
+
+from utilities.workers import log_throttle
 from ..common.modules.logger import logger
 
 
@@ -42,6 +46,8 @@ class HeartbeatReceiver:
 
         self.connection = connection
         self.local_logger = local_logger
+        # Heartbeats arrive every second
+        self.log_throttle = log_throttle.LogThrottle(local_logger)
         self.missed_heartbeats = 0  # number of missed heartbeats
         self.status = "Connected"
         self.disconnect_threshold = 5  # max number of missed heartbeats
@@ -58,7 +64,7 @@ class HeartbeatReceiver:
         if msg and msg.get_type() == "HEARTBEAT":
             self.missed_heartbeats = 0
             self.status = "Connected"
-            self.local_logger.info("Received heartbeat", True)
+            self.log_throttle.repeat(logging.INFO, "Received heartbeat")
         else:
             self.missed_heartbeats += 1
             self.local_logger.warning(f"Missed heartbeat (count: {self.missed_heartbeats})", True)
@@ -2,13 +2,17 @@
 Heartbeat worker that sends heartbeats periodically.
 """
 
+import logging
 import os
 import pathlib
 
 from pymavlink import mavutil
 
+from utilities.workers import async_log
+from utilities.workers import log_throttle
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
+from utilities.workers import worker_profiler
 from . import heartbeat_receiver
 from ..common.modules.logger import logger
 
@@ -18,6 +22,7 @@ from ..common.modules.logger import logger
 # =================================================================================================
 def heartbeat_receiver_worker(
     connection: mavutil.mavfile,
+    log_writer: async_log.AsyncLogWriter | None,
     report_queue: queue_proxy_wrapper.QueueProxyWrapper,
     controller: worker_controller.WorkerController,
 ) -> None:
@@ -41,6 +46,10 @@ def heartbeat_receiver_worker(
     # Get Pylance to stop complaining
     assert local_logger is not None
 
+    # Log file writes move to the writer thread in main
+    if log_writer is not None:
+        log_writer.redirect(local_logger)
+
     local_logger.info("Logger initialized", True)
 
     # =============================================================================================
@@ -59,13 +68,23 @@ def heartbeat_receiver_worker(
 
     local_logger.info("HeartBeatReceiver Created YAY!", True)
 
+    # Logs status changes, and a count while it stays the same
+    throttle = log_throttle.LogThrottle(local_logger)
+
+    # Profiles this worker while main requests it
+    profiler = worker_profiler.WorkerProfiler(controller, worker_name, local_logger)
+
     while not controller.is_exit_requested():
         controller.check_pause()
+        profiler.check()
         status = receiver.run()  # recall this will return the string that updates the status based
         # on the num of heartbets missed or not
 
-        report_queue.queue.put(status)  # update the queue with the status
-        local_logger.info(f"Status: {status}", True)
+        report_queue.put(status)  # update the queue with the status
+        throttle.state(logging.INFO, "Status", status)
+
+    profiler.stop()
+    throttle.flush()
 
 
 # =================================================================================================
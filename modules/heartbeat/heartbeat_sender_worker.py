@@ -2,13 +2,16 @@
 Heartbeat worker that sends heartbeats periodically.
 """
 
+import logging
 import os
 import pathlib
-import time
 
 from pymavlink import mavutil
 
+from utilities.workers import async_log
+from utilities.workers import log_throttle
 from utilities.workers import worker_controller
+from utilities.workers import worker_profiler
 from . import heartbeat_sender
 from ..common.modules.logger import logger
 
@@ -18,6 +21,7 @@ from ..common.modules.logger import logger
 # =================================================================================================
 def heartbeat_sender_worker(
     connection: mavutil.mavfile,
+    log_writer: async_log.AsyncLogWriter | None,
     controller: worker_controller.WorkerController,
     # Place your own arguments here
     # Add other necessary worker arguments here
@@ -44,6 +48,10 @@ def heartbeat_sender_worker(
     # Get Pylance to stop complaining
     assert local_logger is not None
 
+    # Log file writes move to the writer thread in main
+    if log_writer is not None:
+        log_writer.redirect(local_logger)
+
     local_logger.info("Logger initialized", True)
 
     # =============================================================================================
@@ -57,13 +65,22 @@ def heartbeat_sender_worker(
 
     local_logger.info("HeartbeatSender successfully created YAY!!", True)
 
+    # Logs the first heartbeat, then a count every minute
+    throttle = log_throttle.LogThrottle(local_logger)
+
+    # Profiles this worker while main requests it
+    profiler = worker_profiler.WorkerProfiler(controller, worker_name, local_logger)
+
     # Send heartbeat every second
     while not controller.is_exit_requested():
         controller.check_pause()
+        profiler.check()
         sender.run()
-        local_logger.info("Heartbeat sent", True)  # testing to see if it works
-        time.sleep(1)
+        throttle.repeat(logging.INFO, "Heartbeat sent")
+        controller.wait_for_exit(1)
 
+    profiler.stop()
+    throttle.flush()
     local_logger.info("Worker exiting", True)
 
 
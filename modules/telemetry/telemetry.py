@@ -2,9 +2,13 @@
 Telemetry gathering logic.
 """
 
+import logging
 import time
 
 from pymavlink import mavutil
+from utilities.workers import latency_trace
+from utilities.workers import lazy_log
+from utilities.workers import log_throttle
 from ..common.modules.logger import logger
 
 
@@ -28,6 +32,8 @@ class TelemetryData:  # pylint: disable=too-many-instance-attributes
         roll_speed: float | None = None,  # rad/s
         pitch_speed: float | None = None,  # rad/s
         yaw_speed: float | None = None,  # rad/s
+        system_id: int | None = None,  # MAVLink system ID of the vehicle
+        trace: latency_trace.TraceContext | None = None,  # Stage times, None if not traced
     ) -> None:
         self.time_since_boot = time_since_boot
         self.x = x
@@ -42,6 +48,8 @@ class TelemetryData:  # pylint: disable=too-many-instance-attributes
         self.roll_speed = roll_speed
         self.pitch_speed = pitch_speed
         self.yaw_speed = yaw_speed
+        self.system_id = system_id
+        self.trace = trace
 
     def __str__(self) -> str:
         return f"""{{
@@ -57,13 +65,18 @@ class TelemetryData:  # pylint: disable=too-many-instance-attributes
             yaw: {self.yaw},
             roll_speed: {self.roll_speed},
             pitch_speed: {self.pitch_speed},
-            yaw_speed: {self.yaw_speed}
+            yaw_speed: {self.yaw_speed},
+            system_id: {self.system_id}
         }}"""
 
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Telemetry is read at up to 10 Hz, about 1 line a second
+LOG_SAMPLE_EVERY = 10
+
+
 class Telemetry:
     """
     Telemetry class to read position and attitude (orientation).
@@ -96,6 +109,8 @@ class Telemetry:
         assert key is Telemetry.__private_key, "Use create() method"
         self.connection = connection
         self.local_logger = local_logger
+        # Logs 1 in LOG_SAMPLE_EVERY of the data, and counts of repeated warnings
+        self.log_throttle = log_throttle.LogThrottle(local_logger)
 
     def run(self) -> tuple[bool, TelemetryData | None]:
         """
@@ -110,26 +125,53 @@ class Telemetry:
             msg_loc = None
             msg_att = None
 
+            # Latest messages by vehicle system ID, so a pair never mixes two vehicles
+            pending_loc = {}
+            pending_att = {}
+            # Receive and decode times of the pending messages, by system ID and type
+            pending_times = {}
+            trace = None
+
             # Wait up to 1 second for both messages
             while time.time() - start_time < 1.0:
+                received = time.monotonic()
                 msg = self.connection.recv_match(blocking=False)
                 if not msg:
+                    # Sleeps until more data arrives, instead of polling the connection
+                    self.connection.select(max(1.0 - (time.time() - start_time), 0.0))
                     continue
 
+                decoded = time.monotonic()
+                system_id = msg.get_srcSystem()
                 msg_type = msg.get_type()
                 if msg_type == "LOCAL_POSITION_NED":
-                    msg_loc = msg
+                    pending_loc[system_id] = msg
                 elif msg_type == "ATTITUDE":
-                    msg_att = msg
+                    pending_att[system_id] = msg
+                else:
+                    continue
 
-                # Once both are received, break early
-                if msg_loc and msg_att:
+                pending_times[(system_id, msg_type)] = (received, decoded)
+
+                # Once both are received from the same vehicle, break early
+                if system_id in pending_loc and system_id in pending_att:
+                    msg_loc = pending_loc[system_id]
+                    msg_att = pending_att[system_id]
+                    # Traced from the older of the two frames
+                    trace = latency_trace.TraceContext(
+                        *min(
+                            pending_times[(system_id, "LOCAL_POSITION_NED")],
+                            pending_times[(system_id, "ATTITUDE")],
+                        )
+                    )
                     break
 
             # If one is missing, log and exit
             if not msg_loc or not msg_att:
-                self.local_logger.warning(
-                    "Did not receive both ATTITUDE and LOCAL_POSITION_NED within 1 second."
+                self.log_throttle.repeat(
+                    logging.WARNING,
+                    "Did not receive both ATTITUDE and LOCAL_POSITION_NED within 1 second.",
+                    False,
                 )
                 return False, None
 
@@ -169,9 +211,18 @@ class Telemetry:
                 roll_speed=roll_speed,
                 pitch_speed=pitch_speed,
                 yaw_speed=yaw_speed,
+                system_id=msg_loc.get_srcSystem(),
+                trace=trace,
             )
-
-            self.local_logger.info(f"TelemetryData created: {telemetry_data}")
+            # Get Pylance to stop complaining, set with both messages
+            assert trace is not None
+            trace.assembled = time.monotonic()
+
+            # Formatted only if emitted
+            if self.log_throttle.is_sampled("TelemetryData created", LOG_SAMPLE_EVERY):
+                lazy_log.log_object(
+                    self.local_logger, logging.INFO, "TelemetryData created", telemetry_data
+                )
             return True, telemetry_data
 
         except Exception as e:  # pylint: disable=broad-exception-caught
@@ -2,14 +2,18 @@
 Telemtry worker that gathers GPS data.
 """
 
+import logging
 import os
 import pathlib
-import time
 
 from pymavlink import mavutil
 
+from utilities.workers import async_log
+from utilities.workers import lazy_log
+from utilities.workers import log_throttle
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
+from utilities.workers import worker_profiler
 from . import telemetry
 from ..common.modules.logger import logger
 
@@ -17,8 +21,13 @@ from ..common.modules.logger import logger
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
+# Telemetry is read at up to 10 Hz, about 1 line a second
+LOG_SAMPLE_EVERY = 10
+
+
 def telemetry_worker(
     connection: mavutil.mavfile,
+    log_writer: async_log.AsyncLogWriter | None,
     telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,  # Place your own arguments here
     controller: worker_controller.WorkerController,
     # Add other necessary worker arguments here
@@ -44,6 +53,10 @@ def telemetry_worker(
     # Get Pylance to stop complaining
     assert local_logger is not None
 
+    # Log file writes move to the writer thread in main
+    if log_writer is not None:
+        log_writer.redirect(local_logger)
+
     local_logger.info("Logger initialized", True)
 
     # =============================================================================================
@@ -58,21 +71,33 @@ def telemetry_worker(
 
     local_logger.info("Telemetry Created YAY!", True)
 
+    # Logs 1 in LOG_SAMPLE_EVERY of the data, and counts of repeated warnings
+    throttle = log_throttle.LogThrottle(local_logger)
+
+    # Profiles this worker while main requests it
+    profiler = worker_profiler.WorkerProfiler(controller, worker_name, local_logger)
+
     while not controller.is_exit_requested():
         controller.check_pause()
+        profiler.check()
         result, telemetry_data = tele.run()
 
         # Skip if telemetry failed
         # Only checks for the result boolean (Review)
         if not result:
-            local_logger.warning("Skipping telemetry send due to timeout or None data.", True)
+            throttle.repeat(logging.WARNING, "Skipping telemetry send due to timeout or None data.")
             continue
 
         # Send telemetry
-        telemetry_queue.queue.put(telemetry_data)
-        local_logger.info(f"Sent telemetry data: {telemetry_data}", True)
+        telemetry_queue.put(telemetry_data)
+        # Formatted only if emitted
+        if throttle.is_sampled("Sent telemetry data", LOG_SAMPLE_EVERY):
+            lazy_log.log_object(local_logger, logging.INFO, "Sent telemetry data", telemetry_data)
+
+        controller.wait_for_exit(0.1)
 
-        time.sleep(0.1)
+    profiler.stop()
+    throttle.flush()
 
     # Main loop: do work.
 
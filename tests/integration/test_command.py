@@ -17,6 +17,7 @@ from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
 from modules.telemetry import telemetry
 from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
 from utilities.workers import worker_controller
 
 
@@ -63,8 +64,8 @@ def read_queue(
     Read and print the output queue.
     """
     while not controller.is_exit_requested():
-        if not report_queue.queue.empty():
-            report = report_queue.queue.get()
+        if not report_queue.empty():
+            report = report_queue.get()
             if report:
                 main_logger.info(f"Command Report: {report}", True)  # added Logger (Review)
                 # Above line also fixes logging error in which previously it did not log the change in yaw and change in altitude
@@ -85,7 +86,7 @@ def put_queue(
             break
         if telemetry_data is None:
             continue
-        telemetry_queue.queue.put(telemetry_data)
+        telemetry_queue.put(telemetry_data)
         time.sleep(TELEMETRY_PERIOD)
 
 
@@ -120,6 +121,7 @@ def main() -> int:
 
     report_queue = queue_proxy_wrapper.QueueProxyWrapper(mp_manage, 10)
     telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(mp_manage, 10)
+    telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
 
     path = [
         telemetry.TelemetryData(x=0, y=0, z=29, yaw=0, x_velocity=0, y_velocity=0, z_velocity=4),
@@ -207,7 +209,16 @@ def main() -> int:
     threading.Thread(target=put_queue, args=(telemetry_queue, controller, path)).start()
     threading.Thread(target=read_queue, args=(report_queue, controller, main_logger)).start()
 
-    command_worker.command_worker(connection, TARGET, telemetry_queue, report_queue, controller)
+    command_worker.command_worker(
+        connection,
+        TARGET,
+        telemetry_selector,
+        None,
+        None,
+        telemetry_queue,
+        report_queue,
+        controller,
+    )
     return 0
 
 
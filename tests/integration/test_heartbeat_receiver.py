@@ -70,8 +70,8 @@ def read_queue(
     """
     # Fixed log issue to show more connected and disconnected drone status logs in main.log (Review)
     while not controller.is_exit_requested():
-        if not report_queue.queue.empty():
-            status = report_queue.queue.get()
+        if not report_queue.empty():
+            status = report_queue.get()
             main_logger.info(f"Drone status: {status}", True)
         time.sleep(0.1)
 
@@ -142,6 +142,7 @@ def main() -> int:
 
     heartbeat_receiver_worker.heartbeat_receiver_worker(
         connection,
+        None,
         report_queue,
         controller,
     )
@@ -104,6 +104,7 @@ def main() -> int:
 
     heartbeat_sender_worker.heartbeat_sender_worker(
         connection,
+        None,
         controller,
     )  # Place your own arguments here
 
@@ -0,0 +1,223 @@
+"""
+Test that every worker, and the whole bootcamp_main topology, stays quiet against an idle drone:
+CPU and resident memory of each process over a window are within budget.
+"""
+
+import multiprocessing as mp
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+from pymavlink import mavutil
+
+import bootcamp_main
+from benchmarks import benchmark_utils
+from modules.command import command
+from modules.command import command_worker
+from modules.heartbeat import heartbeat_receiver_worker
+from modules.heartbeat import heartbeat_sender_worker
+from modules.telemetry import telemetry_worker
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+# Worker tests use their own port, bootcamp_main connects to its own
+WORKER_DRONE_CONNECTION_STRING = "tcpin:localhost:12349"
+WORKER_CONNECTION_STRING = "tcp:localhost:12349"
+MAIN_DRONE_CONNECTION_STRING = "tcpin:localhost:12345"
+
+HEARTBEAT_PERIOD = 1.0  # seconds
+QUEUE_SIZE = 10
+TARGET = command.Position(10, 20, 30)
+
+# Time for the drone to listen, and for workers to set up before measuring
+DRONE_START_DELAY = 0.5  # seconds
+WORKER_SETTLE_PERIOD = 1.0  # seconds
+# bootcamp_main waits for the first telemetry, which an idle drone never sends
+MAIN_SETTLE_PERIOD = bootcamp_main.FIRST_TELEMETRY_TIMEOUT + 3.0  # seconds
+MEASURE_PERIOD = 3.0  # seconds
+EXIT_TIMEOUT = 5.0  # seconds
+
+# Budgets of an idle process, CPU in percent of a core
+WORKER_CPU_BUDGET = 5.0
+WORKER_RSS_BUDGET = 100 * 2**20  # bytes
+TOPOLOGY_CPU_BUDGET = 10.0
+
+WORKER_NAMES = ["heartbeat_sender", "heartbeat_receiver", "telemetry", "command"]
+
+
+def run_idle_drone(connection_string: str) -> None:
+    """
+    Drone which is connected but idle: accepts the ground station and sends only heartbeats,
+    reading and discarding everything the ground station sends.
+    """
+    connection = mavutil.mavlink_connection(connection_string, source_system=1, source_component=0)
+
+    next_heartbeat_time = time.monotonic()
+    while True:
+        # Also accepts the ground station once it connects
+        while connection.recv_match(blocking=False) is not None:
+            pass
+
+        if time.monotonic() >= next_heartbeat_time:
+            connection.mav.heartbeat_send(
+                mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+            )
+            next_heartbeat_time += HEARTBEAT_PERIOD
+
+        connection.select(max(next_heartbeat_time - time.monotonic(), 0.0))
+
+
+def start_drone(connection_string: str) -> mp.Process:
+    """
+    Starts the idle drone and waits for it to listen.
+    """
+    drone = mp.Process(target=run_idle_drone, args=(connection_string,), daemon=True)
+    drone.start()
+    time.sleep(DRONE_START_DELAY)
+    return drone
+
+
+def measure(pids: "list[int]") -> "dict[int, tuple[float, int]]":
+    """
+    Samples the processes over MEASURE_PERIOD.
+
+    Returns the CPU percent of a core and the resident set size in bytes, by process ID.
+    """
+    start_cpu_times = {pid: benchmark_utils.process_cpu_time(pid) for pid in pids}
+    start_time = time.monotonic()
+    time.sleep(MEASURE_PERIOD)
+    duration = time.monotonic() - start_time
+
+    return {
+        pid: (
+            (benchmark_utils.process_cpu_time(pid) - start_cpu_times[pid]) / duration * 100.0,
+            benchmark_utils.process_memory(pid)[0],
+        )
+        for pid in pids
+    }
+
+
+def create_worker(
+    worker_name: str,
+    connection: mavutil.mavfile,
+    controller: worker_controller.WorkerController,
+) -> mp.Process:
+    """
+    Creates a worker process with the arguments bootcamp_main passes it, without logging to main.
+    """
+    report_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_backends.QueueBackend.PIPE
+    )
+    telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_backends.QueueBackend.PIPE
+    )
+
+    if worker_name == "heartbeat_sender":
+        target = heartbeat_sender_worker.heartbeat_sender_worker
+        args: tuple = (connection, None, controller)
+    elif worker_name == "heartbeat_receiver":
+        target = heartbeat_receiver_worker.heartbeat_receiver_worker
+        args = (connection, None, report_queue, controller)
+    elif worker_name == "telemetry":
+        target = telemetry_worker.telemetry_worker
+        args = (connection, None, telemetry_queue, controller)
+    else:
+        target = command_worker.command_worker
+        telemetry_selector = queue_select.QueueSelector([telemetry_queue], controller)
+        args = (
+            connection,
+            TARGET,
+            telemetry_selector,
+            None,
+            None,
+            telemetry_queue,
+            report_queue,
+            controller,
+        )
+
+    return mp.Process(target=target, args=args)
+
+
+@pytest.mark.skipif(not pathlib.Path("/proc/self/stat").exists(), reason="Reads /proc (Linux)")
+@pytest.mark.parametrize("worker_name", WORKER_NAMES)
+def test_worker_idle(worker_name: str) -> None:
+    """
+    Worker uses little CPU and memory when no telemetry arrives.
+    """
+    # Setup
+    drone = start_drone(WORKER_DRONE_CONNECTION_STRING)
+    connection = mavutil.mavlink_connection(WORKER_CONNECTION_STRING)
+    controller = worker_controller.WorkerController()
+    worker = create_worker(worker_name, connection, controller)
+    worker.start()
+    time.sleep(WORKER_SETTLE_PERIOD)
+
+    # Run
+    assert worker.pid is not None
+    cpu_percent, rss = measure([worker.pid])[worker.pid]
+    is_alive = worker.is_alive()
+
+    controller.request_exit()
+    worker.join(EXIT_TIMEOUT)
+    if worker.is_alive():
+        worker.kill()
+        worker.join()
+
+    connection.close()
+    drone.terminate()
+    drone.join()
+
+    # Test
+    assert is_alive
+    assert cpu_percent <= WORKER_CPU_BUDGET, f"{worker_name} used {cpu_percent:.1f}% CPU"
+    assert rss <= WORKER_RSS_BUDGET, f"{worker_name} used {rss / 2**20:.0f} MiB"
+
+
+@pytest.mark.skipif(not pathlib.Path("/proc/self/stat").exists(), reason="Reads /proc (Linux)")
+def test_topology_idle() -> None:
+    """
+    bootcamp_main with all its workers uses little CPU and memory when no telemetry arrives.
+    """
+    # Setup
+    drone = start_drone(MAIN_DRONE_CONNECTION_STRING)
+    # Own process group, so that its workers are stopped with it
+    main_process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "bootcamp_main.py"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    time.sleep(MAIN_SETTLE_PERIOD)
+
+    # Run
+    is_running = main_process.poll() is None
+    pids = [main_process.pid] + benchmark_utils.descendant_processes(main_process.pid)
+    samples = measure(pids)
+
+    os.killpg(main_process.pid, signal.SIGKILL)
+    main_process.wait(EXIT_TIMEOUT)
+    drone.terminate()
+    drone.join()
+
+    # Test
+    assert is_running
+    # Main, and a process for each of the workers except the heartbeat sender thread
+    assert len(pids) >= len(WORKER_NAMES)
+    for pid, (cpu_percent, rss) in samples.items():
+        assert cpu_percent <= WORKER_CPU_BUDGET, f"Process {pid} used {cpu_percent:.1f}% CPU"
+        assert rss <= WORKER_RSS_BUDGET, f"Process {pid} used {rss / 2**20:.0f} MiB"
+
+    total_cpu_percent = sum(cpu_percent for cpu_percent, _ in samples.values())
+    assert total_cpu_percent <= TOPOLOGY_CPU_BUDGET, f"Used {total_cpu_percent:.1f}% CPU in total"
@@ -65,8 +65,8 @@ def read_queue(
     Read and print the output queue.
     """
     while not controller.is_exit_requested():
-        if not telemetry_queue.queue.empty():
-            telemetry_data = telemetry_queue.queue.get()
+        if not telemetry_queue.empty():
+            telemetry_data = telemetry_queue.get()
             main_logger.info(f"Received telemetry data: {telemetry_data}", True)
         time.sleep(0.1)
 
@@ -135,7 +135,7 @@ def main() -> int:
     # Read the main queue (worker outputs)
     threading.Thread(target=read_queue, args=(telemetry_queue, controller, main_logger)).start()
 
-    telemetry_worker.telemetry_worker(connection, telemetry_queue, controller)
+    telemetry_worker.telemetry_worker(connection, None, telemetry_queue, controller)
     # =============================================================================================
     #                          ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
     # =============================================================================================
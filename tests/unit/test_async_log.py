@@ -0,0 +1,204 @@
+"""
+Test AsyncLogWriter.
+"""
+
+import json
+import logging
+import multiprocessing as mp
+import pathlib
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import async_log
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+STOP_TIMEOUT = 2.0  # seconds
+WORKER_TIMEOUT = 5.0  # seconds
+
+
+def create_file_logger(name: str, path: pathlib.Path) -> logger.Logger:
+    """
+    Logger which writes only to the file, like a worker logger.
+    """
+    result, file_logger = logger.Logger.create(name, False)
+    assert result
+    assert file_logger is not None
+
+    # Only the file is checked
+    file_logger.logger.propagate = False
+    for handler in list(file_logger.logger.handlers):
+        file_logger.logger.removeHandler(handler)
+
+    file_handler = logging.FileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    file_logger.logger.addHandler(file_handler)
+    return file_logger
+
+
+def log_messages(worker_logger: logger.Logger, count: int, padding: str = "") -> None:
+    """
+    Worker which logs numbered messages.
+    """
+    for index in range(count):
+        worker_logger.info(f"message {index}{padding}", False)
+
+
+@pytest.fixture()
+def main_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for writer errors.
+    """
+    result, test_logger = logger.Logger.create("test_async_log", False)
+    assert result
+    assert test_logger is not None
+
+    yield test_logger  # type: ignore
+
+
+def test_records_written_in_order(main_logger: logger.Logger, tmp_path: pathlib.Path) -> None:
+    """
+    Records of a worker process are appended to its file by the writer.
+    """
+    # Setup
+    path = tmp_path / "worker.log"
+    worker_logger = create_file_logger("test_async_log_in_order", path)
+    result, writer = async_log.AsyncLogWriter.create(main_logger, flush_period=0.01)
+    assert result
+    assert writer is not None
+
+    # Run
+    writer.redirect(worker_logger)
+    writer.start()
+    worker = mp.Process(target=log_messages, args=(worker_logger, 50))
+    worker.start()
+    worker.join()
+    is_stopped = writer.stop(STOP_TIMEOUT)
+
+    # Test
+    assert is_stopped
+    assert not any(
+        isinstance(handler, logging.FileHandler) for handler in worker_logger.logger.handlers
+    )
+    assert path.read_text(encoding="utf-8").splitlines() == [
+        f"INFO message {index}" for index in range(50)
+    ]
+    assert writer.get_drop_count() == 0
+
+
+def test_full_queue_drops(main_logger: logger.Logger, tmp_path: pathlib.Path) -> None:
+    """
+    Records which do not fit are dropped and counted without blocking the worker.
+    """
+    # Setup
+    path = tmp_path / "worker.log"
+    worker_logger = create_file_logger("test_async_log_drops", path)
+    result, writer = async_log.AsyncLogWriter.create(main_logger, maxsize=2)
+    assert result
+    assert writer is not None
+    writer.redirect(worker_logger)
+
+    # Run
+    log_messages(worker_logger, 5)
+    writer.start()
+    is_stopped = writer.stop(STOP_TIMEOUT)
+
+    # Test
+    assert is_stopped
+    assert writer.get_drop_count() == 3
+    assert path.read_text(encoding="utf-8").splitlines() == ["INFO message 0", "INFO message 1"]
+
+
+def test_stalled_writer_drops(main_logger: logger.Logger, tmp_path: pathlib.Path) -> None:
+    """
+    Worker logging more than fits while the writer is stalled finishes, with the rest dropped.
+    """
+    # Setup
+    path = tmp_path / "worker.log"
+    worker_logger = create_file_logger("test_async_log_stalled", path)
+    result, writer = async_log.AsyncLogWriter.create(main_logger, maxsize=200)
+    assert result
+    assert writer is not None
+    writer.redirect(worker_logger)
+
+    # Run
+    worker = mp.Process(target=log_messages, args=(worker_logger, 400, " " * 300))
+    worker.start()
+    worker.join(WORKER_TIMEOUT)
+    is_worker_blocked = worker.is_alive()
+    if is_worker_blocked:
+        worker.kill()
+        worker.join()
+    writer.start()
+    is_stopped = writer.stop(STOP_TIMEOUT)
+
+    # Test
+    assert not is_worker_blocked
+    assert is_stopped
+    assert writer.get_drop_count() == 200
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 200
+
+
+def test_long_line_truncated(main_logger: logger.Logger, tmp_path: pathlib.Path) -> None:
+    """
+    Line longer than a record is cut rather than dropped.
+    """
+    # Setup
+    path = tmp_path / "worker.log"
+    worker_logger = create_file_logger("test_async_log_truncated", path)
+    result, writer = async_log.AsyncLogWriter.create(main_logger, max_record_size=256)
+    assert result
+    assert writer is not None
+    writer.redirect(worker_logger)
+
+    # Run
+    writer.start()
+    log_messages(worker_logger, 1, "x" * 1000)
+    is_stopped = writer.stop(STOP_TIMEOUT)
+    line = path.read_text(encoding="utf-8").rstrip("\n")
+
+    # Test
+    assert is_stopped
+    assert writer.get_drop_count() == 0
+    assert line.startswith("INFO message 0xxx")
+    assert line.endswith(async_log.TRUNCATION_MARK)
+    assert len(line) < 256
+
+
+def test_structured(main_logger: logger.Logger, tmp_path: pathlib.Path) -> None:
+    """
+    Structured writer writes JSON lines.
+    """
+    # Setup
+    path = tmp_path / "worker.log"
+    worker_logger = create_file_logger("test_async_log_structured", path)
+    result, writer = async_log.AsyncLogWriter.create(main_logger, is_structured=True)
+    assert result
+    assert writer is not None
+    writer.redirect(worker_logger)
+
+    # Run
+    writer.start()
+    log_messages(worker_logger, 1)
+    is_stopped = writer.stop(STOP_TIMEOUT)
+    record = json.loads(path.read_text(encoding="utf-8"))
+
+    # Test
+    assert is_stopped
+    assert record["level"] == "INFO"
+    assert record["message"] == "message 0"
+
+
+def test_create_invalid(main_logger: logger.Logger) -> None:
+    """
+    Queue size and batch size must be positive.
+    """
+    result, writer = async_log.AsyncLogWriter.create(main_logger, maxsize=0)
+
+    assert not result
+    assert writer is None
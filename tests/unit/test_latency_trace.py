@@ -0,0 +1,116 @@
+"""
+Test latency tracing.
+"""
+
+import multiprocessing as mp
+
+import pytest
+
+from utilities.workers import latency_trace
+from utilities.workers import queue_statistics
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+def create_trace(is_sent: bool) -> latency_trace.TraceContext:
+    """
+    Trace whose stages take 1, 2, 4, 8 and 16 milliseconds.
+    """
+    trace = latency_trace.TraceContext(10.000, 10.001)
+    trace.assembled = 10.003
+    trace.dequeued = 10.007
+    trace.decided = 10.015
+    if is_sent:
+        trace.sent = 10.031
+
+    return trace
+
+
+def record_traces(latency_statistics: latency_trace.LatencyStatistics, count: int) -> None:
+    """
+    Worker which closes traces of sent commands.
+    """
+    for _ in range(count):
+        latency_statistics.record(create_trace(True))
+
+
+@pytest.fixture()
+def latency_statistics() -> latency_trace.LatencyStatistics:  # type: ignore
+    """
+    Empty statistics.
+    """
+    yield latency_trace.LatencyStatistics()  # type: ignore
+
+
+def test_latencies_by_stage() -> None:
+    """
+    Each stage is the time between its stamps, end to end only if a command was sent.
+    """
+    # Run
+    sent_latencies = create_trace(True).get_latencies()
+    unsent_latencies = create_trace(False).get_latencies()
+
+    # Test
+    assert sent_latencies == pytest.approx([0.001, 0.002, 0.004, 0.008, 0.016, 0.031])
+    assert unsent_latencies[:4] == pytest.approx([0.001, 0.002, 0.004, 0.008])
+    assert unsent_latencies[4:] == [None, None]
+
+
+def test_summary_of_other_processes(latency_statistics: latency_trace.LatencyStatistics) -> None:
+    """
+    Traces recorded by worker processes are summed by stage in main.
+    """
+    # Setup
+    workers = [mp.Process(target=record_traces, args=(latency_statistics, 10)) for _ in range(2)]
+
+    # Run
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    latency_statistics.record(create_trace(False))
+    summary = latency_statistics.get_summary()
+
+    # Test
+    assert list(summary) == list(latency_trace.STAGES)
+    assert summary["decode"].count == 21
+    assert summary["send"].count == 20
+    assert summary["end to end"].count == 20
+    assert summary["queue wait"].mean() == pytest.approx(0.004, abs=2e-6)
+    # 31 ms is in the bucket below 2**15 microseconds
+    assert summary["end to end"].percentile(0.99) == pytest.approx(2**15 / 1e6)
+
+
+def test_more_processes_than_slots(latency_statistics: latency_trace.LatencyStatistics) -> None:
+    """
+    Traces of more worker processes than slots, such as restarted workers, are all counted.
+    """
+    # Setup
+    worker_count = queue_statistics.MAX_SLOTS * 2
+
+    # Run
+    for _ in range(worker_count):
+        worker = mp.Process(target=record_traces, args=(latency_statistics, 10))
+        worker.start()
+        worker.join()
+    summary = latency_statistics.get_summary()
+    slot_values = latency_statistics._LatencyStatistics__slot_counters.get_slot_values()
+
+    # Test
+    assert summary["end to end"].count == worker_count * 10
+    # Every worker reused the slot of an exited one, none shared the last
+    assert not any(slot_values[-1])
+
+
+def test_empty(latency_statistics: latency_trace.LatencyStatistics) -> None:
+    """
+    Stages without traces summarize to zero.
+    """
+    summary = latency_statistics.get_summary()
+
+    assert summary["send"].count == 0
+    assert summary["send"].mean() == 0.0
+    assert summary["send"].percentile(0.99) == 0.0
@@ -0,0 +1,146 @@
+"""
+Test lazy and structured log messages.
+"""
+
+import json
+import logging
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import lazy_log
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+class CountedValue:
+    """
+    Counts how often it is formatted.
+    """
+
+    def __init__(self) -> None:
+        self.format_count = 0
+
+    def __format__(self, format_spec: str) -> str:
+        self.format_count += 1
+        return "value"
+
+
+class Reading:
+    """
+    Object with raw attributes, like TelemetryData.
+    """
+
+    def __init__(self) -> None:
+        self.x = 1.5
+        self.system_id = 2
+
+    def __str__(self) -> str:
+        return f"x: {self.x}, system_id: {self.system_id}"
+
+
+class RecordingHandler(logging.Handler):
+    """
+    Formats and keeps every record it emits.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: "list[str]" = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture()
+def test_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger at INFO with only a recording handler.
+    """
+    result, new_logger = logger.Logger.create("test_lazy_log", False)
+    assert result
+    assert new_logger is not None
+
+    new_logger.logger.propagate = False
+    for handler in list(new_logger.logger.handlers):
+        new_logger.logger.removeHandler(handler)
+
+    new_logger.logger.setLevel(logging.INFO)
+    yield new_logger  # type: ignore
+
+
+def test_disabled_level_not_formatted(test_logger: logger.Logger) -> None:
+    """
+    Messages below the level of the logger are never formatted.
+    """
+    # Setup
+    handler = RecordingHandler()
+    test_logger.logger.addHandler(handler)
+    value = CountedValue()
+
+    # Run
+    lazy_log.log(test_logger, logging.DEBUG, "Value: {}", value)
+
+    # Test
+    assert value.format_count == 0
+    assert len(handler.lines) == 0
+
+
+def test_formatted_once_with_frame_info(test_logger: logger.Logger) -> None:
+    """
+    Emitted message is formatted once for all handlers, with the caller's frame information.
+    """
+    # Setup
+    handlers = [RecordingHandler(), RecordingHandler()]
+    for handler in handlers:
+        test_logger.logger.addHandler(handler)
+    value = CountedValue()
+
+    # Run
+    lazy_log.log(test_logger, logging.INFO, "Value: {}", value)
+
+    # Test
+    assert value.format_count == 1
+    assert handlers[0].lines == handlers[1].lines
+    assert handlers[0].lines[0].endswith("Value: value")
+    assert "test_formatted_once_with_frame_info" in handlers[0].lines[0]
+
+
+def test_object_as_text(test_logger: logger.Logger) -> None:
+    """
+    Object is formatted with its string conversion after the event.
+    """
+    # Setup
+    handler = RecordingHandler()
+    test_logger.logger.addHandler(handler)
+
+    # Run
+    lazy_log.log_object(test_logger, logging.INFO, "Reading", Reading(), False)
+
+    # Test
+    assert handler.lines == ["Reading: x: 1.5, system_id: 2"]
+
+
+def test_structured(test_logger: logger.Logger) -> None:
+    """
+    Structured formatter keeps the raw attribute values of the object.
+    """
+    # Setup
+    handler = RecordingHandler()
+    handler.setFormatter(lazy_log.StructuredFormatter())
+    test_logger.logger.addHandler(handler)
+
+    # Run
+    lazy_log.log_object(test_logger, logging.INFO, "Reading", Reading())
+    lazy_log.log(test_logger, logging.WARNING, "Count: {}", 3)
+    records = [json.loads(line) for line in handler.lines]
+
+    # Test
+    assert records[0]["event"] == "Reading"
+    assert records[0]["x"] == 1.5
+    assert records[0]["system_id"] == 2
+    assert records[1]["level"] == "WARNING"
+    assert records[1]["message"] == "Count: 3"
@@ -0,0 +1,130 @@
+"""
+Test LogThrottle.
+"""
+
+import logging
+import time
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import log_throttle
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+SUMMARY_PERIOD = 0.05  # seconds
+
+
+class RecordingHandler(logging.Handler):
+    """
+    Keeps the message of every record it emits.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: "list[str]" = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(record.getMessage())
+
+
+@pytest.fixture()
+def handler() -> RecordingHandler:  # type: ignore
+    """
+    Handler of the test logger.
+    """
+    yield RecordingHandler()  # type: ignore
+
+
+@pytest.fixture()
+def throttle(handler: RecordingHandler) -> log_throttle.LogThrottle:  # type: ignore
+    """
+    Throttle logging to the handler only, at INFO.
+    """
+    result, test_logger = logger.Logger.create("test_log_throttle", False)
+    assert result
+    assert test_logger is not None
+
+    test_logger.logger.propagate = False
+    for existing_handler in list(test_logger.logger.handlers):
+        test_logger.logger.removeHandler(existing_handler)
+
+    test_logger.logger.addHandler(handler)
+    test_logger.logger.setLevel(logging.INFO)
+    yield log_throttle.LogThrottle(test_logger, SUMMARY_PERIOD)  # type: ignore
+
+
+def test_repeat_summarized(throttle: log_throttle.LogThrottle, handler: RecordingHandler) -> None:
+    """
+    First occurrence is logged, the rest are counted into a summary after the period.
+    """
+    # Setup
+    for _ in range(100):
+        throttle.repeat(logging.INFO, "Heartbeat sent", False)
+
+    time.sleep(SUMMARY_PERIOD)
+
+    # Run
+    throttle.repeat(logging.INFO, "Heartbeat sent", False)
+
+    # Test
+    assert len(handler.lines) == 2
+    assert handler.lines[0] == "Heartbeat sent"
+    assert handler.lines[1].startswith("Heartbeat sent x100 in last ")
+
+
+def test_state_changes_always_logged(
+    throttle: log_throttle.LogThrottle, handler: RecordingHandler
+) -> None:
+    """
+    Every change is logged, after the count of the previous state.
+    """
+    # Run
+    for status in ["Connected"] * 3 + ["Disconnected", "Connected"]:
+        throttle.state(logging.INFO, "Status", status, False)
+
+    # Test
+    assert handler.lines[0] == "Status: Connected"
+    assert handler.lines[1].startswith("Status: Connected x2 in last ")
+    assert handler.lines[2:] == ["Status: Disconnected", "Status: Connected"]
+
+
+def test_flush(throttle: log_throttle.LogThrottle, handler: RecordingHandler) -> None:
+    """
+    Pending counts are logged on flush at their level, messages without repeats are not logged
+    again.
+    """
+    # Setup
+    throttle.repeat(logging.INFO, "Received heartbeat", False)
+    throttle.repeat(logging.INFO, "Received heartbeat", False)
+    throttle.repeat(logging.WARNING, "Missed heartbeat", False)
+
+    # Run
+    throttle.flush()
+
+    # Test
+    assert len(handler.lines) == 3
+    assert handler.lines[2].startswith("Received heartbeat x1 in last ")
+
+
+def test_sampled() -> None:
+    """
+    First and then every Nth occurrence of each key is sampled.
+    """
+    # Setup
+    result, test_logger = logger.Logger.create("test_log_throttle_sampled", False)
+    assert result
+    assert test_logger is not None
+    throttle = log_throttle.LogThrottle(test_logger)
+
+    # Run
+    samples = [throttle.is_sampled("Sent telemetry data", 10) for _ in range(25)]
+    other_sample = throttle.is_sampled("TelemetryData created", 10)
+
+    # Test
+    assert [index for index, is_sampled in enumerate(samples) if is_sampled] == [0, 10, 20]
+    assert other_sample
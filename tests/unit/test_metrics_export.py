@@ -0,0 +1,159 @@
+"""
+Test the metrics endpoint.
+"""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import latency_trace
+from utilities.workers import metrics_export
+from utilities.workers import queue_statistics
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+SCRAPE_TIMEOUT = 5.0  # seconds
+
+
+def fail_to_collect() -> str:
+    """
+    Collector which fails.
+    """
+    raise ValueError("test failure")
+
+
+def scrape(exporter: metrics_export.MetricsExporter, path: str) -> str:
+    """
+    Returns the body served on the path.
+    """
+    url = f"http://127.0.0.1:{exporter.get_port()}{path}"
+    with urllib.request.urlopen(url, timeout=SCRAPE_TIMEOUT) as response:
+        return response.read().decode()
+
+
+@pytest.fixture()
+def test_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for the exporter.
+    """
+    result, test_logger = logger.Logger.create("test_metrics_export", False)
+    assert result
+    assert test_logger is not None
+
+    yield test_logger  # type: ignore
+
+
+def test_format_histogram() -> None:
+    """
+    Buckets are cumulative with upper bounds in seconds, the last has none.
+    """
+    # Setup
+    histogram = [0] * queue_statistics.RESIDENCE_BUCKET_COUNT
+    histogram[0] = 1
+    histogram[2] = 2
+    histogram[-1] = 1
+
+    # Run
+    actual = metrics_export.format_histogram(
+        "test_seconds", "Test.", [({"stage": "queue wait"}, histogram, 1.5)]
+    ).splitlines()
+
+    # Test
+    assert actual[0] == "# HELP bootcamp_test_seconds Test."
+    assert actual[1] == "# TYPE bootcamp_test_seconds histogram"
+    assert 'bootcamp_test_seconds_bucket{stage="queue wait",le="1e-06"} 1' in actual
+    assert 'bootcamp_test_seconds_bucket{stage="queue wait",le="2e-06"} 1' in actual
+    assert 'bootcamp_test_seconds_bucket{stage="queue wait",le="4e-06"} 3' in actual
+    assert 'bootcamp_test_seconds_bucket{stage="queue wait",le="+Inf"} 4' in actual
+    assert 'bootcamp_test_seconds_sum{stage="queue wait"} 1.5' in actual
+    assert 'bootcamp_test_seconds_count{stage="queue wait"} 4' in actual
+    assert len(actual) == 2 + queue_statistics.RESIDENCE_BUCKET_COUNT + 2
+
+
+def test_serves_collectors(test_logger: logger.Logger) -> None:
+    """
+    A scrape returns the output of every collector, and values set since the previous scrape.
+    """
+    # Setup
+    latency_statistics = latency_trace.LatencyStatistics()
+    trace = latency_trace.TraceContext(10.000, 10.001)
+    trace.assembled = 10.002
+    trace.dequeued = 10.003
+    trace.decided = 10.004
+    trace.sent = 10.005
+    latency_statistics.record(trace)
+
+    main_metrics = metrics_export.MetricValues()
+    main_metrics.declare("command_reports_total", "counter", "Test counter.")
+
+    result, exporter = metrics_export.MetricsExporter.create(
+        0,
+        [lambda: metrics_export.collect_latency(latency_statistics), main_metrics.collect],
+        test_logger,
+    )
+    assert result
+    assert exporter is not None
+    exporter.start()
+
+    # Run
+    first_body = scrape(exporter, metrics_export.METRICS_PATH)
+    main_metrics.increment("command_reports_total", 2)
+    second_body = scrape(exporter, metrics_export.METRICS_PATH)
+    exporter.stop()
+
+    # Test
+    assert 'bootcamp_latency_seconds_count{stage="end to end"} 1' in first_body
+    assert "# TYPE bootcamp_command_reports_total counter" in first_body
+    assert "bootcamp_command_reports_total 0\n" in first_body
+    assert "bootcamp_command_reports_total 2\n" in second_body
+
+
+def test_errors(test_logger: logger.Logger) -> None:
+    """
+    Unknown paths are not found, and a failing collector fails only the scrape.
+    """
+    # Setup
+    result, exporter = metrics_export.MetricsExporter.create(0, [fail_to_collect], test_logger)
+    assert result
+    assert exporter is not None
+    exporter.start()
+
+    # Run
+    with pytest.raises(urllib.error.HTTPError) as not_found:
+        scrape(exporter, "/")
+    with pytest.raises(urllib.error.HTTPError) as first_failure:
+        scrape(exporter, metrics_export.METRICS_PATH)
+    with pytest.raises(urllib.error.HTTPError) as second_failure:
+        scrape(exporter, metrics_export.METRICS_PATH)
+    exporter.stop()
+
+    # Test
+    assert not_found.value.code == 404
+    assert first_failure.value.code == 500
+    assert second_failure.value.code == 500
+
+
+def test_port_in_use(test_logger: logger.Logger) -> None:
+    """
+    Fails to create rather than raise if the port is taken.
+    """
+    # Setup
+    result, exporter = metrics_export.MetricsExporter.create(0, [], test_logger)
+    assert result
+    assert exporter is not None
+
+    # Run
+    result, second_exporter = metrics_export.MetricsExporter.create(
+        exporter.get_port(), [], test_logger
+    )
+    exporter.stop()
+
+    # Test
+    assert not result
+    assert second_exporter is None
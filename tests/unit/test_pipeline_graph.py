@@ -0,0 +1,312 @@
+"""
+Test PipelineGraph.
+"""
+
+import copy
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import pipeline_graph
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_controller
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+STAGE_TIMEOUT = 5.0  # seconds
+BATCH_SIZE = 8
+
+THIS_MODULE = "tests.unit.test_pipeline_graph"
+
+
+def increment_worker(
+    input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Puts each input plus one until asked to exit.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        for value in input_queue.get_many(BATCH_SIZE):
+            # Woken to exit once drained
+            if value is None:
+                continue
+
+            output_queue.put(value + 1)
+
+
+def double_worker(
+    input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Puts each input doubled until asked to exit.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        for value in input_queue.get_many(BATCH_SIZE):
+            if value is None:
+                continue
+
+            output_queue.put(value * 2)
+
+
+# Main puts into source_queue and reads sink_queue
+PIPELINE_CONFIG = {
+    "queues": {
+        "source_queue": {"maxsize": 10, "backend": "pipe"},
+        "middle_queue": {"maxsize": 10, "backend": "pipe"},
+        "sink_queue": {"maxsize": 10, "backend": "pipe"},
+    },
+    "stages": {
+        "increment": {
+            "target": f"{THIS_MODULE}.increment_worker",
+            "count": 1,
+            "mode": "thread",
+            "input_queues": ["source_queue"],
+            "output_queues": ["middle_queue"],
+        },
+        "double": {
+            "target": f"{THIS_MODULE}.double_worker",
+            "count": 1,
+            "mode": "thread",
+            "input_queues": ["middle_queue"],
+            "output_queues": ["sink_queue"],
+        },
+    },
+}
+
+
+@pytest.fixture()
+def local_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for the graph.
+    """
+    result, test_logger = logger.Logger.create("test_pipeline_graph", False)
+    assert result
+    assert test_logger is not None
+
+    yield test_logger  # type: ignore
+
+
+@pytest.fixture()
+def pipeline_config() -> dict:  # type: ignore
+    """
+    Copy of the test pipeline, for tests to modify.
+    """
+    yield copy.deepcopy(PIPELINE_CONFIG)  # type: ignore
+
+
+def create_graph(
+    pipeline_config: dict, local_logger: logger.Logger
+) -> "pipeline_graph.PipelineGraph | None":
+    """
+    Creates the graph without a manager.
+    """
+    result, graph = pipeline_graph.PipelineGraph.create(
+        pipeline_config, worker_controller.WorkerController(), None, local_logger
+    )
+    assert result == (graph is not None)
+    return graph
+
+
+class TestValidation:
+    """
+    Invalid configuration is rejected.
+    """
+
+    def test_valid(self, pipeline_config: dict, local_logger: logger.Logger) -> None:
+        """
+        Test pipeline is valid and creates its queues.
+        """
+        # Run
+        graph = create_graph(pipeline_config, local_logger)
+
+        # Test
+        assert graph is not None
+        assert graph.get_queue("middle_queue") is not None
+        assert graph.get_queue("unknown_queue") is None
+
+    def test_missing_section(self, pipeline_config: dict, local_logger: logger.Logger) -> None:
+        """
+        Both sections are required.
+        """
+        # Setup
+        del pipeline_config["stages"]
+
+        # Run
+        graph = create_graph(pipeline_config, local_logger)
+
+        # Test
+        assert graph is None
+
+    @pytest.mark.parametrize(
+        "queue_config",
+        [
+            {"backend": "pipe"},
+            {"maxsize": 10, "backend": "carrier_pigeon"},
+            {"maxsize": 10, "backend": "pipe", "overflow_policy": "ignore"},
+            {"maxsize": 10},
+            {"maxsize": 10, "backend": "simple_queue"},
+        ],
+    )
+    def test_invalid_queue(
+        self, pipeline_config: dict, local_logger: logger.Logger, queue_config: dict
+    ) -> None:
+        """
+        Missing maxsize, unknown values, a manager backend without a manager,
+        and a bounded queue on an unbounded backend.
+        """
+        # Setup
+        pipeline_config["queues"]["middle_queue"] = queue_config
+
+        # Run
+        graph = create_graph(pipeline_config, local_logger)
+
+        # Test
+        assert graph is None
+
+    def test_invalid_target(self, pipeline_config: dict, local_logger: logger.Logger) -> None:
+        """
+        Target must be an importable function.
+        """
+        # Setup
+        pipeline_config["stages"]["double"]["target"] = f"{THIS_MODULE}.missing_worker"
+
+        # Run
+        graph = create_graph(pipeline_config, local_logger)
+
+        # Test
+        assert graph is None
+
+    def test_undefined_queue(self, pipeline_config: dict, local_logger: logger.Logger) -> None:
+        """
+        Stages can only use queues defined in the queues section.
+        """
+        # Setup
+        pipeline_config["stages"]["double"]["output_queues"] = ["missing_queue"]
+
+        # Run
+        graph = create_graph(pipeline_config, local_logger)
+
+        # Test
+        assert graph is None
+
+    def test_cycle(self, pipeline_config: dict, local_logger: logger.Logger) -> None:
+        """
+        Stages feeding each other cannot be started downstream first.
+        """
+        # Setup
+        pipeline_config["stages"]["double"]["output_queues"] = ["source_queue"]
+
+        # Run
+        graph = create_graph(pipeline_config, local_logger)
+
+        # Test
+        assert graph is None
+
+    def test_work_arguments_for_unknown_stage(
+        self, pipeline_config: dict, local_logger: logger.Logger
+    ) -> None:
+        """
+        Work arguments must be for configured stages.
+        """
+        # Setup
+        graph = create_graph(pipeline_config, local_logger)
+        assert graph is not None
+
+        # Run
+        result = graph.create_stages({"triple": ()})
+
+        # Test
+        assert not result
+
+
+class TestOrder:
+    """
+    Stages are started downstream first.
+    """
+
+    def test_downstream_first(self, pipeline_config: dict, local_logger: logger.Logger) -> None:
+        """
+        Consumer stage comes before its producer regardless of configuration order.
+        """
+        # Setup
+        graph = create_graph(pipeline_config, local_logger)
+        assert graph is not None
+
+        # Run
+        result = graph.create_stages({})
+
+        # Test
+        assert result
+        assert [manager.get_target_name() for manager in graph.get_worker_managers()] == [
+            "double_worker",
+            "increment_worker",
+        ]
+
+    def test_independent_stages_keep_config_order(self) -> None:
+        """
+        Stages without a dependency between them keep the configuration order.
+        """
+        # Setup
+        stage_configs = {
+            "first": {"output_queues": ["first_queue"]},
+            "second": {"output_queues": ["second_queue"]},
+            "consumer": {"input_queues": ["first_queue"]},
+        }
+
+        # Run
+        result, order = pipeline_graph.PipelineGraph._PipelineGraph__downstream_first_order(
+            stage_configs
+        )
+
+        # Test
+        assert result
+        assert order == ["second", "consumer", "first"]
+
+
+def test_run_and_stop(pipeline_config: dict, local_logger: logger.Logger) -> None:
+    """
+    Items flow through every stage, and stopping drains the stages in order.
+    """
+    # Setup
+    graph = create_graph(pipeline_config, local_logger)
+    assert graph is not None
+    assert graph.create_stages({})
+    source_queue = graph.get_queue("source_queue")
+    sink_queue = graph.get_queue("sink_queue")
+    assert source_queue is not None and sink_queue is not None
+
+    # Run
+    graph.start()
+    assert graph.wait_until_ready(STAGE_TIMEOUT)
+    source_queue.put_many([1, 2, 3])
+    outputs = [sink_queue.get(timeout=STAGE_TIMEOUT) for _ in range(3)]
+    graph.stop(STAGE_TIMEOUT)
+
+    # Test
+    assert outputs == [4, 6, 8]
+    assert all(manager.join_workers(0.0) for manager in graph.get_worker_managers())
+
+
+@pytest.mark.parametrize(
+    "queue_configs,expected",
+    [
+        ({"a": {"maxsize": 1, "backend": "pipe"}}, False),
+        ({"a": {"maxsize": 1, "backend": "pipe"}, "b": {"maxsize": 1}}, True),
+        ({"a": {"maxsize": 1, "backend": "manager"}}, True),
+    ],
+)
+def test_requires_manager(queue_configs: dict, expected: bool) -> None:
+    """
+    Manager is only required by manager backed queues, which is the default backend.
+    """
+    assert pipeline_graph.requires_manager({"queues": queue_configs, "stages": {}}) == expected
@@ -0,0 +1,670 @@
+"""
+Test QueueProxyWrapper and its backends.
+"""
+
+import multiprocessing as mp
+import pickle
+import queue
+import time
+import typing
+
+import pytest
+
+from utilities.workers import out_of_band
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+QUEUE_MAX_SIZE = 4
+OUT_OF_BAND_THRESHOLD = 1024  # bytes
+
+BOUNDED_BACKENDS = [
+    queue_backends.QueueBackend.MANAGER,
+    queue_backends.QueueBackend.MP_QUEUE,
+    queue_backends.QueueBackend.PIPE,
+    queue_backends.QueueBackend.SHARED_MEMORY_RING,
+]
+
+
+class Frame:
+    """
+    Pickles its data as a buffer, like a NumPy array.
+    """
+
+    def __init__(self, data: "bytearray | memoryview") -> None:
+        self.data = data
+
+    def __reduce_ex__(self, protocol: "typing.SupportsIndex") -> "tuple":
+        if int(protocol) >= 5:
+            return Frame, (pickle.PickleBuffer(self.data),)
+
+        return Frame, (bytearray(self.data),)
+
+
+def segment_names() -> "set[str]":
+    """
+    Out-of-band segments which exist.
+    """
+    return {
+        path.name
+        for path in out_of_band.SEGMENT_DIRECTORY.iterdir()
+        if path.name.startswith(out_of_band.SEGMENT_PREFIX)
+    }
+
+
+@pytest.fixture(scope="module")
+def mp_manager() -> "mp.managers.SyncManager":  # type: ignore
+    """
+    Manager shared by all tests in this module.
+    """
+    manager = queue_backends.create_manager()
+    yield manager  # type: ignore
+    manager.shutdown()
+
+
+class TestBackends:
+    """
+    Same behaviour for every backend.
+    """
+
+    @pytest.mark.parametrize("backend", list(queue_backends.QueueBackend))
+    def test_put_get_in_order(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Items come out in the order they were put.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+        expected = [1, "two", (3.0, None)]
+
+        # Run
+        for item in expected:
+            wrapper.put(item)
+        actual = [wrapper.get(timeout=1.0) for _ in expected]
+
+        # Test
+        assert actual == expected
+
+    @pytest.mark.parametrize("backend", list(queue_backends.QueueBackend))
+    def test_get_empty_raises(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Get on an empty queue raises queue.Empty after the timeout.
+        """
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+
+        with pytest.raises(queue.Empty):
+            wrapper.get(timeout=0.01)
+
+        with pytest.raises(queue.Empty):
+            wrapper.get(False)
+
+    @pytest.mark.parametrize("backend", BOUNDED_BACKENDS)
+    def test_put_full_raises(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Put on a full queue raises queue.Full after the timeout.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+        for i in range(QUEUE_MAX_SIZE):
+            wrapper.put(i)
+
+        # Test
+        with pytest.raises(queue.Full):
+            wrapper.put(QUEUE_MAX_SIZE, timeout=0.01)
+
+    @pytest.mark.parametrize("backend", BOUNDED_BACKENDS)
+    def test_fill_and_drain(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Queue is empty after fill and drain.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+        wrapper.put(0)
+
+        # Run
+        wrapper.fill_and_drain_queue()
+
+        # Test
+        assert wrapper.empty()
+
+
+class TestBatches:
+    """
+    Batched put and get.
+    """
+
+    @pytest.mark.parametrize("backend", list(queue_backends.QueueBackend))
+    def test_put_many_get_many_in_order(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Batch comes out in order and get_many respects max_items.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+        expected = [0, 1, 2, 3]
+
+        # Run
+        put_count = wrapper.put_many(expected)
+        # Batches may be cut short by items still in flight (mp.Queue feeder thread)
+        batches = []
+        while sum(len(batch) for batch in batches) < len(expected):
+            batch = wrapper.get_many(3, timeout=1.0)
+            assert len(batch) > 0
+            batches.append(batch)
+
+        # Test
+        assert put_count == len(expected)
+        assert [item for batch in batches for item in batch] == expected
+        assert all(len(batch) <= 3 for batch in batches)
+
+    @pytest.mark.parametrize("backend", BOUNDED_BACKENDS)
+    def test_put_many_partial_when_full(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        put_many stops once the queue is full.
+        """
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+
+        put_count = wrapper.put_many(list(range(QUEUE_MAX_SIZE + 2)), timeout=0.01)
+
+        assert put_count == QUEUE_MAX_SIZE
+
+    @pytest.mark.parametrize("backend", list(queue_backends.QueueBackend))
+    def test_get_many_empty_returns_nothing(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        get_many on an empty queue returns an empty list after the timeout.
+        """
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_MAX_SIZE, backend)
+
+        assert wrapper.get_many(QUEUE_MAX_SIZE, timeout=0.01) == []
+
+
+class TestOverflowPolicies:
+    """
+    Blocking put into a full queue.
+    """
+
+    # mp.Queue is left out as its feeder thread makes the queue contents lag behind puts
+    BACKENDS = [
+        queue_backends.QueueBackend.MANAGER,
+        queue_backends.QueueBackend.PIPE,
+        queue_backends.QueueBackend.SHARED_MEMORY_RING,
+    ]
+
+    @staticmethod
+    def fill(
+        mp_manager: "mp.managers.SyncManager",
+        backend: queue_backends.QueueBackend,
+        policy: queue_proxy_wrapper.OverflowPolicy,
+        item_count: int,
+        **kwargs: object,
+    ) -> "tuple[queue_proxy_wrapper.QueueProxyWrapper, list[bool]]":
+        """
+        Puts items 0 to item_count - 1 into a new queue.
+
+        Returns the queue and whether each item was queued.
+        """
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            mp_manager, QUEUE_MAX_SIZE, backend, overflow_policy=policy, **kwargs  # type: ignore
+        )
+        is_queued = [wrapper.put(item) for item in range(item_count)]
+        return wrapper, is_queued
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_drop_newest(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Items put while full are dropped and counted.
+        """
+        # Run
+        wrapper, is_queued = TestOverflowPolicies.fill(
+            mp_manager, backend, queue_proxy_wrapper.OverflowPolicy.DROP_NEWEST, QUEUE_MAX_SIZE + 2
+        )
+
+        # Test
+        assert is_queued == [True] * QUEUE_MAX_SIZE + [False] * 2
+        assert wrapper.get_drop_count() == 2
+        assert wrapper.get_many(QUEUE_MAX_SIZE + 2, timeout=1.0) == list(range(QUEUE_MAX_SIZE))
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_drop_oldest(
+        self, mp_manager: "mp.managers.SyncManager", backend: queue_backends.QueueBackend
+    ) -> None:
+        """
+        Oldest items make space for new items and are counted.
+        """
+        # Run
+        wrapper, is_queued = TestOverflowPolicies.fill(
+            mp_manager, backend, queue_proxy_wrapper.OverflowPolicy.DROP_OLDEST, QUEUE_MAX_SIZE + 2
+        )
+
+        # Test
+        assert all(is_queued)
+        assert wrapper.get_drop_count() == 2
+        assert wrapper.get_many(QUEUE_MAX_SIZE + 2, timeout=1.0) == list(
+            range(2, QUEUE_MAX_SIZE + 2)
+        )
+
+    @pytest.mark.parametrize(
+        "backend",
+        [queue_backends.QueueBackend.PIPE, queue_backends.QueueBackend.SIMPLE_QUEUE],
+    )
+    @pytest.mark.parametrize(
+        "policy",
+        [
+            queue_proxy_wrapper.OverflowPolicy.DROP_NEWEST,
+            queue_proxy_wrapper.OverflowPolicy.DROP_OLDEST,
+        ],
+    )
+    def test_drop_when_pipe_full(
+        self, backend: queue_backends.QueueBackend, policy: queue_proxy_wrapper.OverflowPolicy
+    ) -> None:
+        """
+        Drop policies of pipe backends apply once the pipe is full, before the queue is.
+        """
+        # Setup
+        padding = bytes(1024)
+        item_count = queue_backends.PIPE_BUDGET // len(padding) * 2
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, item_count, backend, overflow_policy=policy
+        )
+
+        # Run
+        is_queued = [wrapper.put((index, padding)) for index in range(item_count)]
+        queued_count = wrapper.qsize()
+        actual = [index for index, _ in wrapper.get_many(item_count, timeout=1.0)]  # type: ignore
+
+        # Test
+        assert 0 < queued_count < item_count
+        assert wrapper.get_drop_count() == item_count - queued_count
+        if policy == queue_proxy_wrapper.OverflowPolicy.DROP_NEWEST:
+            assert is_queued == [True] * queued_count + [False] * (item_count - queued_count)
+            assert actual == list(range(queued_count))
+        else:
+            assert all(is_queued)
+            assert actual == list(range(item_count - queued_count, item_count))
+
+    def test_block_timeout_drops(self) -> None:
+        """
+        Item is dropped after waiting for the overflow timeout.
+        """
+        # Run
+        wrapper, is_queued = TestOverflowPolicies.fill(
+            None,  # type: ignore
+            queue_backends.QueueBackend.PIPE,
+            queue_proxy_wrapper.OverflowPolicy.BLOCK_TIMEOUT,
+            QUEUE_MAX_SIZE + 1,
+            overflow_timeout=0.01,
+        )
+
+        # Test
+        assert is_queued[-1] is False
+        assert wrapper.get_drop_count() == 1
+
+    def test_sample_every_n(self) -> None:
+        """
+        Every Nth overflowing item replaces the oldest, the others are dropped.
+        """
+        # Run
+        wrapper, is_queued = TestOverflowPolicies.fill(
+            None,  # type: ignore
+            queue_backends.QueueBackend.PIPE,
+            queue_proxy_wrapper.OverflowPolicy.SAMPLE_EVERY_N,
+            QUEUE_MAX_SIZE + 6,
+            sample_every=3,
+        )
+
+        # Test
+        assert is_queued == [True] * QUEUE_MAX_SIZE + [False, False, True, False, False, True]
+        assert wrapper.get_drop_count() == 6
+        assert wrapper.get_many(QUEUE_MAX_SIZE, timeout=1.0) == [2, 3, 6, 9]
+
+    def test_non_blocking_put_raises(self) -> None:
+        """
+        Policy does not apply to a non-blocking put.
+        """
+        wrapper, _ = TestOverflowPolicies.fill(
+            None,  # type: ignore
+            queue_backends.QueueBackend.PIPE,
+            queue_proxy_wrapper.OverflowPolicy.DROP_OLDEST,
+            QUEUE_MAX_SIZE,
+        )
+
+        with pytest.raises(queue.Full):
+            wrapper.put("item", block=False)
+
+
+class TestInstrumentation:
+    """
+    Statistics of an instrumented queue.
+    """
+
+    def test_items_are_unstamped(self) -> None:
+        """
+        Consumers get the items put, and sentinels which are not counted.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE, instrument=True
+        )
+
+        # Run
+        wrapper.put(1)
+        wrapper.put_many([2, 3])
+        wrapper.put_sentinel()
+        actual = [wrapper.get(timeout=1.0)] + wrapper.get_many(QUEUE_MAX_SIZE, timeout=1.0)
+        summary = wrapper.get_statistics()
+
+        # Test
+        assert actual == [1, 2, 3, None]
+        assert summary is not None
+        assert summary.put_count == 3
+        assert summary.get_count == 3
+
+    def test_statistics(self) -> None:
+        """
+        Counts, depth high water mark and residence time are recorded.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE, instrument=True
+        )
+
+        # Run
+        for item in range(3):
+            wrapper.put(item)
+        time.sleep(0.01)
+        wrapper.get_many(QUEUE_MAX_SIZE, timeout=1.0)
+        summary = wrapper.get_statistics()
+
+        # Test
+        assert summary is not None
+        assert summary.put_count == 3
+        assert summary.get_count == 3
+        assert summary.depth_high_water == 3
+        assert summary.mean_residence() >= 0.01
+        assert 0.01 <= summary.residence_percentile(0.99) < 0.04
+        assert summary.put_rate > 0.0
+
+    def test_interval_not_restarted(self) -> None:
+        """
+        Reading the counts without restarting the interval does not change the next rates.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE, instrument=True
+        )
+
+        # Run
+        for item in range(3):
+            wrapper.put(item)
+        read_summary = wrapper.get_statistics(False)
+        first_summary = wrapper.get_statistics()
+        second_summary = wrapper.get_statistics()
+
+        # Test
+        assert read_summary is not None
+        assert first_summary is not None
+        assert second_summary is not None
+        assert read_summary.put_count == 3
+        assert first_summary.put_rate > 0.0
+        assert second_summary.put_rate == 0.0
+
+    def test_not_instrumented(self) -> None:
+        """
+        No statistics by default.
+        """
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+
+        assert wrapper.get_statistics() is None
+
+
+class TestListeners:
+    """
+    Events set on put.
+    """
+
+    def test_every_put(self) -> None:
+        """
+        Listener is set after each put.
+        """
+        # Setup
+        event = mp.Event()
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        wrapper.add_listener(event)
+
+        # Run
+        wrapper.put(1)
+        is_set_after_first = event.is_set()
+        event.clear()
+        wrapper.put(2)
+
+        # Test
+        assert is_set_after_first
+        assert event.is_set()
+
+    def test_once(self) -> None:
+        """
+        One-shot listener is set after the first put only, also by a copy in a worker.
+        """
+        # Setup
+        event = mp.Event()
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        wrapper.add_listener(event, True)
+
+        # Run
+        producer = mp.Process(target=wrapper.put, args=(1,))
+        producer.start()
+        producer.join()
+        is_set_after_first = event.is_set()
+        event.clear()
+        wrapper.put(2)
+
+        # Test
+        assert is_set_after_first
+        assert not event.is_set()
+
+
+class TestOutOfBand:
+    """
+    Large buffers passed through shared memory segments.
+    """
+
+    @pytest.mark.parametrize(
+        "backend",
+        [queue_backends.QueueBackend.PIPE, queue_backends.QueueBackend.SHARED_MEMORY_RING],
+    )
+    def test_large_buffer(self, backend: queue_backends.QueueBackend) -> None:
+        """
+        Buffer larger than a ring slot arrives through a segment, which is removed on get.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None,
+            QUEUE_MAX_SIZE,
+            backend,
+            max_item_size=256,
+            instrument=True,
+            out_of_band_threshold=OUT_OF_BAND_THRESHOLD,
+        )
+        data = bytearray(range(256)) * 64
+        existing_names = segment_names()
+
+        # Run
+        wrapper.put(Frame(data))
+        queued_names = segment_names() - existing_names
+        actual = wrapper.get(timeout=1.0)
+
+        # Test
+        assert len(queued_names) == 1
+        assert isinstance(actual, Frame)
+        assert bytes(actual.data) == data
+        assert segment_names() - existing_names == set()
+
+    def test_small_buffer_in_band(self) -> None:
+        """
+        Buffers below the threshold and other items are queued in-band.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None,
+            QUEUE_MAX_SIZE,
+            queue_backends.QueueBackend.PIPE,
+            out_of_band_threshold=OUT_OF_BAND_THRESHOLD,
+        )
+        existing_names = segment_names()
+
+        # Run
+        wrapper.put_many([Frame(bytearray(16)), "item"])
+        queued_names = segment_names() - existing_names
+        actual = wrapper.get_many(QUEUE_MAX_SIZE, timeout=1.0)
+
+        # Test
+        assert queued_names == set()
+        assert bytes(actual[0].data) == bytes(16)  # type: ignore
+        assert actual[1] == "item"
+
+    def test_between_processes(self) -> None:
+        """
+        Consumer in another process gets the buffer.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None,
+            QUEUE_MAX_SIZE,
+            queue_backends.QueueBackend.PIPE,
+            out_of_band_threshold=OUT_OF_BAND_THRESHOLD,
+        )
+        data = bytearray(b"x") * (OUT_OF_BAND_THRESHOLD * 4)
+
+        # Run
+        producer = mp.Process(target=wrapper.put, args=(Frame(data),))
+        producer.start()
+        actual = wrapper.get(timeout=5.0)
+        producer.join()
+
+        # Test
+        assert bytes(actual.data) == data  # type: ignore
+
+    def test_dropped_item_segments_removed(self) -> None:
+        """
+        Segments of items dropped by the overflow policy or drained are removed.
+        """
+        # Setup
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None,
+            1,
+            queue_backends.QueueBackend.PIPE,
+            overflow_policy=queue_proxy_wrapper.OverflowPolicy.DROP_OLDEST,
+            out_of_band_threshold=OUT_OF_BAND_THRESHOLD,
+        )
+        existing_names = segment_names()
+
+        # Run
+        for _ in range(3):
+            wrapper.put(Frame(bytearray(OUT_OF_BAND_THRESHOLD)))
+        queued_names = segment_names() - existing_names
+        wrapper.drain_queue()
+
+        # Test
+        assert wrapper.get_drop_count() == 2
+        assert len(queued_names) == 1
+        assert segment_names() - existing_names == set()
+
+
+def test_shared_memory_ring_item_too_large() -> None:
+    """
+    Item larger than a slot is rejected.
+    """
+    wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+        None,
+        QUEUE_MAX_SIZE,
+        queue_backends.QueueBackend.SHARED_MEMORY_RING,
+        max_item_size=64,
+    )
+
+    with pytest.raises(ValueError):
+        wrapper.put(bytes(128))
+
+
+class TestPipeBudget:
+    """
+    Pipe backends raise queue.Full once the pipe is full, rather than block in the write.
+    """
+
+    @pytest.mark.parametrize(
+        "backend",
+        [queue_backends.QueueBackend.PIPE, queue_backends.QueueBackend.SIMPLE_QUEUE],
+    )
+    def test_full_pipe_raises(self, backend: queue_backends.QueueBackend) -> None:
+        """
+        Non-blocking and timed puts of large items raise queue.Full with free slots left,
+        and a get makes space again.
+        """
+        # Setup
+        item = bytes(1024)
+        item_count = queue_backends.PIPE_BUDGET // len(item) * 2
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(None, item_count, backend)
+
+        # Run
+        put_count = 0
+        with pytest.raises(queue.Full):
+            for _ in range(item_count):
+                wrapper.put(item, False)
+                put_count += 1
+        with pytest.raises(queue.Full):
+            wrapper.put(item, timeout=0.01)
+        wrapper.get(timeout=1.0)
+        wrapper.put(item, False)
+
+        # Test
+        assert 0 < put_count < item_count
+        assert wrapper.qsize() == put_count
+
+    def test_item_larger_than_budget(self) -> None:
+        """
+        Item larger than the budget is refused by a non-blocking put,
+        and a blocking put writes it for a reader in another process.
+        """
+        # Setup
+        item = bytes(queue_backends.PIPE_BUDGET * 2)
+        wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        result_queue = mp.Queue()
+        consumer = mp.Process(target=lambda: result_queue.put(wrapper.get(timeout=5.0)))
+
+        # Run
+        with pytest.raises(queue.Full):
+            wrapper.put(item, False)
+        consumer.start()
+        wrapper.put(item)
+        actual = result_queue.get(timeout=5.0)
+        consumer.join()
+
+        # Test
+        assert actual == item
+        assert wrapper.empty()
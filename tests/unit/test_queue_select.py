@@ -0,0 +1,96 @@
+"""
+Test QueueSelector.
+"""
+
+import threading
+import time
+
+import pytest
+
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import worker_controller
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+QUEUE_MAX_SIZE = 4
+
+
+@pytest.fixture()
+def queues() -> "list[queue_proxy_wrapper.QueueProxyWrapper]":  # type: ignore
+    """
+    Two pipe backed queues.
+    """
+    new_queues = [
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        for _ in range(2)
+    ]
+    yield new_queues  # type: ignore
+
+
+def test_returns_ready_queue(queues: "list[queue_proxy_wrapper.QueueProxyWrapper]") -> None:
+    """
+    Only the queue with data is returned.
+    """
+    # Setup
+    selector = queue_select.QueueSelector(queues)
+    queues[1].put("data")
+
+    # Run
+    ready = selector.wait(1.0)
+
+    # Test
+    assert ready == [queues[1]]
+
+
+def test_timeout(queues: "list[queue_proxy_wrapper.QueueProxyWrapper]") -> None:
+    """
+    Nothing is returned after the timeout.
+    """
+    selector = queue_select.QueueSelector(queues)
+
+    assert selector.wait(0.05) == []
+
+
+def test_wakes_on_put(queues: "list[queue_proxy_wrapper.QueueProxyWrapper]") -> None:
+    """
+    Waiting selector wakes as soon as data is put.
+    """
+    # Setup
+    selector = queue_select.QueueSelector(queues)
+    threading.Timer(0.05, queues[0].put, ("data",)).start()
+
+    # Run
+    start = time.monotonic()
+    ready = selector.wait(5.0)
+    elapsed = time.monotonic() - start
+
+    # Test
+    assert ready == [queues[0]]
+    assert elapsed < 1.0
+
+
+def test_wakes_on_exit(queues: "list[queue_proxy_wrapper.QueueProxyWrapper]") -> None:
+    """
+    Waiting selector wakes when exit is requested.
+    """
+    # Setup
+    controller = worker_controller.WorkerController()
+    selector = queue_select.QueueSelector(queues, controller)
+    threading.Timer(0.05, controller.request_exit).start()
+
+    # Run
+    start = time.monotonic()
+    ready = selector.wait()
+    elapsed = time.monotonic() - start
+
+    # Test
+    assert ready == []
+    assert elapsed < 1.0
@@ -0,0 +1,107 @@
+"""
+Test queue statistics and their shared counters.
+"""
+
+import multiprocessing as mp
+import threading
+
+from utilities.workers import queue_statistics
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+PUTS_PER_RECORDER = 1000
+RECORDER_TIMEOUT = 10.0  # seconds
+
+
+def record_puts(
+    statistics: queue_statistics.QueueStatistics, barrier: "threading.Barrier | None"
+) -> None:
+    """
+    Recorder which claims its slot, waits for the others if given a barrier, then records.
+    """
+    statistics.record_put(1)
+    if barrier is not None:
+        barrier.wait(RECORDER_TIMEOUT)
+
+    for _ in range(PUTS_PER_RECORDER - 1):
+        statistics.record_put(1)
+
+
+def run_recorders(
+    statistics: queue_statistics.QueueStatistics, count: int, is_concurrent: bool
+) -> None:
+    """
+    Records from `count` processes, all at once or one after the other.
+    """
+    barrier = mp.Barrier(count) if is_concurrent else None
+    recorders = [mp.Process(target=record_puts, args=(statistics, barrier)) for _ in range(count)]
+    for recorder in recorders:
+        recorder.start()
+        if not is_concurrent:
+            recorder.join()
+
+    for recorder in recorders:
+        recorder.join(RECORDER_TIMEOUT)
+        assert recorder.exitcode == 0
+
+
+def test_slots_of_exited_processes_reused() -> None:
+    """
+    Processes recording one after the other reuse the slots of those which exited.
+    """
+    # Setup
+    statistics = queue_statistics.QueueStatistics()
+    recorder_count = queue_statistics.MAX_SLOTS * 2
+
+    # Run
+    run_recorders(statistics, recorder_count, False)
+    slot_values = statistics._QueueStatistics__slot_counters.get_slot_values()
+
+    # Test
+    assert statistics.get_summary().put_count == recorder_count * PUTS_PER_RECORDER
+    # Every recorder found an exited one's slot, none shared the last
+    assert slot_values[-1][0] == 0
+
+
+def test_more_recorders_than_slots() -> None:
+    """
+    Counts of more processes than slots recording at once are exact.
+    """
+    # Setup
+    statistics = queue_statistics.QueueStatistics()
+    recorder_count = queue_statistics.MAX_SLOTS + 8
+
+    # Run
+    run_recorders(statistics, recorder_count, True)
+    slot_values = statistics._QueueStatistics__slot_counters.get_slot_values()
+
+    # Test
+    assert statistics.get_summary().put_count == recorder_count * PUTS_PER_RECORDER
+    # Recorders beyond the owned slots shared the last
+    assert (
+        slot_values[-1][0] == (recorder_count - queue_statistics.MAX_SLOTS + 1) * PUTS_PER_RECORDER
+    )
+
+
+def test_slots_of_exited_threads_reused() -> None:
+    """
+    Threads recording one after the other reuse the slots of those which exited.
+    """
+    # Setup
+    statistics = queue_statistics.QueueStatistics()
+    thread_count = queue_statistics.MAX_SLOTS * 2
+
+    # Run
+    for _ in range(thread_count):
+        thread = threading.Thread(target=record_puts, args=(statistics, None))
+        thread.start()
+        thread.join()
+    slot_values = statistics._QueueStatistics__slot_counters.get_slot_values()
+
+    # Test
+    assert statistics.get_summary().put_count == thread_count * PUTS_PER_RECORDER
+    assert slot_values[-1][0] == 0
@@ -0,0 +1,157 @@
+"""
+Test ReorderBuffer.
+"""
+
+import multiprocessing as mp
+import time
+
+import pytest
+
+from utilities.workers import reorder_buffer
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+WINDOW = 4
+GAP_TIMEOUT = 0.05  # seconds
+
+
+@pytest.fixture()
+def buffer() -> reorder_buffer.ReorderBuffer:  # type: ignore
+    """
+    Small window and short gap timeout.
+    """
+    yield reorder_buffer.ReorderBuffer(WINDOW, GAP_TIMEOUT)  # type: ignore
+
+
+def tagged(sequences: "list[int]") -> "list[reorder_buffer.SequencedItem]":
+    """
+    Items whose payload is their sequence number.
+    """
+    return [reorder_buffer.SequencedItem(sequence, sequence) for sequence in sequences]
+
+
+class TestRelease:
+    """
+    Items are released in sequence order.
+    """
+
+    def test_out_of_order(self, buffer: reorder_buffer.ReorderBuffer) -> None:
+        """
+        Items completed out of order are released in order once the gaps are filled.
+        """
+        # Run
+        buffer.push_many(tagged([1, 2]))
+        before_first = buffer.release()
+        buffer.push_many(tagged([0, 3]))
+        after_first = buffer.release()
+
+        # Test
+        assert before_first == []
+        assert after_first == [0, 1, 2, 3]
+        assert buffer.get_statistics() == (0, 0, 0)
+
+    def test_no_output_item(self, buffer: reorder_buffer.ReorderBuffer) -> None:
+        """
+        Item without output fills its position without being released.
+        """
+        # Setup
+        items = tagged([0, 2])
+        items.append(items[0].with_item(None))
+        items[2].sequence = 1
+
+        # Run
+        buffer.push_many(items)
+        released = buffer.release()
+
+        # Test
+        assert released == [0, 2]
+
+    def test_sentinels_ignored(self, buffer: reorder_buffer.ReorderBuffer) -> None:
+        """
+        Sentinels from the close protocol are not buffered.
+        """
+        # Run
+        buffer.push_many([None, *tagged([0])])  # type: ignore
+
+        # Test
+        assert buffer.release() == [0]
+
+
+class TestGaps:
+    """
+    Missing items are skipped so that output continues.
+    """
+
+    def test_timeout(self, buffer: reorder_buffer.ReorderBuffer) -> None:
+        """
+        Gap is skipped after the timeout.
+        """
+        # Setup
+        buffer.push_many(tagged([1, 2]))
+        assert buffer.release() == []
+        timeout = buffer.get_timeout()
+
+        # Run
+        time.sleep(GAP_TIMEOUT)
+        released = buffer.release()
+
+        # Test
+        assert timeout is not None and 0.0 < timeout <= GAP_TIMEOUT
+        assert released == [1, 2]
+        assert buffer.get_timeout() is None
+        assert buffer.get_statistics() == (0, 1, 0)
+
+    def test_full_window(self, buffer: reorder_buffer.ReorderBuffer) -> None:
+        """
+        Gap is skipped without waiting once the window is full.
+        """
+        # Run
+        buffer.push_many(tagged([1, 2, 3]))
+        partial = buffer.release()
+        buffer.push_many(tagged([5]))
+        full = buffer.release()
+
+        # Test
+        assert partial == []
+        assert full == [1, 2, 3]
+        assert buffer.get_statistics() == (1, 1, 0)
+
+    def test_late_discarded(self, buffer: reorder_buffer.ReorderBuffer) -> None:
+        """
+        Item arriving after its gap was skipped is discarded, as is a duplicate.
+        """
+        # Setup
+        buffer.push_many(tagged([1]))
+        time.sleep(GAP_TIMEOUT)
+        assert buffer.release() == [1]
+
+        # Run
+        buffer.push_many(tagged([0, 2, 2]))
+        released = buffer.release()
+
+        # Test
+        assert released == [2]
+        assert buffer.get_statistics() == (0, 1, 2)
+
+
+def test_counter_shared_between_processes() -> None:
+    """
+    Workers of the source stage share one sequence.
+    """
+    # Setup
+    counter = reorder_buffer.SequenceCounter()
+    counter.tag("main")
+
+    # Run
+    worker = mp.Process(target=counter.tag, args=("worker",))
+    worker.start()
+    worker.join()
+    sequenced_item = counter.tag("main")
+
+    # Test
+    assert sequenced_item.sequence == 2
+    assert sequenced_item.item == "main"
@@ -0,0 +1,117 @@
+"""
+Test ShardedQueue.
+"""
+
+import pytest
+
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import sharded_queue
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+QUEUE_MAX_SIZE = 8
+SHARD_COUNT = 3
+
+
+class Sample:
+    """
+    Item with a routing key.
+    """
+
+    def __init__(self, system_id: "int | str", sequence: int) -> None:
+        self.system_id = system_id
+        self.sequence = sequence
+
+
+@pytest.fixture()
+def keyed_queue() -> sharded_queue.ShardedQueue:  # type: ignore
+    """
+    Pipe backed shards keyed by system ID.
+    """
+    shards = [
+        queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        for _ in range(SHARD_COUNT)
+    ]
+    yield sharded_queue.ShardedQueue(shards, "system_id")  # type: ignore
+
+
+class TestRouting:
+    """
+    Items reach the worker of their key.
+    """
+
+    def test_key_order_per_worker(self, keyed_queue: sharded_queue.ShardedQueue) -> None:
+        """
+        Every item of a key goes to one worker, in order.
+        """
+        # Setup
+        # Shards 0, 1, 2, 0, and 1 (crc32 of "vehicle" % 3), at most 6 items per shard
+        keys = [0, 1, 2, 3, "vehicle"]
+        items = [Sample(key, sequence) for sequence in range(3) for key in keys]
+
+        # Run
+        keyed_queue.put_many(items[:5], timeout=1.0)
+        for item in items[5:]:
+            keyed_queue.put(item, timeout=1.0)
+        received = [
+            keyed_queue.bind_worker(index).get_many(QUEUE_MAX_SIZE, timeout=1.0)
+            for index in range(SHARD_COUNT)
+        ]
+
+        # Test
+        for key in keys:
+            workers = [index for index, batch in enumerate(received) for item in batch if item.system_id == key]  # type: ignore
+            sequences = [item.sequence for batch in received for item in batch if item.system_id == key]  # type: ignore
+            assert len(set(workers)) == 1
+            assert sequences == [0, 1, 2]
+
+    def test_sentinel_per_worker(self, keyed_queue: sharded_queue.ShardedQueue) -> None:
+        """
+        One sentinel per worker reaches every worker.
+        """
+        # Run
+        for _ in range(SHARD_COUNT):
+            keyed_queue.put_sentinel(False)
+
+        # Test
+        for index in range(SHARD_COUNT):
+            assert keyed_queue.bind_worker(index).get_many(QUEUE_MAX_SIZE, timeout=1.0) == [None]
+
+    def test_unbound_gets_all(self, keyed_queue: sharded_queue.ShardedQueue) -> None:
+        """
+        Unbound queue reads every shard, as main does.
+        """
+        # Setup
+        keyed_queue.put_many([Sample(key, 0) for key in range(SHARD_COUNT)])
+
+        # Run
+        items = keyed_queue.get_many(QUEUE_MAX_SIZE, timeout=1.0)
+
+        # Test
+        assert sorted(item.system_id for item in items) == list(range(SHARD_COUNT))  # type: ignore
+        assert keyed_queue.empty()
+
+
+def test_bound_selector_waits_on_own_shard(keyed_queue: sharded_queue.ShardedQueue) -> None:
+    """
+    Worker's selector is not woken by items for other workers.
+    """
+    # Setup
+    selector = queue_select.QueueSelector([keyed_queue])
+    keyed_queue.put(Sample(1, 0))
+
+    # Run
+    other_ready = selector.bind_worker(0).wait(0.05)
+    own_ready = selector.bind_worker(1).wait(1.0)
+
+    # Test
+    assert other_ready == []
+    assert len(own_ready) == 1
@@ -0,0 +1,262 @@
+"""
+Test WorkerAutoscaler.
+"""
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_autoscaler
+from utilities.workers import worker_controller
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+QUEUE_MAX_SIZE = 8
+SUSTAIN_CHECKS = 2
+
+
+class ScalableStage:
+    """
+    Stands in for WorkerManager, with the test taking items in place of workers.
+    """
+
+    def __init__(self, worker_count: int, min_count: int, max_count: int) -> None:
+        self.worker_count = worker_count
+        self.min_count = min_count
+        self.max_count = max_count
+        self.input_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        self.controller = worker_controller.WorkerController()
+
+    def get_worker_count_bounds(self) -> "tuple[int, int]":
+        """
+        Fewest and most workers.
+        """
+        return self.min_count, self.max_count
+
+    def get_input_queues(self) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":
+        """
+        Input queues.
+        """
+        return [self.input_queue]
+
+    def get_target_name(self) -> str:
+        """
+        Name for logs.
+        """
+        return "stage"
+
+    def get_controller(self) -> worker_controller.WorkerController:
+        """
+        Controller.
+        """
+        return self.controller
+
+    def get_worker_count(self) -> int:
+        """
+        Worker count.
+        """
+        return self.worker_count
+
+    def scale_up(self) -> bool:
+        """
+        Adds a worker.
+        """
+        if self.worker_count >= self.max_count:
+            return False
+
+        self.worker_count += 1
+        return True
+
+    def scale_down(self) -> bool:
+        """
+        Removes a worker.
+        """
+        if self.worker_count <= self.min_count:
+            return False
+
+        self.worker_count -= 1
+        return True
+
+    def load(self, depth: int, throughput: int) -> None:
+        """
+        Takes `throughput` items, leaving `depth` items in the input queue.
+        """
+        assert self.input_queue.qsize() - depth <= throughput
+
+        for _ in range(throughput):
+            if self.input_queue.empty():
+                self.input_queue.put(0)
+            self.input_queue.get(timeout=1.0)
+
+        while self.input_queue.qsize() < depth:
+            self.input_queue.put(0)
+
+
+@pytest.fixture()
+def stage() -> ScalableStage:  # type: ignore
+    """
+    Stage with 1 worker, scalable from 1 to 4.
+    """
+    yield ScalableStage(1, 1, 4)  # type: ignore
+
+
+@pytest.fixture()
+def autoscaler(stage: ScalableStage) -> worker_autoscaler.WorkerAutoscaler:  # type: ignore
+    """
+    Autoscaler without cooldown, checked by the test instead of its thread.
+    """
+    result, test_logger = logger.Logger.create("test_worker_autoscaler", False)
+    assert result
+    assert test_logger is not None
+
+    result, new_autoscaler = worker_autoscaler.WorkerAutoscaler.create(
+        [stage],  # type: ignore
+        test_logger,
+        check_period=1.0,
+        sustain_checks=SUSTAIN_CHECKS,
+        cooldown=0.0,
+        min_throughput_gain=0.1,
+        scale_down_headroom=0.2,
+    )
+    assert result
+    assert new_autoscaler is not None
+
+    yield new_autoscaler  # type: ignore
+
+
+def check(
+    autoscaler: worker_autoscaler.WorkerAutoscaler,
+    stage: ScalableStage,
+    depth: int,
+    throughput: int,
+) -> int:
+    """
+    Applies the load for one check period and checks the stage.
+
+    Returns the worker count after the check.
+    """
+    stage.load(depth, throughput)
+    autoscaler._WorkerAutoscaler__check_manager(stage, autoscaler._WorkerAutoscaler__states[0])
+    return stage.worker_count
+
+
+class TestScaleUp:
+    """
+    Scaling up under sustained load.
+    """
+
+    def test_sustained(
+        self, autoscaler: worker_autoscaler.WorkerAutoscaler, stage: ScalableStage
+    ) -> None:
+        """
+        Scales up only after the depth stays high for the sustain checks.
+        """
+        # Setup
+        check(autoscaler, stage, 0, 0)
+
+        # Run
+        counts = [check(autoscaler, stage, QUEUE_MAX_SIZE, 10) for _ in range(SUSTAIN_CHECKS)]
+
+        # Test
+        assert counts == [1, 2]
+
+    def test_spike_ignored(
+        self, autoscaler: worker_autoscaler.WorkerAutoscaler, stage: ScalableStage
+    ) -> None:
+        """
+        Depth that drops before the sustain checks does not scale up.
+        """
+        # Setup
+        check(autoscaler, stage, 0, 0)
+
+        # Run
+        counts = [
+            check(autoscaler, stage, depth, 10) for depth in [QUEUE_MAX_SIZE, 4, QUEUE_MAX_SIZE]
+        ]
+
+        # Test
+        assert counts == [1, 1, 1]
+
+    def test_stops_without_gain(
+        self, autoscaler: worker_autoscaler.WorkerAutoscaler, stage: ScalableStage
+    ) -> None:
+        """
+        Does not scale up again until the previous scale up raised throughput.
+        """
+        # Setup
+        check(autoscaler, stage, 0, 0)
+        for _ in range(SUSTAIN_CHECKS):
+            check(autoscaler, stage, QUEUE_MAX_SIZE, 10)
+        assert stage.worker_count == 2
+
+        # Run
+        flat_counts = [check(autoscaler, stage, QUEUE_MAX_SIZE, 10) for _ in range(3)]
+        gain_count = check(autoscaler, stage, QUEUE_MAX_SIZE, 20)
+
+        # Test
+        assert flat_counts == [2, 2, 2]
+        assert gain_count == 3
+
+    def test_no_throughput(
+        self, autoscaler: worker_autoscaler.WorkerAutoscaler, stage: ScalableStage
+    ) -> None:
+        """
+        Stalled workers are not scaled up.
+        """
+        # Setup
+        check(autoscaler, stage, 0, 0)
+
+        # Run
+        counts = [check(autoscaler, stage, QUEUE_MAX_SIZE, 0) for _ in range(3)]
+
+        # Test
+        assert counts == [1, 1, 1]
+
+
+class TestScaleDown:
+    """
+    Scaling down once idle.
+    """
+
+    def test_keeps_needed_worker(
+        self, autoscaler: worker_autoscaler.WorkerAutoscaler, stage: ScalableStage
+    ) -> None:
+        """
+        Does not scale down while throughput is near the capacity of one fewer worker.
+        """
+        # Setup
+        check(autoscaler, stage, 0, 0)
+        for _ in range(SUSTAIN_CHECKS):
+            check(autoscaler, stage, QUEUE_MAX_SIZE, 10)
+        assert stage.worker_count == 2
+
+        # Run
+        busy_counts = [check(autoscaler, stage, 0, 9) for _ in range(3)]
+        idle_count = check(autoscaler, stage, 0, 2)
+
+        # Test
+        assert busy_counts == [2, 2, 2]
+        assert idle_count == 1
+
+    def test_paused_not_scaled(
+        self, autoscaler: worker_autoscaler.WorkerAutoscaler, stage: ScalableStage
+    ) -> None:
+        """
+        Paused stage is left as it is.
+        """
+        # Setup
+        stage.worker_count = 2
+        stage.controller.request_pause()
+
+        # Run
+        counts = [check(autoscaler, stage, 0, 0) for _ in range(3)]
+
+        # Test
+        assert counts == [2, 2, 2]
@@ -0,0 +1,209 @@
+"""
+Test WorkerController.
+"""
+
+import ctypes
+import multiprocessing as mp
+import threading
+import time
+
+import pytest
+
+from utilities.workers import worker_controller
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+@pytest.fixture()
+def controller() -> worker_controller.WorkerController:  # type: ignore
+    """
+    Creates a WorkerController.
+    """
+    new_controller = worker_controller.WorkerController()
+    yield new_controller  # type: ignore
+
+
+class TestExit:
+    """
+    Exit requests.
+    """
+
+    def test_exit_not_requested(self, controller: worker_controller.WorkerController) -> None:
+        """
+        New controller has no exit request.
+        """
+        assert not controller.is_exit_requested()
+
+    def test_request_and_clear_exit(self, controller: worker_controller.WorkerController) -> None:
+        """
+        Exit request is visible immediately and can be cleared.
+        """
+        controller.request_exit()
+        assert controller.is_exit_requested()
+        assert controller.wait_for_exit(0.0)
+
+        controller.clear_exit()
+        assert not controller.is_exit_requested()
+        assert not controller.wait_for_exit(0.0)
+
+    def test_generation_changes_only_on_change(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Repeated requests do not change the generation.
+        """
+        # Setup
+        generation = controller.get_generation()
+
+        # Run
+        controller.request_exit()
+        controller.request_exit()
+
+        # Test
+        assert controller.get_generation() == generation + 1
+
+
+class TestPause:
+    """
+    Pause and resume requests.
+    """
+
+    def test_check_pause_blocks_until_resume(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Paused worker continues after resume.
+        """
+        # Setup
+        controller.request_pause()
+        worker = threading.Thread(target=controller.check_pause)
+
+        # Run
+        worker.start()
+        time.sleep(0.1)
+        is_blocked = worker.is_alive()
+        controller.request_resume()
+        worker.join(1.0)
+
+        # Test
+        assert is_blocked
+        assert not worker.is_alive()
+
+    def test_exit_releases_paused_worker(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Paused worker continues after exit request.
+        """
+        # Setup
+        controller.request_pause()
+        worker = threading.Thread(target=controller.check_pause)
+
+        # Run
+        worker.start()
+        controller.request_exit()
+        worker.join(1.0)
+
+        # Test
+        assert not worker.is_alive()
+
+
+class TestProfile:
+    """
+    Profiling requests.
+    """
+
+    def test_request_profile_shared_with_bound_worker(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Profiling request is visible to bound copies and does not affect exit or pause.
+        """
+        # Setup
+        worker_progress = mp.RawArray(ctypes.c_uint64, 1)
+        bound_controller = controller.bind_worker(worker_progress, 0)
+
+        # Run
+        controller.request_profile_start()
+        is_started = bound_controller.is_profile_requested()
+        controller.request_profile_stop()
+
+        # Test
+        assert is_started
+        assert not bound_controller.is_profile_requested()
+        assert not bound_controller.is_exit_requested()
+        assert not bound_controller.is_pause_requested()
+
+
+class TestBoundWorker:
+    """
+    Controllers bound to a single worker.
+    """
+
+    def test_check_pause_counts_progress(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Each loop iteration is counted in the worker's slot only.
+        """
+        # Setup
+        worker_progress = mp.RawArray(ctypes.c_uint64, 2)
+        bound_controller = controller.bind_worker(worker_progress, 1)
+
+        # Run
+        for _ in range(3):
+            bound_controller.check_pause()
+
+        # Test
+        assert list(worker_progress) == [0, 3]
+
+    def test_retire_only_affects_worker(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Retire request is an exit request for the bound worker only.
+        """
+        # Setup
+        worker_progress = mp.RawArray(ctypes.c_uint64, 2)
+        worker_retire = mp.RawArray(ctypes.c_bool, 2)
+        retired_controller = controller.bind_worker(worker_progress, 0, worker_retire)
+        other_controller = controller.bind_worker(worker_progress, 1, worker_retire)
+
+        # Run
+        worker_retire[0] = True
+
+        # Test
+        assert retired_controller.is_exit_requested()
+        assert not other_controller.is_exit_requested()
+        assert not controller.is_exit_requested()
+
+    def test_wake_event_ends_wait_for_retired_worker(
+        self, controller: worker_controller.WorkerController
+    ) -> None:
+        """
+        Bound worker waiting for exit wakes when retired, without an exit request.
+        """
+        # Setup
+        worker_progress = mp.RawArray(ctypes.c_uint64, 1)
+        worker_retire = mp.RawArray(ctypes.c_bool, 1)
+        wake_event = mp.Event()
+        bound_controller = controller.bind_worker(worker_progress, 0, worker_retire, wake_event)
+
+        def retire() -> None:
+            worker_retire[0] = True
+            wake_event.set()
+
+        threading.Timer(0.05, retire).start()
+
+        # Run
+        start = time.monotonic()
+        is_exit_requested = bound_controller.wait_for_exit(5.0)
+        elapsed = time.monotonic() - start
+
+        # Test
+        assert is_exit_requested
+        assert elapsed < 1.0
+        assert not controller.is_exit_requested()
@@ -0,0 +1,315 @@
+"""
+Test WorkerManager.
+"""
+
+import signal
+import threading
+import time
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_controller
+from utilities.workers import worker_manager
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+JOIN_TIMEOUT = 5.0  # seconds
+RESTART_GRACE_PERIOD = 0.1  # seconds
+CLOSE_POLL_PERIOD = 0.01  # seconds
+QUEUE_MAX_SIZE = 8
+
+
+def held_worker(
+    hold_event: threading.Event, controller: worker_controller.WorkerController
+) -> None:
+    """
+    Loops until asked to exit, blocking until the hold event is set.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        hold_event.wait()
+
+
+def unresponsive_worker(controller: worker_controller.WorkerController) -> None:
+    """
+    Hung worker process which ignores terminate.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    controller.check_pause()
+    while True:
+        time.sleep(1.0)
+
+
+def doubling_worker(
+    input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    controller: worker_controller.WorkerController,
+) -> None:
+    """
+    Puts double each input until asked to exit.
+    """
+    while not controller.is_exit_requested():
+        controller.check_pause()
+        for value in input_queue.get_many(QUEUE_MAX_SIZE):
+            # Woken to exit once drained
+            if value is None:
+                continue
+
+            output_queue.put(value * 2)
+
+
+@pytest.fixture()
+def local_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for the manager.
+    """
+    result, test_logger = logger.Logger.create("test_worker_manager", False)
+    assert result
+    assert test_logger is not None
+
+    yield test_logger  # type: ignore
+
+
+@pytest.fixture()
+def hold_event() -> threading.Event:  # type: ignore
+    """
+    Released on teardown so that workers can exit.
+    """
+    event = threading.Event()
+    yield event  # type: ignore
+    event.set()
+
+
+@pytest.fixture()
+def manager(
+    hold_event: threading.Event, local_logger: logger.Logger
+) -> worker_manager.WorkerManager:  # type: ignore
+    """
+    One thread worker, scalable from 1 to 3.
+    """
+    controller = worker_controller.WorkerController()
+    result, properties = worker_manager.WorkerProperties.create(
+        count=1,
+        target=held_worker,
+        work_arguments=(hold_event,),
+        input_queues=[],
+        output_queues=[],
+        controller=controller,
+        local_logger=local_logger,
+        min_count=1,
+        max_count=3,
+        mode=worker_manager.WorkerMode.THREAD,
+    )
+    assert result
+    assert properties is not None
+
+    result, new_manager = worker_manager.WorkerManager.create(properties, local_logger)
+    assert result
+    assert new_manager is not None
+
+    new_manager.start_workers()
+
+    yield new_manager  # type: ignore
+
+    controller.request_exit()
+    hold_event.set()
+    assert new_manager.join_workers(JOIN_TIMEOUT)
+
+
+class TestScaling:
+    """
+    Scaling within the worker count bounds.
+    """
+
+    def test_bounds(self, manager: worker_manager.WorkerManager) -> None:
+        """
+        Scaling stops at the fewest and most workers.
+        """
+        # Run
+        scaled_up = [manager.scale_up() for _ in range(3)]
+        count_after_up = manager.get_worker_count()
+        scaled_down = [manager.scale_down() for _ in range(3)]
+        count_after_down = manager.get_worker_count()
+
+        # Test
+        assert scaled_up == [True, True, False]
+        assert count_after_up == 3
+        assert scaled_down == [True, True, False]
+        assert count_after_down == 1
+
+    def test_slot_reused_after_exit(
+        self, manager: worker_manager.WorkerManager, hold_event: threading.Event
+    ) -> None:
+        """
+        Slot of a scaled down worker is reused only once that worker has exited.
+        """
+        # Setup
+        assert manager.scale_up()
+        retiring_worker = manager._WorkerManager__workers[1]
+        assert manager.scale_down()
+
+        # Run
+        scaled_up_while_retiring = manager.scale_up()
+        hold_event.set()
+        retiring_worker.join(JOIN_TIMEOUT)
+        scaled_up_after_exit = manager.scale_up()
+
+        # Test
+        assert not scaled_up_while_retiring
+        assert scaled_up_after_exit
+        assert manager.get_worker_count() == 2
+        assert len(manager._WorkerManager__retiring_workers) == 0
+        assert manager._WorkerManager__workers[1] is not retiring_worker
+        assert not manager._WorkerManager__worker_retire[1]
+
+    def test_scale_down_retires_newest(self, manager: worker_manager.WorkerManager) -> None:
+        """
+        Only the most recently added worker is asked to retire.
+        """
+        # Setup
+        assert manager.scale_up()
+
+        # Run
+        manager.scale_down()
+
+        # Test
+        assert list(manager._WorkerManager__worker_retire) == [False, True, False]
+        assert list(manager._WorkerManager__retiring_workers) == [1]
+
+
+def test_restart_kills_unresponsive_process(local_logger: logger.Logger) -> None:
+    """
+    Hung process which ignores terminate is killed after the grace period and replaced.
+    """
+    # Setup
+    result, properties = worker_manager.WorkerProperties.create(
+        count=1,
+        target=unresponsive_worker,
+        work_arguments=(),
+        input_queues=[],
+        output_queues=[],
+        controller=worker_controller.WorkerController(),
+        local_logger=local_logger,
+    )
+    assert result
+    assert properties is not None
+    result, manager = worker_manager.WorkerManager.create(properties, local_logger)
+    assert result
+    assert manager is not None
+    manager.start_workers()
+    hung_worker = manager._WorkerManager__workers[0]
+    # Wait for the worker to ignore terminate
+    while manager.get_worker_status()[0][1] == 0:
+        time.sleep(0.01)
+
+    # Run
+    start = time.monotonic()
+    restarted = manager.restart_worker(0, RESTART_GRACE_PERIOD)
+    restart_time = time.monotonic() - start
+
+    # Test
+    assert restarted
+    assert not hung_worker.is_alive()
+    assert hung_worker.exitcode == -signal.SIGKILL
+    assert restart_time < JOIN_TIMEOUT
+    assert manager.get_worker_status()[0][0]
+
+    manager.terminate_workers(RESTART_GRACE_PERIOD)
+    assert manager.join_workers(JOIN_TIMEOUT)
+
+
+class TestThreadMode:
+    """
+    Workers run as threads in this process.
+    """
+
+    def test_hang_timeout_rejected(self, local_logger: logger.Logger) -> None:
+        """
+        Hung threads cannot be replaced, so a hang timeout is invalid.
+        """
+        # Run
+        result, properties = worker_manager.WorkerProperties.create(
+            count=1,
+            target=held_worker,
+            work_arguments=(threading.Event(),),
+            input_queues=[],
+            output_queues=[],
+            controller=worker_controller.WorkerController(),
+            local_logger=local_logger,
+            hang_timeout=1.0,
+            mode=worker_manager.WorkerMode.THREAD,
+        )
+
+        # Test
+        assert not result
+        assert properties is None
+
+    def test_queues_and_close(self, local_logger: logger.Logger) -> None:
+        """
+        Thread workers use the same queues and close protocol as processes.
+        """
+        # Setup
+        input_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        output_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            None, QUEUE_MAX_SIZE, queue_backends.QueueBackend.PIPE
+        )
+        result, properties = worker_manager.WorkerProperties.create(
+            count=2,
+            target=doubling_worker,
+            work_arguments=(),
+            input_queues=[input_queue],
+            output_queues=[output_queue],
+            controller=worker_controller.WorkerController(),
+            local_logger=local_logger,
+            mode=worker_manager.WorkerMode.THREAD,
+        )
+        assert result
+        assert properties is not None
+        result, manager = worker_manager.WorkerManager.create(properties, local_logger)
+        assert result
+        assert manager is not None
+
+        # Run
+        manager.start_workers()
+        input_queue.put_many([1, 2, 3])
+        outputs = [output_queue.get(timeout=JOIN_TIMEOUT) for _ in range(3)]
+        manager.request_close()
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        while not manager.join_workers(CLOSE_POLL_PERIOD) and time.monotonic() < deadline:
+            manager.request_close()
+
+        # Test
+        assert sorted(outputs) == [2, 4, 6]  # type: ignore
+        assert all(
+            isinstance(worker, threading.Thread) for worker in manager._WorkerManager__workers
+        )
+        assert manager.join_workers(0.0)
+
+    def test_alive_thread_not_restarted(
+        self, manager: worker_manager.WorkerManager, hold_event: threading.Event
+    ) -> None:
+        """
+        Thread which is still running cannot be terminated, so is not restarted.
+        """
+        # Setup
+        worker = manager._WorkerManager__workers[0]
+
+        # Run
+        restarted = manager.restart_worker(0)
+        manager.terminate_workers(RESTART_GRACE_PERIOD)
+
+        # Test
+        assert not restarted
+        assert manager._WorkerManager__workers[0] is worker
+        assert worker.is_alive()
+
+        hold_event.set()
@@ -0,0 +1,98 @@
+"""
+Test WorkerProfiler.
+"""
+
+import pathlib
+import pstats
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_controller
+from utilities.workers import worker_profiler
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+def busy_work() -> int:
+    """
+    Work to find in the profile.
+    """
+    return sum(index * index for index in range(10000))
+
+
+@pytest.fixture()
+def controller() -> worker_controller.WorkerController:  # type: ignore
+    """
+    Creates a WorkerController.
+    """
+    yield worker_controller.WorkerController()  # type: ignore
+
+
+@pytest.fixture()
+def profiler(
+    controller: worker_controller.WorkerController, tmp_path: pathlib.Path
+) -> worker_profiler.WorkerProfiler:  # type: ignore
+    """
+    Profiler writing to a temporary directory.
+    """
+    result, test_logger = logger.Logger.create("test_worker_profiler", False)
+    assert result
+    assert test_logger is not None
+
+    yield worker_profiler.WorkerProfiler(  # type: ignore
+        controller, "test_worker", test_logger, tmp_path / "logs"
+    )
+
+
+def test_profile_written_when_request_withdrawn(
+    controller: worker_controller.WorkerController,
+    profiler: worker_profiler.WorkerProfiler,
+    tmp_path: pathlib.Path,
+) -> None:
+    """
+    Work between the start and stop requests is written to a profile named after the worker.
+    """
+    # Setup
+    profiler.check()
+    controller.request_profile_start()
+
+    # Run
+    profiler.check()
+    busy_work()
+    controller.request_profile_stop()
+    profiler.check()
+    paths = list((tmp_path / "logs").glob("profile_test_worker_*.prof"))
+
+    # Test
+    assert len(paths) == 1
+    functions = [function for _, _, function in pstats.Stats(str(paths[0])).stats]  # type: ignore
+    assert "busy_work" in functions
+
+
+def test_stop_without_request(profiler: worker_profiler.WorkerProfiler) -> None:
+    """
+    Stopping a worker which is not profiling writes nothing.
+    """
+    assert profiler.stop() is None
+
+
+def test_stop_on_exit(
+    controller: worker_controller.WorkerController, profiler: worker_profiler.WorkerProfiler
+) -> None:
+    """
+    Worker exiting while profiling writes its profile.
+    """
+    # Setup
+    controller.request_profile_start()
+    profiler.check()
+
+    # Run
+    path = profiler.stop()
+
+    # Test
+    assert path is not None
+    assert path.exists()
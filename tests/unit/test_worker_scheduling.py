@@ -0,0 +1,164 @@
+"""
+Test WorkerScheduling.
+"""
+
+import os
+import resource
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_scheduling
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+AVAILABLE_CPUS = os.sched_getaffinity(0)
+
+
+@pytest.fixture()
+def local_logger() -> logger.Logger:  # type: ignore
+    """
+    Logger for validation messages.
+    """
+    result, test_logger = logger.Logger.create("test_worker_scheduling", False)
+    assert result
+    assert test_logger is not None
+
+    yield test_logger  # type: ignore
+
+
+@pytest.fixture()
+def unprivileged(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Process without CAP_SYS_NICE and with no nice or real-time allowance.
+    """
+    monkeypatch.setattr(
+        worker_scheduling.WorkerScheduling,
+        "_WorkerScheduling__has_cap_sys_nice",
+        staticmethod(lambda: False),
+    )
+    monkeypatch.setattr(resource, "getrlimit", lambda _: (0, 0))
+
+
+class TestValidation:
+    """
+    Settings outside their ranges are rejected.
+    """
+
+    def test_valid(self, local_logger: logger.Logger) -> None:
+        """
+        All settings within range, which is also permitted when not lowering priority.
+        """
+        # Setup
+        nice = os.getpriority(os.PRIO_PROCESS, 0)
+
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(
+            AVAILABLE_CPUS, nice, None, local_logger
+        )
+
+        # Test
+        assert result
+        assert scheduling is not None
+        assert str(scheduling) == (
+            f"CPU affinity: {sorted(AVAILABLE_CPUS)}, nice: {nice}, real-time priority: None"
+        )
+
+    def test_defaults(self, local_logger: logger.Logger) -> None:
+        """
+        No settings inherits scheduling from main.
+        """
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(
+            None, None, None, local_logger
+        )
+
+        # Test
+        assert result
+        assert str(scheduling) == "CPU affinity: any, nice: None, real-time priority: None"
+
+    @pytest.mark.parametrize("cpu_affinity", [set(), {max(AVAILABLE_CPUS) + 1}, {-1}])
+    def test_invalid_cpu_affinity(
+        self, local_logger: logger.Logger, cpu_affinity: "set[int]"
+    ) -> None:
+        """
+        Affinity must be a non-empty subset of the available CPUs.
+        """
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(
+            cpu_affinity, None, None, local_logger
+        )
+
+        # Test
+        assert not result
+        assert scheduling is None
+
+    @pytest.mark.parametrize("nice", [-21, 20])
+    def test_invalid_nice(self, local_logger: logger.Logger, nice: int) -> None:
+        """
+        Nice value must be from -20 to 19.
+        """
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(
+            None, nice, None, local_logger
+        )
+
+        # Test
+        assert not result
+        assert scheduling is None
+
+    @pytest.mark.parametrize("realtime_priority", [0, 100])
+    def test_invalid_realtime_priority(
+        self, local_logger: logger.Logger, realtime_priority: int
+    ) -> None:
+        """
+        SCHED_FIFO priority must be from 1 to 99.
+        """
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(
+            None, None, realtime_priority, local_logger
+        )
+
+        # Test
+        assert not result
+        assert scheduling is None
+
+
+class TestPermissions:
+    """
+    Settings which cannot be applied are left out when created.
+    """
+
+    # Fixture only changes permissions
+    # pylint: disable-next=unused-argument
+    def test_not_permitted_left_out(self, local_logger: logger.Logger, unprivileged: None) -> None:
+        """
+        Lowering priority without permission keeps the other settings.
+        """
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(
+            AVAILABLE_CPUS, -20, 10, local_logger
+        )
+
+        # Test
+        assert result
+        assert scheduling is not None
+        assert str(scheduling) == (
+            f"CPU affinity: {sorted(AVAILABLE_CPUS)}, nice: None, real-time priority: None"
+        )
+
+    # pylint: disable-next=unused-argument
+    def test_raising_nice_permitted(self, local_logger: logger.Logger, unprivileged: None) -> None:
+        """
+        Raising the nice value needs no permission.
+        """
+        # Run
+        result, scheduling = worker_scheduling.WorkerScheduling.create(None, 19, None, local_logger)
+
+        # Test
+        assert result
+        assert str(scheduling) == "CPU affinity: any, nice: 19, real-time priority: None"
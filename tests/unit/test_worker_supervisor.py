@@ -0,0 +1,261 @@
+"""
+Test WorkerSupervisor.
+"""
+
+import time
+
+import pytest
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_supervisor
+
+
+# Test functions use test fixture signature names and access class privates
+# No enable
+# pylint: disable=protected-access,redefined-outer-name
+
+
+HANG_TIMEOUT = 0.05  # seconds
+INITIAL_BACKOFF = 0.01  # seconds
+MAX_BACKOFF = 0.04  # seconds
+
+
+class SupervisedStage:
+    """
+    Stands in for WorkerManager, with the test setting each worker's status.
+    """
+
+    def __init__(self, worker_count: int, hang_timeout: "float | None") -> None:
+        self.hang_timeout = hang_timeout
+        # Whether each worker is alive and its loop iteration count
+        self.status = [(True, 0) for _ in range(worker_count)]
+        self.restarted: "list[int]" = []
+        self.is_restart_failing = False
+
+    def get_target_name(self) -> str:
+        """
+        Name for logs.
+        """
+        return "stage"
+
+    def get_hang_timeout(self) -> "float | None":
+        """
+        Hang timeout.
+        """
+        return self.hang_timeout
+
+    def get_worker_status(self) -> "list[tuple[bool, int]]":
+        """
+        Status of each worker.
+        """
+        return list(self.status)
+
+    def restart_worker(self, index: int) -> bool:
+        """
+        Replaces the worker with a healthy one.
+        """
+        if self.is_restart_failing:
+            return False
+
+        self.restarted.append(index)
+        self.status[index] = (True, 0)
+        return True
+
+
+@pytest.fixture()
+def stage() -> SupervisedStage:  # type: ignore
+    """
+    Stage with 2 workers and a hang timeout.
+    """
+    yield SupervisedStage(2, HANG_TIMEOUT)  # type: ignore
+
+
+@pytest.fixture()
+def supervisor(stage: SupervisedStage) -> worker_supervisor.WorkerSupervisor:  # type: ignore
+    """
+    Supervisor checked by the test instead of its thread.
+    """
+    result, test_logger = logger.Logger.create("test_worker_supervisor", False)
+    assert result
+    assert test_logger is not None
+
+    result, new_supervisor = worker_supervisor.WorkerSupervisor.create(
+        [stage],  # type: ignore
+        test_logger,
+        initial_backoff=INITIAL_BACKOFF,
+        max_backoff=MAX_BACKOFF,
+    )
+    assert result
+    assert new_supervisor is not None
+
+    yield new_supervisor  # type: ignore
+
+
+def check(supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage) -> None:
+    """
+    Runs one health check of the stage.
+    """
+    supervisor._WorkerSupervisor__check_manager(
+        stage, supervisor._WorkerSupervisor__worker_states[0]
+    )
+
+
+def wait_for_restart(
+    supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage, index: int
+) -> None:
+    """
+    Checks until the backoff of the worker has elapsed and it is restarted.
+    """
+    state = supervisor._WorkerSupervisor__worker_states[0][index]
+    assert state.restart_time is not None
+    time.sleep(max(state.restart_time - time.monotonic(), 0.0))
+    check(supervisor, stage)
+
+
+class TestDetection:
+    """
+    Dead and hung workers are detected and restarted after the backoff.
+    """
+
+    def test_dead(
+        self, supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage
+    ) -> None:
+        """
+        Exited worker is restarted.
+        """
+        # Setup
+        stage.status[1] = (False, 3)
+
+        # Run
+        check(supervisor, stage)
+        restarted_before_backoff = list(stage.restarted)
+        wait_for_restart(supervisor, stage, 1)
+
+        # Test
+        assert len(restarted_before_backoff) == 0
+        assert stage.restarted == [1]
+
+    def test_hung(
+        self, supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage
+    ) -> None:
+        """
+        Worker without progress for the hang timeout is restarted, one making progress is not.
+        """
+        # Setup
+        check(supervisor, stage)
+        time.sleep(HANG_TIMEOUT * 2)
+        stage.status[0] = (True, 1)
+
+        # Run
+        check(supervisor, stage)
+        wait_for_restart(supervisor, stage, 1)
+
+        # Test
+        assert stage.restarted == [1]
+
+    def test_no_hang_timeout(self, supervisor: worker_supervisor.WorkerSupervisor) -> None:
+        """
+        Workers of a stage without a hang timeout are not restarted while alive.
+        """
+        # Setup
+        stage = SupervisedStage(1, None)
+        states = [worker_supervisor.WorkerState()]
+
+        # Run
+        supervisor._WorkerSupervisor__check_manager(stage, states)
+        time.sleep(HANG_TIMEOUT * 2)
+        supervisor._WorkerSupervisor__check_manager(stage, states)
+
+        # Test
+        assert states[0].restart_time is None
+
+
+class TestBackoff:
+    """
+    Repeated failures are restarted with increasing delay.
+    """
+
+    def test_doubles_to_max(
+        self, supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage
+    ) -> None:
+        """
+        Backoff doubles with each consecutive failure, up to the maximum.
+        """
+        # Setup
+        state = supervisor._WorkerSupervisor__worker_states[0][0]
+        backoffs = []
+
+        # Run
+        for _ in range(4):
+            stage.status[0] = (False, 0)
+            check(supervisor, stage)
+            assert state.restart_time is not None
+            assert state.failure_time is not None
+            backoffs.append(state.restart_time - state.failure_time)
+            wait_for_restart(supervisor, stage, 0)
+
+        # Test
+        assert backoffs == pytest.approx([0.01, 0.02, 0.04, 0.04])
+        assert state.failure_count == 4
+
+    def test_failed_restart_retried(
+        self, supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage
+    ) -> None:
+        """
+        Restart which fails is retried after a longer backoff.
+        """
+        # Setup
+        state = supervisor._WorkerSupervisor__worker_states[0][0]
+        stage.status[0] = (False, 0)
+        stage.is_restart_failing = True
+        check(supervisor, stage)
+
+        # Run
+        wait_for_restart(supervisor, stage, 0)
+        failure_count_after_failed_restart = state.failure_count
+        stage.is_restart_failing = False
+        wait_for_restart(supervisor, stage, 0)
+
+        # Test
+        assert failure_count_after_failed_restart == 2
+        assert stage.restarted == [0]
+
+
+def test_statistics(supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage) -> None:
+    """
+    Restarts are counted and recovery time is at least the backoff.
+    """
+    # Setup
+    restart_count_before, _ = supervisor.get_statistics()
+    stage.status[0] = (False, 0)
+
+    # Run
+    check(supervisor, stage)
+    wait_for_restart(supervisor, stage, 0)
+    restart_count, mean_time_to_recovery = supervisor.get_statistics()
+
+    # Test
+    assert restart_count_before == 0
+    assert restart_count == 1
+    assert INITIAL_BACKOFF <= mean_time_to_recovery < INITIAL_BACKOFF + 1.0
+
+
+def test_statistics_from_last_progress(
+    supervisor: worker_supervisor.WorkerSupervisor, stage: SupervisedStage
+) -> None:
+    """
+    Recovery time of a hung worker starts at its last progress, so it includes the hang timeout.
+    """
+    # Setup
+    check(supervisor, stage)
+    time.sleep(HANG_TIMEOUT * 2)
+    stage.status[1] = (True, 1)
+
+    # Run
+    check(supervisor, stage)
+    wait_for_restart(supervisor, stage, 0)
+    restart_count, mean_time_to_recovery = supervisor.get_statistics()
+
+    # Test
+    assert restart_count == 1
+    assert HANG_TIMEOUT * 2 + INITIAL_BACKOFF <= mean_time_to_recovery < HANG_TIMEOUT + 1.0
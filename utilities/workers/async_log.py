@@ -0,0 +1,232 @@
+"""
+Moves log file writes out of worker loops.
+"""
+
+import logging
+import threading
+import time
+
+from modules.common.modules.logger import logger
+from utilities.workers import lazy_log
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+
+
+# Pickled size of a record apart from its path and line
+RECORD_OVERHEAD = 64  # bytes
+# Appended to lines cut to fit a record
+TRUNCATION_MARK = " [truncated]"
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Replaces a file handler in a worker: formats each record and queues the line for the writer,
+    dropping it without waiting if the queue is full.
+    """
+
+    def __init__(
+        self, path: str, records: queue_proxy_wrapper.QueueProxyWrapper, max_record_size: int
+    ) -> None:
+        """
+        path: Log file the line is appended to.
+        records: Queue of the writer.
+        max_record_size: Slot size of the queue in bytes, longer lines are cut to fit.
+        """
+        super().__init__()
+        self.__path = path
+        self.__records = records
+        self.__max_line_size = max(
+            max_record_size - len(path.encode()) - RECORD_OVERHEAD - len(TRUNCATION_MARK), 0
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Queues the formatted record.
+        """
+        # Same as the standard handlers, logging must not raise into the worker
+        try:
+            line = self.format(record)
+        # pylint: disable-next=broad-exception-caught
+        except Exception:
+            self.handleError(record)
+            return
+
+        encoded_line = line.encode()
+        if len(encoded_line) > self.__max_line_size:
+            line = encoded_line[: self.__max_line_size].decode(errors="ignore") + TRUNCATION_MARK
+
+        # Drops and counts when full, see AsyncLogWriter.get_drop_count()
+        self.__records.put((self.__path, line))
+
+
+class AsyncLogWriter:
+    """
+    Single thread in main which writes the log files of the workers.
+
+    Workers call redirect() on their logger so that records are queued as `(path, line)`
+    instead of written, and the writer appends them in batches, flushing each file once
+    per batch. The queue is bounded, records which do not fit are dropped and counted.
+    The queue is in shared memory, so a worker never waits for the writer.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        local_logger: logger.Logger,
+        maxsize: int = 10000,
+        max_record_size: int = 1024,
+        batch_size: int = 1000,
+        flush_period: float = 0.1,
+        is_structured: bool = False,
+    ) -> "tuple[bool, AsyncLogWriter | None]":
+        """
+        Creates the writer, which is not started.
+
+        local_logger: Existing logger from process, for write errors.
+        maxsize: Most records queued. Further records are dropped.
+        max_record_size: Bytes of a queued record, longer lines are cut.
+            The queue takes `maxsize * max_record_size` bytes of shared memory.
+        batch_size: Most records written at once.
+        flush_period: Seconds between batches, so that records accumulate.
+        is_structured: Write JSON lines with the raw values of structured messages instead of
+            the text of the file handlers, see lazy_log.StructuredFormatter.
+
+        Returns whether the writer was created and the writer.
+        """
+        if maxsize <= 0 or max_record_size <= 0 or batch_size <= 0 or flush_period < 0.0:
+            local_logger.error(
+                "Max size, max record size and batch size must be greater than zero, "
+                "flush period at least zero",
+                True,
+            )
+            return False, None
+
+        return True, AsyncLogWriter(
+            cls.__create_key,
+            local_logger,
+            maxsize,
+            max_record_size,
+            batch_size,
+            flush_period,
+            is_structured,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        local_logger: logger.Logger,
+        maxsize: int,
+        max_record_size: int,
+        batch_size: int,
+        flush_period: float,
+        is_structured: bool,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is AsyncLogWriter.__create_key, "Use create() method"
+
+        self.__local_logger = local_logger
+        self.__batch_size = batch_size
+        self.__flush_period = flush_period
+        self.__is_structured = is_structured
+        self.__max_record_size = max_record_size
+
+        # Ring does not need the manager, and a put into a full ring fails at once
+        self.__records = queue_proxy_wrapper.QueueProxyWrapper(
+            None,
+            maxsize,
+            queue_backends.QueueBackend.SHARED_MEMORY_RING,
+            max_item_size=max_record_size,
+            overflow_policy=queue_proxy_wrapper.OverflowPolicy.DROP_NEWEST,
+        )
+
+        self.__thread = threading.Thread(target=self.__run, name="log_writer", daemon=True)
+
+    def redirect(self, local_logger: logger.Logger) -> None:
+        """
+        Replaces the file handlers of a logger so that its records go to the writer.
+        Called by the worker after creating its logger. Other handlers are kept.
+        """
+        underlying_logger = local_logger.logger
+        for handler in list(underlying_logger.handlers):
+            if not isinstance(handler, logging.FileHandler):
+                continue
+
+            writer_handler = AsyncLogHandler(
+                handler.baseFilename, self.__records, self.__max_record_size
+            )
+            writer_handler.setLevel(handler.level)
+            if self.__is_structured:
+                writer_handler.setFormatter(lazy_log.StructuredFormatter())
+            else:
+                writer_handler.setFormatter(handler.formatter)
+
+            underlying_logger.removeHandler(handler)
+            handler.close()
+            underlying_logger.addHandler(writer_handler)
+
+    def start(self) -> None:
+        """
+        Starts writing.
+        """
+        self.__thread.start()
+
+    def stop(self, timeout: "float | None" = None) -> bool:
+        """
+        Writes the queued records and stops. Call once the workers have exited.
+
+        Returns whether the writer stopped within the timeout.
+        """
+        if not self.__thread.is_alive():
+            return True
+
+        self.__records.put_sentinel()
+        self.__thread.join(timeout)
+        return not self.__thread.is_alive()
+
+    def get_drop_count(self) -> int:
+        """
+        Returns the number of records dropped because the queue was full.
+        """
+        return self.__records.get_drop_count()
+
+    def __run(self) -> None:
+        """
+        Writer thread.
+        """
+        files = {}
+        try:
+            is_closed = False
+            while not is_closed:
+                lines_by_path: "dict[str, list[str]]" = {}
+                for record in self.__records.get_many(self.__batch_size):
+                    # Sentinel from stop(), records put before it are written first
+                    if record is None:
+                        is_closed = True
+                        continue
+
+                    path, line = record  # type: ignore
+                    lines_by_path.setdefault(path, []).append(line)
+
+                for path, lines in lines_by_path.items():
+                    try:
+                        if path not in files:
+                            # Kept open until the writer stops
+                            # pylint: disable-next=consider-using-with
+                            files[path] = open(path, "a", encoding="utf-8")
+
+                        files[path].write("\n".join(lines) + "\n")
+                        files[path].flush()
+                    except OSError as e:
+                        self.__local_logger.error(
+                            f"Failed to write {len(lines)} records to {path}: {e}", True
+                        )
+
+                if not is_closed:
+                    time.sleep(self.__flush_period)
+        finally:
+            for file in files.values():
+                file.close()
@@ -0,0 +1,176 @@
+"""
+End to end latency of telemetry, from frame receipt to command send, by stage.
+"""
+
+from utilities.workers import queue_statistics
+
+
+# Stages of a trace, in order
+STAGES = ("decode", "assemble", "queue wait", "decide", "send", "end to end")
+
+# Layout of each stage in a slot of the shared counters
+_COUNT = 0
+_TOTAL = 1  # microseconds
+_FIRST_BUCKET = 2
+_STAGE_SIZE = _FIRST_BUCKET + queue_statistics.RESIDENCE_BUCKET_COUNT
+_SLOT_SIZE = len(STAGES) * _STAGE_SIZE
+
+
+class TraceContext:
+    """
+    Times at which telemetry reached each stage, carried in TelemetryData from the telemetry
+    worker to the command worker. Times are from time.monotonic(), which is the same clock in
+    every process, None until the stage is reached.
+    """
+
+    __slots__ = ("received", "decoded", "assembled", "dequeued", "decided", "sent")
+
+    def __init__(self, received: float, decoded: float) -> None:
+        """
+        received: Before reading the first frame of the telemetry from the connection.
+        decoded: After the frame was read and decoded.
+        """
+        self.received = received
+        self.decoded = decoded
+        # Telemetry worker, after TelemetryData is created
+        self.assembled: "float | None" = None
+        # Command worker, before deciding
+        self.dequeued: "float | None" = None
+        # Command worker, after deciding, before sending any command
+        self.decided: "float | None" = None
+        # Command worker, after the command is sent, None if none was
+        self.sent: "float | None" = None
+
+    def get_latencies(self) -> "list[float | None]":
+        """
+        Returns the seconds spent in each stage, see STAGES, None for stages not reached.
+        End to end is only for telemetry which caused a command.
+        """
+        times = [
+            self.received,
+            self.decoded,
+            self.assembled,
+            self.dequeued,
+            self.decided,
+            self.sent,
+        ]
+        latencies: "list[float | None]" = [
+            end - start if start is not None and end is not None else None
+            for start, end in zip(times, times[1:])
+        ]
+        latencies.append(self.sent - self.received if self.sent is not None else None)
+        return latencies
+
+    def __str__(self) -> str:
+        """
+        To string.
+        """
+        return ", ".join(
+            f"{stage}: {latency * 1e3:.3f}ms"
+            for stage, latency in zip(STAGES, self.get_latencies())
+            if latency is not None
+        )
+
+
+class LatencySummary:
+    """
+    Latency of a stage, aggregated over all recording processes.
+    """
+
+    def __init__(self, count: int, total: float, histogram: "list[int]") -> None:
+        """
+        count: Traces which reached the stage.
+        total: Seconds spent in the stage by all traces.
+        histogram: Traces by latency bucket, see queue_statistics.RESIDENCE_BUCKET_COUNT.
+        """
+        self.count = count
+        self.total = total
+        self.histogram = histogram
+
+    def mean(self) -> float:
+        """
+        Returns the mean latency in seconds, 0 if no traces were recorded.
+        """
+        if self.count == 0:
+            return 0.0
+
+        return self.total / self.count
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Upper bound of the latency in seconds of the given fraction of traces,
+        to the resolution of the histogram buckets. 0 if no traces were recorded.
+
+        fraction: Between 0 and 1, e.g. 0.99.
+        """
+        return queue_statistics.histogram_percentile(self.histogram, fraction)
+
+    def __str__(self) -> str:
+        """
+        To string.
+        """
+        return (
+            f"count: {self.count}, "
+            f"mean: {self.mean() * 1e3:.3f}ms, "
+            f"p50 <= {self.percentile(0.50) * 1e3:.3f}ms, "
+            f"p99 <= {self.percentile(0.99) * 1e3:.3f}ms"
+        )
+
+
+class LatencyStatistics:
+    """
+    Latency histograms of each stage in shared memory, recorded by the workers which close
+    traces and read by main.
+
+    Every process and thread records into its own slot, see queue_statistics.SlotCounters.
+    Summaries sum the slots, so they are approximate while traces are being recorded.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor creates the shared counters.
+        """
+        self.__slot_counters = queue_statistics.SlotCounters(_SLOT_SIZE)
+
+    def record(self, trace: TraceContext) -> None:
+        """
+        Records the stages reached by a closed trace.
+        """
+        counters, offset, lock = self.__slot_counters.get_slot()
+        if lock is not None:
+            lock.acquire()
+        try:
+            for latency in trace.get_latencies():
+                if latency is not None:
+                    microseconds = max(int(latency * 1e6), 0)
+                    bucket = queue_statistics.get_bucket(microseconds)
+                    counters[offset + _COUNT] += 1
+                    counters[offset + _TOTAL] += microseconds
+                    counters[offset + _FIRST_BUCKET + bucket] += 1
+
+                offset += _STAGE_SIZE
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def get_summary(self) -> "dict[str, LatencySummary]":
+        """
+        Sums all slots.
+
+        Returns the summary of each stage, by name in STAGES.
+        """
+        totals = [0] * _SLOT_SIZE
+        for counters in self.__slot_counters.get_slot_values():
+            for index, value in enumerate(counters):
+                totals[index] += value
+
+        summaries = {}
+        for index, stage in enumerate(STAGES):
+            stage_totals = totals[index * _STAGE_SIZE : (index + 1) * _STAGE_SIZE]
+            summaries[stage] = LatencySummary(
+                stage_totals[_COUNT],
+                stage_totals[_TOTAL] / 1e6,
+                stage_totals[_FIRST_BUCKET:],
+            )
+
+        return summaries
@@ -0,0 +1,144 @@
+"""
+Log messages which are formatted only when a handler emits them.
+
+`local_logger.info(f"...", True)` formats the message and looks up the caller's source line
+even if the record is then filtered out by level. log() and log_object() skip disabled levels
+up front and otherwise pass a message object, whose text (with the same frame information as
+logger.Logger) is built by the first handler that formats the record.
+"""
+
+import inspect
+import json
+import logging
+import types
+
+from modules.common.modules.logger import logger
+
+
+class LazyMessage:
+    """
+    Message formatted with `str.format()` when first converted to a string.
+    """
+
+    __slots__ = ("message_format", "args", "__frame", "__text")
+
+    def __init__(self, message_format: str, args: "tuple", frame: types.FrameType | None) -> None:
+        """
+        message_format: Format string, e.g. `"Status: {}"`.
+        args: Raw values for the format string.
+        frame: Caller frame for the frame information, None for none.
+        """
+        self.message_format = message_format
+        self.args = args
+        self.__frame = frame
+        self.__text: "str | None" = None
+
+    def format_message(self) -> str:
+        """
+        Returns the message without frame information.
+        """
+        return self.message_format.format(*self.args)
+
+    def __str__(self) -> str:
+        """
+        Formats once, even if several handlers emit the record.
+        """
+        if self.__text is None:
+            self.__text = logger.Logger.message_and_metadata(self.format_message(), self.__frame)
+            # Frame keeps the caller's locals alive
+            self.__frame = None
+
+        return self.__text
+
+
+class StructuredMessage(LazyMessage):
+    """
+    Event with an object whose attributes are kept as raw values, see StructuredFormatter.
+    Formatted as `<event>: <object>` for text logs.
+    """
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, value: object, frame: types.FrameType | None) -> None:
+        """
+        event: What happened, e.g. `"Sent telemetry data"`.
+        value: Object with attributes, e.g. TelemetryData, which must not change afterwards.
+        frame: Caller frame for the frame information, None for none.
+        """
+        super().__init__("{}: {}", (event, value), frame)
+        self.event = event
+        self.fields = vars(value)
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines. Fields of structured messages are kept as values,
+    other messages are formatted as text.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Returns the JSON line for the record.
+        """
+        structured_record: "dict[str, object]" = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+        }
+
+        message = record.msg
+        if isinstance(message, StructuredMessage):
+            structured_record["event"] = message.event
+            structured_record.update(message.fields)
+        elif isinstance(message, LazyMessage):
+            structured_record["message"] = message.format_message()
+        else:
+            structured_record["message"] = record.getMessage()
+
+        return json.dumps(structured_record, default=str)
+
+
+def log(
+    local_logger: logger.Logger,
+    level: int,
+    message_format: str,
+    *args: object,
+    log_with_frame_info: bool = True,
+) -> None:
+    """
+    Logs a message formatted with `str.format()` only if it is emitted.
+
+    level: Logging level, e.g. `logging.INFO`.
+    message_format: Format string, e.g. `"Status: {}"`.
+    args: Values for the format string.
+    log_with_frame_info: Prefix the caller's file, function and line, like logger.Logger.
+    """
+    underlying_logger = local_logger.logger
+    if not underlying_logger.isEnabledFor(level):
+        return
+
+    frame = inspect.currentframe().f_back if log_with_frame_info else None  # type: ignore
+    underlying_logger.log(level, LazyMessage(message_format, args, frame))
+
+
+def log_object(
+    local_logger: logger.Logger,
+    level: int,
+    event: str,
+    value: object,
+    log_with_frame_info: bool = True,
+) -> None:
+    """
+    Logs an event with an object, formatted only if it is emitted, see StructuredMessage.
+
+    level: Logging level, e.g. `logging.INFO`.
+    event: What happened.
+    value: Object with attributes, e.g. TelemetryData.
+    log_with_frame_info: Prefix the caller's file, function and line, like logger.Logger.
+    """
+    underlying_logger = local_logger.logger
+    if not underlying_logger.isEnabledFor(level):
+        return
+
+    frame = inspect.currentframe().f_back if log_with_frame_info else None  # type: ignore
+    underlying_logger.log(level, StructuredMessage(event, value, frame))
@@ -0,0 +1,143 @@
+"""
+Cuts the volume of repetitive log messages from worker loops.
+"""
+
+import inspect
+import time
+import types
+
+from modules.common.modules.logger import logger
+from utilities.workers import lazy_log
+
+
+class RepeatCount:
+    """
+    Repeats of a message since its last line in the log.
+    """
+
+    __slots__ = ("level", "count", "since")
+
+    def __init__(self, level: int, since: float) -> None:
+        self.level = level
+        self.count = 0
+        self.since = since
+
+
+class LogThrottle:
+    """
+    Logs through a logger, collapsing repeats and sampling high rate messages:
+
+    * repeat(): The first occurrence of a message is logged, later ones are counted and logged
+      as a summary (`Heartbeat sent x60 in last 60s`) once the summary period has passed.
+    * state(): A state is logged whenever it changes, repeats of the same state are summarized.
+    * is_sampled(): Whether this is the first of every N occurrences, for the caller to log.
+
+    Summaries are logged by the next repeat after the period, call flush() before exiting.
+    Not shared between workers, each worker (or object in it) has its own.
+    """
+
+    def __init__(self, local_logger: logger.Logger, summary_period: float = 60.0) -> None:
+        """
+        local_logger: Logger of the worker.
+        summary_period: Seconds between summaries of a repeated message.
+        """
+        assert summary_period > 0.0
+
+        self.__local_logger = local_logger
+        self.__summary_period = summary_period
+
+        # By message
+        self.__repeats: "dict[str, RepeatCount]" = {}
+        # By state name
+        self.__states: "dict[str, object]" = {}
+        # By sampling key
+        self.__sample_counts: "dict[str, int]" = {}
+
+    def __log(self, level: int, message: str, frame: types.FrameType | None) -> None:
+        """
+        Logs with the frame information of the caller of the throttle.
+        """
+        underlying_logger = self.__local_logger.logger
+        if underlying_logger.isEnabledFor(level):
+            underlying_logger.log(level, lazy_log.LazyMessage("{}", (message,), frame))
+
+    def __summarize(self, message: str, frame: types.FrameType | None) -> None:
+        """
+        Logs the summary of a message at its level if it has been repeated.
+        """
+        repeat = self.__repeats.pop(message, None)
+        if repeat is None or repeat.count == 0:
+            return
+
+        self.__log(
+            repeat.level,
+            f"{message} x{repeat.count} in last {time.monotonic() - repeat.since:.0f}s",
+            frame,
+        )
+
+    def repeat(self, level: int, message: str, log_with_frame_info: bool = True) -> None:
+        """
+        Logs the message the first time and summaries of its repeats afterwards.
+
+        level: Logging level, e.g. `logging.INFO`.
+        message: Fixed text, messages with different values are different messages.
+        log_with_frame_info: Prefix the caller's file, function and line, like logger.Logger.
+        """
+        frame = inspect.currentframe().f_back if log_with_frame_info else None  # type: ignore
+        self.__repeat(level, message, frame)
+
+    def __repeat(self, level: int, message: str, frame: types.FrameType | None) -> None:
+        """
+        Counts the message, logging it if it is new or its summary is due.
+        """
+        now = time.monotonic()
+        repeat = self.__repeats.get(message)
+        if repeat is None:
+            self.__repeats[message] = RepeatCount(level, now)
+            self.__log(level, message, frame)
+            return
+
+        repeat.count += 1
+        if now - repeat.since >= self.__summary_period:
+            self.__summarize(message, frame)
+            self.__repeats[message] = RepeatCount(level, now)
+
+    def state(self, level: int, name: str, value: object, log_with_frame_info: bool = True) -> None:
+        """
+        Logs `<name>: <value>` whenever the value changes, and summaries while it stays the same.
+        The summary of the previous value is logged before the change.
+
+        level: Logging level, e.g. `logging.INFO`.
+        name: What the state is, e.g. `"Status"`.
+        value: Current state, compared with the last one.
+        log_with_frame_info: Prefix the caller's file, function and line, like logger.Logger.
+        """
+        frame = inspect.currentframe().f_back if log_with_frame_info else None  # type: ignore
+        message = f"{name}: {value}"
+        if name in self.__states:
+            if self.__states[name] == value:
+                self.__repeat(level, message, frame)
+                return
+
+            self.__summarize(f"{name}: {self.__states[name]}", frame)
+
+        self.__states[name] = value
+        self.__repeat(level, message, frame)
+
+    def is_sampled(self, key: str, every: int) -> bool:
+        """
+        Whether to log this occurrence, true for the first and then every Nth.
+
+        key: Identifies the message, e.g. its fixed text.
+        every: N, 1 to log every occurrence.
+        """
+        count = self.__sample_counts.get(key, 0)
+        self.__sample_counts[key] = count + 1
+        return count % max(every, 1) == 0
+
+    def flush(self) -> None:
+        """
+        Logs the summaries of all repeated messages, e.g. before the worker exits.
+        """
+        for message in list(self.__repeats):
+            self.__summarize(message, None)
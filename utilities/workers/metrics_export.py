@@ -0,0 +1,332 @@
+"""
+Serves metrics from main on a localhost HTTP endpoint in the Prometheus text format.
+"""
+
+import http.server
+import threading
+
+from modules.common.modules.logger import logger
+from utilities.workers import latency_trace
+from utilities.workers import pipeline_graph
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+METRIC_PREFIX = "bootcamp_"
+
+
+def _format_labels(labels: "dict[str, str]") -> str:
+    """
+    Returns `{name="value",...}`, or nothing if there are no labels.
+    """
+    if len(labels) == 0:
+        return ""
+
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_metric(
+    name: str,
+    metric_type: str,
+    help_text: str,
+    samples: "list[tuple[dict[str, str], float]]",
+) -> str:
+    """
+    Formats a counter or gauge.
+
+    name: Metric name, without METRIC_PREFIX. Counters end in `_total`.
+    metric_type: `counter` or `gauge`.
+    help_text: One line description.
+    samples: Labels and value of each sample.
+    """
+    name = METRIC_PREFIX + name
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def format_histogram(
+    name: str,
+    help_text: str,
+    samples: "list[tuple[dict[str, str], list[int], float]]",
+) -> str:
+    """
+    Formats histograms of durations recorded in the buckets of queue_statistics.
+
+    name: Metric name, without METRIC_PREFIX, ending in `_seconds`.
+    help_text: One line description.
+    samples: Labels, counts by bucket (see queue_statistics.RESIDENCE_BUCKET_COUNT)
+        and sum in seconds of each histogram.
+    """
+    name = METRIC_PREFIX + name
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram, total in samples:
+        # Prometheus buckets are cumulative, the last bucket has no upper bound
+        cumulative = 0
+        for bucket, count in enumerate(histogram[:-1]):
+            cumulative += count
+            bucket_labels = {**labels, "le": repr(2**bucket / 1e6)}
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+
+        count = cumulative + histogram[-1]
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def collect_queues(graph: pipeline_graph.PipelineGraph) -> str:
+    """
+    Depth and dropped items of every queue of the pipeline, and the counts and residence
+    times of the instrumented ones.
+    """
+    depths = graph.get_queue_depths()
+    drop_counts = graph.get_drop_counts()
+    # Does not change the rates main logs
+    summaries = graph.get_queue_statistics(False)
+
+    return "".join(
+        [
+            format_metric(
+                "queue_depth",
+                "gauge",
+                "Items in the queue, approximate.",
+                [({"queue": name}, depth) for name, depth in depths.items()],
+            ),
+            format_metric(
+                "queue_dropped_total",
+                "counter",
+                "Items dropped by the overflow policy of the queue.",
+                [({"queue": name}, count) for name, count in drop_counts.items()],
+            ),
+            format_metric(
+                "queue_put_total",
+                "counter",
+                "Items put in the instrumented queue.",
+                [({"queue": name}, summary.put_count) for name, summary in summaries.items()],
+            ),
+            format_metric(
+                "queue_get_total",
+                "counter",
+                "Items got from the instrumented queue.",
+                [({"queue": name}, summary.get_count) for name, summary in summaries.items()],
+            ),
+            format_metric(
+                "queue_depth_high_water",
+                "gauge",
+                "Maximum items in the instrumented queue after a put.",
+                [
+                    ({"queue": name}, summary.depth_high_water)
+                    for name, summary in summaries.items()
+                ],
+            ),
+            format_histogram(
+                "queue_residence_seconds",
+                "Time items spent in the instrumented queue.",
+                [
+                    ({"queue": name}, summary.residence_histogram, summary.residence_total)
+                    for name, summary in summaries.items()
+                ],
+            ),
+        ]
+    )
+
+
+def collect_latency(latency_statistics: latency_trace.LatencyStatistics) -> str:
+    """
+    Latency of telemetry by stage, see latency_trace.STAGES.
+    """
+    return format_histogram(
+        "latency_seconds",
+        "Latency of telemetry from frame receipt to command send, by stage.",
+        [
+            ({"stage": stage}, summary.histogram, summary.total)
+            for stage, summary in latency_statistics.get_summary().items()
+        ],
+    )
+
+
+class MetricValues:
+    """
+    Counters and gauges kept by main, e.g. from the queues it reads.
+
+    Main sets values while the exporter thread reads them, without a lock: every metric is
+    declared before the exporter starts, so setting a value only replaces a dictionary entry.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor creates no metrics, see declare().
+        """
+        # Type and help text, by name
+        self.__declarations: "dict[str, tuple[str, str]]" = {}
+        self.__values: "dict[str, float]" = {}
+
+    def declare(self, name: str, metric_type: str, help_text: str) -> None:
+        """
+        Adds a metric with value 0, call before the exporter starts.
+        See format_metric() for the arguments.
+        """
+        self.__declarations[name] = (metric_type, help_text)
+        self.__values[name] = 0
+
+    def set(self, name: str, value: float) -> None:
+        """
+        Sets a declared gauge, or a counter which is counted elsewhere.
+        """
+        assert name in self.__values
+        self.__values[name] = value
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        """
+        Adds to a declared counter.
+        """
+        assert name in self.__values
+        self.__values[name] += amount
+
+    def collect(self) -> str:
+        """
+        All declared metrics.
+        """
+        values = self.__values.copy()
+        return "".join(
+            format_metric(name, metric_type, help_text, [({}, values[name])])
+            for name, (metric_type, help_text) in self.__declarations.items()
+        )
+
+
+class _MetricsServer(http.server.HTTPServer):
+    """
+    HTTP server with the collectors for its request handler.
+    """
+
+    def __init__(
+        self,
+        address: "tuple[str, int]",
+        collectors: "list[() -> str]",  # type: ignore
+        local_logger: logger.Logger,
+    ) -> None:
+        """
+        address: Host and port to bind.
+        collectors: See MetricsExporter.create().
+        local_logger: Logger for failed scrapes.
+        """
+        self.collectors = collectors
+        self.local_logger = local_logger
+        super().__init__(address, _MetricsRequestHandler)
+
+
+class _MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Responds to a scrape with the output of every collector.
+    """
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Serves METRICS_PATH, nothing else.
+        """
+        assert isinstance(self.server, _MetricsServer)
+
+        if self.path != METRICS_PATH:
+            self.send_error(404)
+            return
+
+        # Any failure of a collector, the exporter keeps serving
+        try:
+            body = "".join(collect() for collect in self.server.collectors).encode()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.server.local_logger.error(f"Failed to collect metrics: {e}", True)
+            self.send_error(500)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # pylint: disable=redefined-builtin
+        """
+        Does not log every scrape.
+        """
+
+
+class MetricsExporter:
+    """
+    Thread in main which serves metrics for Prometheus on `http://<host>:<port>/metrics`.
+
+    Collectors run on every scrape in the exporter thread. Workers record into shared memory
+    without locks (e.g. queue_statistics.QueueStatistics), and the collectors sum it.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        port: int,
+        collectors: "list[() -> str]",  # type: ignore
+        local_logger: logger.Logger,
+        host: str = "127.0.0.1",
+    ) -> "tuple[bool, MetricsExporter | None]":
+        """
+        Binds the endpoint, which is not served until started.
+
+        port: TCP port, 0 for any free port, see get_port().
+        collectors: Functions returning metrics in the text format, e.g. collect_queues().
+        local_logger: Existing logger from process.
+        host: Address to bind, localhost so that the metrics are not exposed to the network.
+
+        Returns whether the exporter was created and the exporter.
+        """
+        try:
+            server = _MetricsServer((host, port), collectors, local_logger)
+        except OSError as e:
+            local_logger.error(f"Failed to bind metrics endpoint {host}:{port}: {e}", True)
+            return False, None
+
+        return True, MetricsExporter(cls.__create_key, server)
+
+    def __init__(self, class_private_create_key: object, server: _MetricsServer) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is MetricsExporter.__create_key, "Use create() method"
+
+        self.__server = server
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="metrics_exporter", daemon=True
+        )
+
+    def get_port(self) -> int:
+        """
+        Returns the bound port.
+        """
+        return self.__server.server_address[1]
+
+    def start(self) -> None:
+        """
+        Starts serving.
+        """
+        self.__server.local_logger.info(
+            f"Serving metrics on http://{self.__server.server_address[0]}:{self.get_port()}"
+            f"{METRICS_PATH}",
+            True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the endpoint.
+        """
+        if self.__thread.is_alive():
+            self.__server.shutdown()
+            self.__thread.join()
+
+        self.__server.server_close()
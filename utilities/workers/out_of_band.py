@@ -0,0 +1,155 @@
+"""
+Out-of-band transport of large buffers through shared memory segments (pickle protocol 5),
+so that only a small header crosses the queue.
+
+Objects which pickle their data as `pickle.PickleBuffer` (e.g. NumPy arrays) are supported.
+The producer copies each large buffer once into a new segment and the consumer maps it,
+so the unpickled object uses the segment memory without another copy.
+"""
+
+import mmap
+import os
+import pathlib
+import pickle
+import secrets
+
+
+# POSIX shared memory (shm_open) on Linux
+SEGMENT_DIRECTORY = pathlib.Path("/dev/shm")
+# Segments left by a crashed producer or consumer start with this, followed by the producer PID
+SEGMENT_PREFIX = "worker_oob_"
+
+
+class OutOfBandItem:
+    """
+    Header queued in place of an item whose large buffers were moved into segments.
+    """
+
+    __slots__ = ("data", "segments")
+
+    def __init__(self, data: bytes, segments: "list[tuple[str, int]]") -> None:
+        """
+        data: Item pickled without its out-of-band buffers.
+        segments: Name and size in bytes of the segment for each out-of-band buffer, in order.
+        """
+        self.data = data
+        self.segments = segments
+
+
+def _write_segment(raw: memoryview) -> "tuple[str, int]":
+    """
+    Copies a buffer into a new segment.
+
+    Returns the name and size of the segment.
+    """
+    name = f"{SEGMENT_PREFIX}{os.getpid()}_{secrets.token_hex(8)}"
+    size = raw.nbytes
+    descriptor = os.open(SEGMENT_DIRECTORY / name, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+    try:
+        os.ftruncate(descriptor, size)
+        with mmap.mmap(descriptor, size) as segment:
+            segment[:] = raw
+    finally:
+        os.close(descriptor)
+
+    return name, size
+
+
+def _read_segment(name: str, size: int) -> mmap.mmap:
+    """
+    Maps a segment and removes its name, so it is freed once the mapping is no longer used.
+
+    Returns the mapping.
+    """
+    path = SEGMENT_DIRECTORY / name
+    descriptor = os.open(path, os.O_RDWR)
+    try:
+        segment = mmap.mmap(descriptor, size)
+    finally:
+        os.close(descriptor)
+        os.unlink(path)
+
+    return segment
+
+
+def release(item: object) -> None:
+    """
+    Removes the segments of an item which will not be unpacked, e.g. dropped from a queue.
+    Other items are ignored.
+    """
+    if not isinstance(item, OutOfBandItem):
+        return
+
+    for name, _ in item.segments:
+        try:
+            os.unlink(SEGMENT_DIRECTORY / name)
+        except FileNotFoundError:
+            pass
+
+
+def pack(item: object, threshold: int) -> object:
+    """
+    Moves the buffers of the item of at least `threshold` bytes into segments.
+    Call unpack() on the consumer, or release() if the item is not queued.
+
+    threshold: Smallest buffer in bytes worth a segment, > 0.
+
+    Returns the header, or the item pickled if it has no buffers that large,
+    so that the queue copies the bytes instead of pickling the item again.
+    """
+    assert threshold > 0
+
+    segments: "list[tuple[str, int]]" = []
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        """
+        Returns whether the buffer is pickled in-band.
+        """
+        try:
+            raw = buffer.raw()
+        # Not contiguous
+        except BufferError:
+            return True
+
+        if raw.nbytes < threshold:
+            return True
+
+        segments.append(_write_segment(raw))
+        return False
+
+    data = None
+    try:
+        data = pickle.dumps(item, 5, buffer_callback=buffer_callback)
+    finally:
+        # Segments written before pickling failed
+        if data is None:
+            release(OutOfBandItem(b"", segments))
+
+    if len(segments) == 0:
+        return data
+
+    return OutOfBandItem(data, segments)
+
+
+def unpack(item: object) -> object:
+    """
+    Restores an item packed by pack(), removing its segments. Sentinels are returned as is.
+
+    Returns the item.
+    """
+    # Pickled in-band by pack()
+    if isinstance(item, bytes):
+        return pickle.loads(item)
+
+    if not isinstance(item, OutOfBandItem):
+        return item
+
+    buffers = []
+    try:
+        for name, size in item.segments:
+            buffers.append(_read_segment(name, size))
+    except OSError:
+        release(item)
+        raise
+
+    return pickle.loads(item.data, buffers=buffers)
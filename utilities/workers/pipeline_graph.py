@@ -0,0 +1,524 @@
+"""
+Builds and runs a pipeline of workers and queues described by configuration.
+"""
+
+import importlib
+import multiprocessing.managers
+import time
+
+from modules.common.modules.logger import logger
+from utilities.workers import queue_backends
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_statistics
+from utilities.workers import sharded_queue
+from utilities.workers import worker_controller
+from utilities.workers import worker_manager
+from utilities.workers import worker_scheduling
+
+
+READY_POLL_PERIOD = 0.001  # seconds
+CLOSE_POLL_PERIOD = 0.01  # seconds
+DEFAULT_STAGE_CLOSE_TIMEOUT = 2.0  # seconds
+TERMINATE_GRACE_PERIOD = 0.5  # seconds
+DRAIN_BATCH_SIZE = 100
+
+
+def requires_manager(pipeline_config: dict) -> bool:
+    """
+    Whether any queue of a `pipeline` config section is backed by a manager,
+    so that main only starts a manager server process if it is used.
+    Invalid sections are reported by PipelineGraph.create().
+    """
+    try:
+        return any(
+            queue_config.get("backend", "manager") == queue_backends.QueueBackend.MANAGER.value
+            for queue_config in pipeline_config["queues"].values()
+        )
+    except (AttributeError, KeyError, TypeError):
+        return False
+
+
+class PipelineGraph:
+    """
+    Stages (identical workers) connected by queues, as described by a `pipeline` config section:
+
+    ```
+    pipeline:
+      queues:
+        <queue name>:
+          maxsize: <int, <= 0 for infinity>
+          backend: <QueueBackend value, default manager, simple_queue is unbounded>
+          max_item_size: <bytes, optional>
+          overflow_policy: <OverflowPolicy value, default block>
+          overflow_timeout: <seconds, optional for block_timeout>
+          sample_every: <int, optional for sample_every_n>
+          instrument: <bool, default false>
+          out_of_band_threshold: <bytes, optional to pass larger buffers through shared memory>
+          shard_key: <item attribute, optional to route items by key to the consumer workers>
+      stages:
+        <stage name>:
+          target: <module path>.<worker function>
+          count: <int>
+          min_count: <int, optional for autoscaling>
+          max_count: <int, optional for autoscaling>
+          hang_timeout: <seconds, optional for process mode>
+          mode: <WorkerMode value, default process>
+          cpu_affinity: [<CPU index>, ...] (optional)
+          nice: <-20 to 19, optional>
+          realtime_priority: <SCHED_FIFO priority 1 to 99, optional>
+          input_queues: [<queue name>, ...]
+          output_queues: [<queue name>, ...]
+    ```
+
+    Queues without a consumer stage are read by main.
+    A queue with a shard key has a shard (and maxsize) for each worker of its single consumer
+    stage, whose worker count must be fixed. Items with the same key go to the same worker in order.
+    Stages are started downstream first so every consumer is running before its producers,
+    and stopped in reverse so producers stop before their consumers, which drain their input.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        pipeline_config: dict,
+        controller: worker_controller.WorkerController,
+        mp_manager: multiprocessing.managers.SyncManager | None,
+        local_logger: logger.Logger,
+    ) -> "tuple[bool, PipelineGraph | None]":
+        """
+        Validates the configuration and creates the queues. Stages are created by create_stages().
+
+        pipeline_config: The `pipeline` section of the configuration.
+        controller: Worker controller shared by all stages.
+        mp_manager: Manager, only required for manager backed queues.
+        local_logger: Existing logger from process.
+
+        Returns whether the graph was created and the graph.
+        """
+        try:
+            queue_configs = pipeline_config["queues"]
+            stage_configs = pipeline_config["stages"]
+        except (KeyError, TypeError) as e:
+            local_logger.error(f"Pipeline config is missing a section: {e}", True)
+            return False, None
+
+        # Queues
+        queues = {}
+        for queue_name, queue_config in queue_configs.items():
+            try:
+                backend = queue_backends.QueueBackend(queue_config.get("backend", "manager"))
+                maxsize = int(queue_config["maxsize"])
+                max_item_size = int(
+                    queue_config.get("max_item_size", queue_backends.DEFAULT_MAX_ITEM_SIZE)
+                )
+                overflow_policy = queue_proxy_wrapper.OverflowPolicy(
+                    queue_config.get("overflow_policy", "block")
+                )
+                overflow_timeout = float(queue_config.get("overflow_timeout", 0.1))
+                sample_every = int(queue_config.get("sample_every", 10))
+                instrument = bool(queue_config.get("instrument", False))
+                out_of_band_threshold = int(queue_config.get("out_of_band_threshold", 0))
+            except (KeyError, TypeError, ValueError) as e:
+                local_logger.error(f"Invalid config for queue {queue_name}: {e}", True)
+                return False, None
+
+            if backend == queue_backends.QueueBackend.MANAGER and mp_manager is None:
+                local_logger.error(f"Queue {queue_name} requires a manager", True)
+                return False, None
+
+            # Producers would never block or drop, so the queue would grow without bound
+            if backend == queue_backends.QueueBackend.SIMPLE_QUEUE and maxsize > 0:
+                local_logger.error(
+                    f"Queue {queue_name} backend simple_queue is unbounded, maxsize must be <= 0",
+                    True,
+                )
+                return False, None
+
+            shard_key = queue_config.get("shard_key")
+            shard_count = 1
+            if shard_key is not None:
+                result, shard_count = PipelineGraph.__shard_count(
+                    queue_name, stage_configs, local_logger
+                )
+                if not result:
+                    return False, None
+
+            shards = [
+                queue_proxy_wrapper.QueueProxyWrapper(
+                    mp_manager,
+                    maxsize,
+                    backend,
+                    max_item_size,
+                    overflow_policy,
+                    overflow_timeout,
+                    sample_every,
+                    instrument,
+                    out_of_band_threshold,
+                )
+                for _ in range(shard_count)
+            ]
+            if shard_key is None:
+                queues[queue_name] = shards[0]
+            else:
+                queues[queue_name] = sharded_queue.ShardedQueue(shards, str(shard_key))
+
+        # Stages
+        stage_targets = {}
+        for stage_name, stage_config in stage_configs.items():
+            # Target is <module path>.<function name>
+            try:
+                module_name, function_name = stage_config["target"].rsplit(".", 1)
+                stage_targets[stage_name] = getattr(
+                    importlib.import_module(module_name), function_name
+                )
+            # Catching all exceptions for import of configured module
+            # pylint: disable-next=broad-exception-caught
+            except Exception as e:
+                local_logger.error(f"Invalid target for stage {stage_name}: {e}", True)
+                return False, None
+
+            for queue_name in stage_config.get("input_queues", []) + stage_config.get(
+                "output_queues", []
+            ):
+                if queue_name not in queues:
+                    local_logger.error(
+                        f"Stage {stage_name} uses undefined queue {queue_name}", True
+                    )
+                    return False, None
+
+        result, start_order = PipelineGraph.__downstream_first_order(stage_configs)
+        if not result:
+            local_logger.error("Pipeline stages form a cycle", True)
+            return False, None
+
+        return True, PipelineGraph(
+            cls.__create_key,
+            stage_configs,
+            stage_targets,
+            start_order,
+            queues,
+            controller,
+            local_logger,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        stage_configs: "dict[str, dict]",
+        stage_targets: "dict[str, (...) -> object]",  # type: ignore
+        start_order: "list[str]",
+        queues: "dict[str, queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]",
+        controller: worker_controller.WorkerController,
+        local_logger: logger.Logger,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is PipelineGraph.__create_key, "Use create() method"
+
+        self.__stage_configs = stage_configs
+        self.__stage_targets = stage_targets
+        self.__start_order = start_order
+        self.__queues = queues
+        self.__controller = controller
+        self.__local_logger = local_logger
+
+        # Filled by create_stages(), in start order
+        self.__worker_managers: "list[worker_manager.WorkerManager]" = []
+
+    @staticmethod
+    def __shard_count(
+        queue_name: str, stage_configs: "dict[str, dict]", local_logger: logger.Logger
+    ) -> "tuple[bool, int]":
+        """
+        Number of shards of a sharded queue, one per worker of its consumer stage.
+
+        Returns False if the queue does not have a single consumer stage with a fixed worker
+        count, and the number of shards.
+        """
+        consumer_configs = [
+            stage_config
+            for stage_config in stage_configs.values()
+            if queue_name in stage_config.get("input_queues", [])
+        ]
+        if len(consumer_configs) != 1:
+            local_logger.error(f"Sharded queue {queue_name} needs one consumer stage", True)
+            return False, 0
+
+        stage_config = consumer_configs[0]
+        try:
+            count = int(stage_config["count"])
+            min_count = int(stage_config.get("min_count", count))
+            max_count = int(stage_config.get("max_count", count))
+        except (KeyError, TypeError, ValueError) as e:
+            local_logger.error(f"Invalid consumer count for queue {queue_name}: {e}", True)
+            return False, 0
+
+        # Keys would be routed to shards without a worker
+        if not 0 < min_count == count == max_count:
+            local_logger.error(f"Consumer of sharded queue {queue_name} cannot be scaled", True)
+            return False, 0
+
+        return True, count
+
+    @staticmethod
+    def __downstream_first_order(stage_configs: "dict[str, dict]") -> "tuple[bool, list[str]]":
+        """
+        Orders stages so that every stage comes after all stages consuming its output.
+        Ties keep the configuration order.
+
+        Returns False if the stages form a cycle, and the order.
+        """
+        consumers = {}
+        for stage_name, stage_config in stage_configs.items():
+            for queue_name in stage_config.get("input_queues", []):
+                consumers.setdefault(queue_name, []).append(stage_name)
+
+        # Stage depends on every stage consuming one of its output queues
+        dependencies = {
+            stage_name: {
+                consumer
+                for queue_name in stage_config.get("output_queues", [])
+                for consumer in consumers.get(queue_name, [])
+            }
+            for stage_name, stage_config in stage_configs.items()
+        }
+
+        order = []
+        while len(order) < len(stage_configs):
+            ready = [
+                stage_name
+                for stage_name, stage_dependencies in dependencies.items()
+                if stage_name not in order and stage_dependencies.issubset(order)
+            ]
+            if len(ready) == 0:
+                return False, []
+
+            order += ready
+
+        return True, order
+
+    def get_queue(
+        self, queue_name: str
+    ) -> "queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue | None":
+        """
+        Returns the queue with the name, None if it does not exist.
+        """
+        return self.__queues.get(queue_name)
+
+    def get_drop_counts(self) -> "dict[str, int]":
+        """
+        Returns the number of items dropped by each queue's overflow policy, by queue name.
+        """
+        return {
+            queue_name: pipeline_queue.get_drop_count()
+            for queue_name, pipeline_queue in self.__queues.items()
+        }
+
+    def get_queue_depths(self) -> "dict[str, int]":
+        """
+        Returns the approximate number of items in each queue, by queue name.
+        """
+        return {
+            queue_name: pipeline_queue.qsize()
+            for queue_name, pipeline_queue in self.__queues.items()
+        }
+
+    def get_queue_statistics(
+        self, is_interval_restarted: bool = True
+    ) -> "dict[str, queue_statistics.QueueSummary]":
+        """
+        Returns the statistics of each instrumented queue, by queue name.
+
+        is_interval_restarted: See queue_statistics.QueueStatistics.get_summary().
+        """
+        summaries = {}
+        for queue_name, pipeline_queue in self.__queues.items():
+            summary = pipeline_queue.get_statistics(is_interval_restarted)
+            if summary is not None:
+                summaries[queue_name] = summary
+
+        return summaries
+
+    def get_worker_managers(self) -> "list[worker_manager.WorkerManager]":
+        """
+        Returns the worker managers of all stages, in start order.
+        """
+        return self.__worker_managers
+
+    def create_stages(self, work_arguments: "dict[str, tuple]") -> bool:
+        """
+        Creates the workers of every stage. Call after any selectors on the queues are created.
+
+        work_arguments: Runtime arguments for each stage by name, before its queues and controller.
+            Stages without an entry get no work arguments.
+
+        Returns whether all stages were created.
+        """
+        for stage_name in work_arguments:
+            if stage_name not in self.__stage_configs:
+                self.__local_logger.error(f"Work arguments for unknown stage {stage_name}", True)
+                return False
+
+        worker_managers = []
+        for stage_name in self.__start_order:
+            stage_config = self.__stage_configs[stage_name]
+
+            try:
+                count = int(stage_config["count"])
+                mode = worker_manager.WorkerMode(stage_config.get("mode", "process"))
+                min_count = int(stage_config.get("min_count", count))
+                max_count = int(stage_config.get("max_count", count))
+                hang_timeout = stage_config.get("hang_timeout")
+                if hang_timeout is not None:
+                    hang_timeout = float(hang_timeout)
+                cpu_affinity = stage_config.get("cpu_affinity")
+                if cpu_affinity is not None:
+                    cpu_affinity = {int(cpu) for cpu in cpu_affinity}
+                nice = stage_config.get("nice")
+                if nice is not None:
+                    nice = int(nice)
+                realtime_priority = stage_config.get("realtime_priority")
+                if realtime_priority is not None:
+                    realtime_priority = int(realtime_priority)
+            except (KeyError, TypeError, ValueError) as e:
+                self.__local_logger.error(f"Invalid config for stage {stage_name}: {e}", True)
+                return False
+
+            scheduling = None
+            if cpu_affinity is not None or nice is not None or realtime_priority is not None:
+                result, scheduling = worker_scheduling.WorkerScheduling.create(
+                    cpu_affinity, nice, realtime_priority, self.__local_logger
+                )
+                if not result:
+                    self.__local_logger.error(f"Invalid scheduling for stage {stage_name}", True)
+                    return False
+
+            result, properties = worker_manager.WorkerProperties.create(
+                count=count,
+                target=self.__stage_targets[stage_name],
+                work_arguments=work_arguments.get(stage_name, ()),
+                input_queues=[
+                    self.__queues[queue_name] for queue_name in stage_config.get("input_queues", [])
+                ],
+                output_queues=[
+                    self.__queues[queue_name]
+                    for queue_name in stage_config.get("output_queues", [])
+                ],
+                controller=self.__controller,
+                local_logger=self.__local_logger,
+                hang_timeout=hang_timeout,
+                min_count=min_count,
+                max_count=max_count,
+                mode=mode,
+                scheduling=scheduling,
+            )
+            if not result:
+                self.__local_logger.error(f"Failed to create {stage_name} properties", True)
+                return False
+
+            # Get Pylance to stop complaining
+            assert properties is not None
+
+            result, manager = worker_manager.WorkerManager.create(
+                worker_properties=properties,
+                local_logger=self.__local_logger,
+            )
+            if not result:
+                self.__local_logger.error(f"Failed to create {stage_name} manager", True)
+                return False
+
+            # Get Pylance to stop complaining
+            assert manager is not None
+
+            worker_managers.append(manager)
+
+        self.__worker_managers = worker_managers
+        return True
+
+    def start(self) -> None:
+        """
+        Starts all stages, downstream first.
+        """
+        for manager in self.__worker_managers:
+            manager.start_workers()
+
+    def wait_until_ready(self, timeout: float) -> bool:
+        """
+        Waits until every worker has started its first loop iteration (`controller.check_pause()`),
+        which is after its setup. Start paused to hold workers there, e.g. until connected.
+
+        timeout: Seconds.
+
+        Returns whether all workers are ready.
+        """
+        deadline = time.monotonic() + timeout
+        while not all(
+            progress > 0
+            for manager in self.__worker_managers
+            for _, progress in manager.get_worker_status()
+        ):
+            if time.monotonic() >= deadline:
+                return False
+
+            time.sleep(READY_POLL_PERIOD)
+
+        return True
+
+    def stop(self, stage_timeout: float = DEFAULT_STAGE_CLOSE_TIMEOUT) -> float:
+        """
+        Closes the stages upstream first, so each stage drains its input queues before exiting.
+        A stage which has not exited within the timeout is terminated, then killed.
+        Items in queues read by main are discarded, as main has stopped reading them.
+
+        stage_timeout: Seconds for each stage to drain and exit.
+
+        Returns the time taken in seconds.
+        """
+        start = time.monotonic()
+
+        # Paused workers cannot exit
+        self.__controller.request_resume()
+
+        consumed_queue_names = {
+            queue_name
+            for stage_config in self.__stage_configs.values()
+            for queue_name in stage_config.get("input_queues", [])
+        }
+        main_queues = [
+            main_queue
+            for queue_name, main_queue in self.__queues.items()
+            if queue_name not in consumed_queue_names
+        ]
+
+        discarded_count = 0
+        for manager in reversed(self.__worker_managers):
+            manager.request_close()
+            deadline = time.monotonic() + stage_timeout
+            while not manager.join_workers(CLOSE_POLL_PERIOD):
+                # Workers must not block on a put that main will never read
+                for main_queue in main_queues:
+                    discarded_count += len(main_queue.get_many(DRAIN_BATCH_SIZE, False))
+
+                # Sentinels which did not fit into a full input queue
+                manager.request_close()
+
+                if time.monotonic() >= deadline:
+                    self.__local_logger.warning(
+                        f"{manager.get_target_name()} did not exit within {stage_timeout}s",
+                        True,
+                    )
+                    manager.terminate_workers(TERMINATE_GRACE_PERIOD)
+                    break
+
+        for main_queue in main_queues:
+            discarded_count += len(main_queue.get_many(DRAIN_BATCH_SIZE, False))
+
+        elapsed = time.monotonic() - start
+        self.__local_logger.info(
+            f"Pipeline stopped in {elapsed:.3f}s, discarded {discarded_count} items for main",
+            True,
+        )
+        return elapsed
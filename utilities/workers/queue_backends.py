@@ -0,0 +1,577 @@
+"""
+Interprocess queue implementations selectable by QueueProxyWrapper.
+
+All backends provide the `queue.Queue` subset used by workers:
+put(), get(), put_nowait(), get_nowait(), empty(), qsize().
+"""
+
+import ctypes
+import enum
+import multiprocessing as mp
+import multiprocessing.managers
+import multiprocessing.queues
+import pickle
+import queue
+import time
+
+
+# Capacity used by backends that cannot be unbounded
+DEFAULT_CAPACITY = 1024
+DEFAULT_MAX_ITEM_SIZE = 4096  # bytes
+
+# Bytes a pipe backend lets sit in its pipe, so a write never waits for the reader.
+# Half the default pipe buffer of Linux, as partly read pages of the pipe still take a whole page
+PIPE_BUDGET = 32 * 1024  # bytes
+# Length prefix of a message sent by multiprocessing.connection
+_FRAME_HEADER_SIZE = 4  # bytes
+
+
+class QueueBackend(enum.Enum):
+    """
+    Queue implementation used by QueueProxyWrapper.
+    Values are the names used in configuration files.
+    """
+
+    # SyncManager server process, every operation is a socket round-trip
+    MANAGER = "manager"
+    # multiprocessing.Queue, pipe with a feeder thread in the producer
+    MP_QUEUE = "mp_queue"
+    # multiprocessing.SimpleQueue, unbounded pipe without a feeder thread
+    SIMPLE_QUEUE = "simple_queue"
+    # Bounded pipe with a slot semaphore
+    PIPE = "pipe"
+    # Fixed size slots in shared memory, no pipe involved
+    SHARED_MEMORY_RING = "shared_memory_ring"
+
+
+def _remaining(deadline: "float | None") -> "float | None":
+    """
+    Seconds until the deadline, None for no deadline.
+    """
+    if deadline is None:
+        return None
+
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def _acquire(lock: "mp.synchronize.SemLock", block: bool, timeout: "float | None") -> bool:
+    """
+    Acquire with the `queue.Queue` block and timeout semantics.
+    """
+    if not block:
+        return lock.acquire(False)
+
+    if timeout is None:
+        return lock.acquire()
+
+    return lock.acquire(True, timeout)
+
+
+class BatchQueue(queue.Queue):
+    """
+    Queue living in the manager server process with batch operations,
+    so a whole batch costs a single round-trip through the proxy.
+    """
+
+    # Names are those of queue.Queue's hooks
+    # pylint: disable-next=invalid-name
+    def _init(self, maxsize: int) -> None:
+        super()._init(maxsize)
+        self.__get_count = 0
+
+    # pylint: disable-next=invalid-name
+    def _get(self) -> object:
+        self.__get_count += 1
+        return super()._get()
+
+    def get_count(self) -> int:
+        """
+        Number of items taken since creation.
+        """
+        with self.mutex:
+            return self.__get_count
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: "float | None" = None
+    ) -> int:
+        """
+        Puts items in order, waiting for free space as needed.
+
+        Returns the number of items put, which is less than `len(items)`
+        if the queue stayed full past the timeout.
+        """
+        deadline = None if timeout is None or not block else time.monotonic() + timeout
+        count = 0
+        with self.not_full:
+            for item in items:
+                while 0 < self.maxsize <= self._qsize():
+                    remaining = _remaining(deadline)
+                    if not block or remaining == 0.0:
+                        return count
+                    self.not_full.wait(remaining)
+
+                self._put(item)
+                self.unfinished_tasks += 1
+                count += 1
+                self.not_empty.notify()
+
+        return count
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: "float | None" = None
+    ) -> "list[object]":
+        """
+        Waits for at least one item and then takes up to `max_items` without waiting.
+
+        Returns the items, empty if nothing arrived within the timeout.
+        """
+        deadline = None if timeout is None or not block else time.monotonic() + timeout
+        with self.not_empty:
+            while self._qsize() == 0:
+                remaining = _remaining(deadline)
+                if not block or remaining == 0.0:
+                    return []
+                self.not_empty.wait(remaining)
+
+            items = []
+            while self._qsize() > 0 and len(items) < max_items:
+                items.append(self._get())
+            self.not_full.notify(len(items))
+
+        return items
+
+
+class WorkerQueueManager(multiprocessing.managers.SyncManager):
+    """
+    SyncManager which can also create BatchQueue.
+    """
+
+
+WorkerQueueManager.register("BatchQueue", BatchQueue)
+
+
+def create_manager() -> WorkerQueueManager:
+    """
+    Starts a manager server process for manager backed queues.
+
+    Returns the started manager.
+    """
+    # Manager lifetime is the caller's, shut down explicitly
+    mp_manager = WorkerQueueManager()
+    mp_manager.start()  # pylint: disable=consider-using-with
+    return mp_manager
+
+
+class _PipeWriter:
+    """
+    Writes messages to a pipe while keeping the bytes not yet read within PIPE_BUDGET,
+    so that a write holding the write lock never waits for the reader.
+    """
+
+    def __init__(self, writer: "mp.connection.Connection") -> None:
+        self.__writer = writer
+        # Also the write lock
+        self.__space = mp.Condition(mp.Lock())
+        self.__byte_count = mp.RawValue(ctypes.c_uint64, 0)
+        self.__put_count = mp.RawValue(ctypes.c_uint64, 0)
+
+    def send(self, data: bytes, block: bool, timeout: "float | None") -> bool:
+        """
+        Waits for space in the pipe with the `queue.Queue` block and timeout semantics.
+        A message larger than the budget is written only by a blocking put without timeout,
+        once the pipe is empty, and then waits for the reader like a plain pipe.
+
+        Returns whether the message was written.
+        """
+        deadline = None if timeout is None or not block else time.monotonic() + timeout
+        size = len(data) + _FRAME_HEADER_SIZE
+        if not self.__space.acquire(block, timeout):
+            return False
+
+        try:
+            if size > PIPE_BUDGET:
+                if not block or timeout is not None:
+                    return False
+                self.__space.wait_for(lambda: self.__byte_count.value == 0)
+            elif not self.__space.wait_for(
+                lambda: self.__byte_count.value + size <= PIPE_BUDGET,
+                _remaining(deadline) if block else 0.0,
+            ):
+                return False
+
+            self.__writer.send_bytes(data)
+            self.__byte_count.value += size
+            self.__put_count.value += 1
+        finally:
+            self.__space.release()
+
+        return True
+
+    def received(self, data: bytes) -> None:
+        """
+        Frees the space of a message taken by the reader.
+        """
+        with self.__space:
+            self.__byte_count.value -= len(data) + _FRAME_HEADER_SIZE
+            self.__space.notify_all()
+
+    def get_put_count(self) -> int:
+        """
+        Number of messages written since creation.
+        """
+        return self.__put_count.value
+
+
+class SimpleQueueBackend(multiprocessing.queues.SimpleQueue):
+    """
+    multiprocessing.SimpleQueue with timeouts on get.
+
+    `maxsize` is not enforced, put waits only while the pipe holds PIPE_BUDGET bytes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(ctx=mp.get_context())
+        # Approximate size, updated under the read and write locks
+        self.__pipe_writer = _PipeWriter(self._writer)
+        self.__get_count = mp.RawValue(ctypes.c_uint64, 0)
+
+    def __getstate__(self) -> "tuple":
+        return super().__getstate__() + (self.__pipe_writer, self.__get_count)
+
+    def __setstate__(self, state: "tuple") -> None:
+        super().__setstate__(state[:-2])
+        self.__pipe_writer, self.__get_count = state[-2:]
+
+    def put(self, obj: object, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Raises queue.Full if the pipe has no space for the item within the timeout.
+        """
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        if not self.__pipe_writer.send(data, block, timeout):
+            raise queue.Full
+
+    def put_nowait(self, obj: object) -> None:
+        """
+        Same as put(obj, False).
+        """
+        self.put(obj, False)
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Raises queue.Empty if nothing is available within the timeout.
+        """
+        deadline = None if timeout is None or not block else time.monotonic() + timeout
+        if not _acquire(self._rlock, block, timeout):
+            raise queue.Empty
+
+        try:
+            if block and deadline is None:
+                data = self._reader.recv_bytes()
+            else:
+                remaining = _remaining(deadline) if block else 0.0
+                if not self._reader.poll(remaining):
+                    raise queue.Empty
+                data = self._reader.recv_bytes()
+            self.__get_count.value += 1
+        finally:
+            self._rlock.release()
+
+        self.__pipe_writer.received(data)
+        return pickle.loads(data)
+
+    def get_nowait(self) -> object:
+        """
+        Same as get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Approximate number of items in the queue.
+        """
+        return max(self.__pipe_writer.get_put_count() - self.__get_count.value, 0)
+
+    def get_count(self) -> int:
+        """
+        Number of items taken since creation.
+        """
+        return self.__get_count.value
+
+
+class PipeQueue:
+    """
+    Bounded queue over a single pipe.
+    A semaphore counts free slots so the pipe never holds more than `maxsize` items,
+    and the pipe never holds more than PIPE_BUDGET bytes.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.__reader, writer = mp.Pipe(duplex=False)
+        self.__read_lock = mp.Lock()
+        self.__pipe_writer = _PipeWriter(writer)
+        self.__slots = mp.BoundedSemaphore(maxsize) if maxsize > 0 else None
+        self.__get_count = mp.RawValue(ctypes.c_uint64, 0)
+
+    def put(self, obj: object, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Raises queue.Full if no slot, or no space in the pipe, becomes free within the timeout.
+        """
+        deadline = None if timeout is None or not block else time.monotonic() + timeout
+        if self.__slots is not None and not _acquire(self.__slots, block, timeout):
+            raise queue.Full
+
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        if not self.__pipe_writer.send(data, block, _remaining(deadline)):
+            if self.__slots is not None:
+                self.__slots.release()
+            raise queue.Full
+
+    def put_nowait(self, obj: object) -> None:
+        """
+        Same as put(obj, False).
+        """
+        self.put(obj, False)
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Raises queue.Empty if nothing is available within the timeout.
+        """
+        deadline = None if timeout is None or not block else time.monotonic() + timeout
+        if not _acquire(self.__read_lock, block, timeout):
+            raise queue.Empty
+
+        try:
+            if block and deadline is None:
+                data = self.__reader.recv_bytes()
+            else:
+                remaining = _remaining(deadline) if block else 0.0
+                if not self.__reader.poll(remaining):
+                    raise queue.Empty
+                data = self.__reader.recv_bytes()
+            self.__get_count.value += 1
+        finally:
+            self.__read_lock.release()
+
+        self.__pipe_writer.received(data)
+        if self.__slots is not None:
+            self.__slots.release()
+
+        return pickle.loads(data)
+
+    def get_nowait(self) -> object:
+        """
+        Same as get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Approximate number of items in the queue.
+        """
+        return max(self.__pipe_writer.get_put_count() - self.__get_count.value, 0)
+
+    def get_count(self) -> int:
+        """
+        Number of items taken since creation.
+        """
+        return self.__get_count.value
+
+    def empty(self) -> bool:
+        """
+        Approximate, like `queue.Queue.empty()`.
+        """
+        return self.qsize() == 0
+
+
+class SharedMemoryRingQueue:  # pylint: disable=too-many-instance-attributes
+    """
+    Bounded queue of fixed size slots in shared memory.
+    Items are pickled directly into a slot, so an item must fit in `max_item_size` bytes.
+    """
+
+    def __init__(self, capacity: int, max_item_size: int) -> None:
+        self.__capacity = capacity
+        self.__max_item_size = max_item_size
+        self.__buffer = mp.RawArray(ctypes.c_ubyte, capacity * max_item_size)
+        self.__lengths = mp.RawArray(ctypes.c_uint32, capacity)
+
+        # Monotonic counters, slot index is count modulo capacity
+        self.__put_count = mp.RawValue(ctypes.c_uint64, 0)
+        self.__get_count = mp.RawValue(ctypes.c_uint64, 0)
+        self.__put_lock = mp.Lock()
+        self.__get_lock = mp.Lock()
+        self.__items = mp.Semaphore(0)
+        self.__spaces = mp.Semaphore(capacity)
+
+    def put(self, obj: object, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Raises queue.Full if no slot becomes free within the timeout,
+        and ValueError if the pickled item does not fit in a slot.
+        """
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.__max_item_size:
+            raise ValueError(
+                f"Item of {len(data)} bytes exceeds slot size of {self.__max_item_size} bytes"
+            )
+
+        if not _acquire(self.__spaces, block, timeout):
+            raise queue.Full
+
+        with self.__put_lock:
+            index = self.__put_count.value % self.__capacity
+            start = index * self.__max_item_size
+            memoryview(self.__buffer).cast("B")[start : start + len(data)] = data
+            self.__lengths[index] = len(data)
+            self.__put_count.value += 1
+            self.__items.release()
+
+    def put_nowait(self, obj: object) -> None:
+        """
+        Same as put(obj, False).
+        """
+        self.put(obj, False)
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Raises queue.Empty if nothing is available within the timeout.
+        """
+        if not _acquire(self.__items, block, timeout):
+            raise queue.Empty
+
+        with self.__get_lock:
+            index = self.__get_count.value % self.__capacity
+            start = index * self.__max_item_size
+            data = bytes(memoryview(self.__buffer).cast("B")[start : start + self.__lengths[index]])
+            self.__get_count.value += 1
+
+        self.__spaces.release()
+        return pickle.loads(data)
+
+    def get_nowait(self) -> object:
+        """
+        Same as get(False).
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Approximate number of items in the queue.
+        """
+        return max(self.__put_count.value - self.__get_count.value, 0)
+
+    def get_count(self) -> int:
+        """
+        Number of items taken since creation.
+        """
+        return self.__get_count.value
+
+    def empty(self) -> bool:
+        """
+        Approximate, like `queue.Queue.empty()`.
+        """
+        return self.qsize() == 0
+
+
+def create_queue(
+    backend: QueueBackend,
+    mp_manager: multiprocessing.managers.SyncManager | None,
+    maxsize: int,
+    max_item_size: int = DEFAULT_MAX_ITEM_SIZE,
+) -> object:
+    """
+    Creates the underlying queue for a backend.
+
+    backend: Queue implementation.
+    mp_manager: Manager, only required for the manager backend.
+    maxsize: Maximum number of items, <= 0 for infinite (or DEFAULT_CAPACITY if not supported).
+    max_item_size: Slot size in bytes, only used by the shared memory ring backend.
+
+    Returns the queue.
+    """
+    if backend == QueueBackend.MANAGER:
+        assert mp_manager is not None, "Manager backend requires a SyncManager"
+        # Plain SyncManager still works, but without single round-trip batches
+        if isinstance(mp_manager, WorkerQueueManager):
+            return mp_manager.BatchQueue(maxsize)
+
+        return mp_manager.Queue(maxsize)
+
+    if backend == QueueBackend.MP_QUEUE:
+        return mp.Queue(maxsize)
+
+    if backend == QueueBackend.SIMPLE_QUEUE:
+        return SimpleQueueBackend()
+
+    if backend == QueueBackend.PIPE:
+        return PipeQueue(maxsize)
+
+    if backend == QueueBackend.SHARED_MEMORY_RING:
+        capacity = maxsize if maxsize > 0 else DEFAULT_CAPACITY
+        return SharedMemoryRingQueue(capacity, max_item_size)
+
+    raise ValueError(f"Unknown backend {backend}")
+
+
+def get_count(underlying_queue: object) -> "int | None":
+    """
+    Number of items taken from the queue since creation, for throughput.
+
+    Returns the count, None if the queue does not count (multiprocessing.Queue
+    or a plain SyncManager queue).
+    """
+    native_get_count = getattr(underlying_queue, "get_count", None)
+    if native_get_count is None:
+        return None
+
+    return native_get_count()
+
+
+def put_many(
+    underlying_queue: object, items: "list[object]", block: bool, timeout: "float | None"
+) -> int:
+    """
+    Puts items in order, using the native batch operation if the queue has one.
+
+    Returns the number of items put.
+    """
+    native_put_many = getattr(underlying_queue, "put_many", None)
+    if native_put_many is not None:
+        return native_put_many(items, block, timeout)
+
+    deadline = None if timeout is None or not block else time.monotonic() + timeout
+    count = 0
+    for item in items:
+        try:
+            underlying_queue.put(item, block, _remaining(deadline))
+        except queue.Full:
+            break
+        count += 1
+
+    return count
+
+
+def get_many(
+    underlying_queue: object, max_items: int, block: bool, timeout: "float | None"
+) -> "list[object]":
+    """
+    Waits for at least one item and then takes up to `max_items` without waiting,
+    using the native batch operation if the queue has one.
+
+    Returns the items, empty if nothing arrived within the timeout.
+    """
+    native_get_many = getattr(underlying_queue, "get_many", None)
+    if native_get_many is not None:
+        return native_get_many(max_items, block, timeout)
+
+    try:
+        items = [underlying_queue.get(block, timeout)]
+    except queue.Empty:
+        return []
+
+    while len(items) < max_items:
+        try:
+            items.append(underlying_queue.get(False))
+        except queue.Empty:
+            break
+
+    return items
@@ -2,24 +2,400 @@
 Queue.
 """
 
+import ctypes
+import enum
+import multiprocessing as mp
 import multiprocessing.managers
+import multiprocessing.synchronize
 import queue
 import time
 
+from utilities.workers import out_of_band
+from utilities.workers import queue_backends
+from utilities.workers import queue_statistics
 
-class QueueProxyWrapper:
+
+class OverflowPolicy(enum.Enum):
+    """
+    What a blocking put does when the queue is full.
+    Values are the names used in configuration files.
+    """
+
+    # Wait for space, raise queue.Full only after the caller's timeout
+    BLOCK = "block"
+    # Wait for space up to the overflow timeout, then drop the new item
+    BLOCK_TIMEOUT = "block_timeout"
+    # Drop the new item without waiting
+    DROP_NEWEST = "drop_newest"
+    # Drop the oldest queued item to make space, without waiting
+    DROP_OLDEST = "drop_oldest"
+    # Drop the new item, except that every Nth overflowing item replaces the oldest,
+    # so a stalled consumer still receives a thinned but fresh stream
+    SAMPLE_EVERY_N = "sample_every_n"
+
+
+class QueueProxyWrapper:  # pylint: disable=too-many-instance-attributes
     """
     Wrapper for an underlying queue proxy which also stores `maxsize`.
 
     `maxsize <= 0` means infinite size.
+
+    If instrumented, items are queued as `(put time, item)` to measure residence time.
+    Put and get through the wrapper. Sentinels (None) are put unstamped by put_sentinel()
+    and fill_queue_with_sentinel(), so they are not counted.
+
+    With an out-of-band threshold, large buffers of items are moved into shared memory segments
+    and only a header is queued, see out_of_band.pack(). Items dropped by the wrapper (overflow
+    policy, drain_queue()) have their segments removed; items left in the queue when every
+    process has exited leave their segments in out_of_band.SEGMENT_DIRECTORY.
     """
 
+    # Attempts to make space by dropping the oldest item when racing other producers
+    __EVICT_ATTEMPTS = 3
+
     __QUEUE_TIMEOUT = 0.1  # seconds
     __QUEUE_DELAY = 0.1  # seconds
 
-    def __init__(self, mp_manager: multiprocessing.managers.SyncManager, maxsize: int = 0) -> None:
-        self.queue = mp_manager.Queue(maxsize)
+    def __init__(
+        self,
+        mp_manager: multiprocessing.managers.SyncManager | None,
+        maxsize: int = 0,
+        backend: queue_backends.QueueBackend = queue_backends.QueueBackend.MANAGER,
+        max_item_size: int = queue_backends.DEFAULT_MAX_ITEM_SIZE,
+        overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        overflow_timeout: float = 0.1,
+        sample_every: int = 10,
+        instrument: bool = False,
+        out_of_band_threshold: int = 0,
+    ) -> None:
+        """
+        mp_manager: Manager, only required for the manager backend.
+        maxsize: Maximum number of items.
+        backend: Underlying queue implementation.
+        max_item_size: Maximum pickled item size in bytes, only used by the shared memory ring.
+        overflow_policy: What a blocking put does when the queue is full.
+        overflow_timeout: Seconds to wait for space with OverflowPolicy.BLOCK_TIMEOUT.
+        sample_every: N for OverflowPolicy.SAMPLE_EVERY_N, counted per producer.
+        instrument: Record depth, residence time and throughput, see get_statistics().
+        out_of_band_threshold: Buffers of at least this many bytes (e.g. NumPy arrays) are passed
+            through shared memory instead of the queue, <= 0 to pickle everything into the queue.
+        """
+        self.queue = queue_backends.create_queue(backend, mp_manager, maxsize, max_item_size)
         self.maxsize = maxsize
+        self.backend = backend
+        self.overflow_policy = overflow_policy
+        self.__overflow_timeout = overflow_timeout
+        self.__sample_every = max(sample_every, 1)
+        self.__out_of_band_threshold = out_of_band_threshold
+
+        # Items dropped by the overflow policy, by all producers
+        self.__drop_count = mp.Value(ctypes.c_uint64, 0)
+        # Overflowing puts of this producer, for sampling
+        self.__overflow_count = 0
+
+        # Events set after every put, for queue_select.QueueSelector
+        self.__listeners: "list[multiprocessing.synchronize.Event]" = []
+        # Events set after the first put only, with whether any producer has set it yet
+        self.__once_listeners: "list[tuple[multiprocessing.synchronize.Event, ctypes.c_bool]]" = []
+
+        self.__statistics = queue_statistics.QueueStatistics() if instrument else None
+        # Manager qsize() is a round-trip, too slow to record on every put
+        self.__is_depth_recorded = backend != queue_backends.QueueBackend.MANAGER
+
+    def add_listener(self, event: "multiprocessing.synchronize.Event", once: bool = False) -> None:
+        """
+        Registers an event that is set after every put, or only after the first put.
+        Must be called before the queue is passed to workers.
+
+        once: Set only after the first put, e.g. for startup. Later puts read a shared flag
+            instead of setting the event, which takes a lock.
+        """
+        if once:
+            self.__once_listeners.append((event, mp.RawValue(ctypes.c_bool, False)))
+            return
+
+        self.__listeners.append(event)
+
+    def __notify_listeners(self) -> None:
+        """
+        Wakes anything waiting on this queue.
+        """
+        for event in self.__listeners:
+            event.set()
+
+        for event, is_notified in self.__once_listeners:
+            # Producers racing on the first put set the event more than once, which is harmless
+            if not is_notified.value:
+                is_notified.value = True
+                event.set()
+
+    def get_drop_count(self) -> int:
+        """
+        Returns the number of items dropped by the overflow policy.
+        """
+        return self.__drop_count.value
+
+    def get_statistics(
+        self, is_interval_restarted: bool = True
+    ) -> "queue_statistics.QueueSummary | None":
+        """
+        Returns the statistics of all producers and consumers, None if not instrumented.
+        Depth is not recorded for the manager backend.
+
+        is_interval_restarted: See queue_statistics.QueueStatistics.get_summary().
+        """
+        if self.__statistics is None:
+            return None
+
+        return self.__statistics.get_summary(is_interval_restarted)
+
+    def __record_put(self, count: int) -> None:
+        """
+        Records queued items.
+        """
+        assert self.__statistics is not None
+
+        depth = 0
+        if self.__is_depth_recorded:
+            try:
+                depth = self.queue.qsize()
+            # Not implemented on some platforms
+            except NotImplementedError:
+                pass
+
+        for _ in range(count):
+            self.__statistics.record_put(depth)
+
+    def __unstamp(self, item: object) -> object:
+        """
+        Records the residence time of a stamped item.
+
+        Returns the item put by the producer.
+        """
+        # Sentinels are put without a stamp, see put_sentinel()
+        if item is None:
+            return None
+
+        assert self.__statistics is not None
+
+        # Tuple pickles several times faster than a class
+        put_time, item = item  # type: ignore
+        self.__statistics.record_get(time.monotonic() - put_time)
+        return item
+
+    def __pack(self, item: object) -> object:
+        """
+        Moves large buffers of the item out-of-band if enabled.
+
+        Returns the item to queue.
+        """
+        if self.__out_of_band_threshold <= 0 or item is None:
+            return item
+
+        return out_of_band.pack(item, self.__out_of_band_threshold)
+
+    def __release(self, item: object) -> None:
+        """
+        Removes the segments of a queued item which is dropped.
+        """
+        if self.__out_of_band_threshold <= 0 or item is None:
+            return
+
+        if self.__statistics is not None:
+            _, item = item  # type: ignore
+
+        out_of_band.release(item)
+
+    def __count_drop(self) -> None:
+        """
+        Counts an item dropped by the overflow policy.
+        """
+        with self.__drop_count.get_lock():
+            self.__drop_count.value += 1
+
+    def __put_evicting_oldest(self, item: object) -> bool:
+        """
+        Puts without waiting, dropping the oldest item to make space.
+
+        Returns whether the item was queued.
+        """
+        for _ in range(self.__EVICT_ATTEMPTS):
+            try:
+                self.queue.put(item, False)
+                return True
+            except queue.Full:
+                pass
+
+            try:
+                self.__release(self.queue.get(False))
+                self.__count_drop()
+            except queue.Empty:
+                pass
+
+        # Other producers keep filling the space
+        self.__count_drop()
+        return False
+
+    def __put_with_policy(self, item: object, timeout: "float | None") -> bool:
+        """
+        Puts applying the overflow policy.
+
+        Returns whether the item was queued.
+        """
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            self.queue.put(item, True, timeout)
+            return True
+
+        if self.overflow_policy == OverflowPolicy.BLOCK_TIMEOUT:
+            try:
+                self.queue.put(item, True, self.__overflow_timeout if timeout is None else timeout)
+                return True
+            except queue.Full:
+                self.__count_drop()
+                return False
+
+        try:
+            self.queue.put(item, False)
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+            return self.__put_evicting_oldest(item)
+
+        if self.overflow_policy == OverflowPolicy.SAMPLE_EVERY_N:
+            self.__overflow_count += 1
+            if self.__overflow_count % self.__sample_every == 0:
+                return self.__put_evicting_oldest(item)
+
+        self.__count_drop()
+        return False
+
+    def put(self, item: object, block: bool = True, timeout: "float | None" = None) -> bool:
+        """
+        Puts an item into the queue. A blocking put applies the overflow policy,
+        a non-blocking put raises queue.Full if the queue is full.
+
+        Raises queue.Full if the queue is full after the timeout with OverflowPolicy.BLOCK.
+
+        Returns whether the item was queued, False if dropped by the overflow policy.
+        """
+        item = self.__pack(item)
+        if self.__statistics is not None:
+            item = (time.monotonic(), item)
+
+        is_queued = False
+        try:
+            if block:
+                is_queued = self.__put_with_policy(item, timeout)
+            else:
+                self.queue.put(item, False)
+                is_queued = True
+        finally:
+            if not is_queued:
+                self.__release(item)
+
+        if is_queued:
+            if self.__statistics is not None:
+                self.__record_put(1)
+
+            self.__notify_listeners()
+
+        return is_queued
+
+    def put_sentinel(self, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Puts a sentinel (None), which is not counted by the instrumentation
+        and ignores the overflow policy.
+
+        Raises queue.Full if the queue is full after the timeout.
+        """
+        self.queue.put(None, block, timeout)
+        self.__notify_listeners()
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Gets an item from the queue.
+
+        Raises queue.Empty if the queue is empty after the timeout.
+        """
+        item = self.queue.get(block, timeout)
+        if self.__statistics is not None:
+            item = self.__unstamp(item)
+
+        if self.__out_of_band_threshold <= 0:
+            return item
+
+        return out_of_band.unpack(item)
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: "float | None" = None
+    ) -> int:
+        """
+        Puts items in order, in a single round-trip where the backend supports it.
+
+        Returns the number of items put, less than `len(items)` if the queue
+        stayed full past the timeout or items were dropped by the overflow policy.
+        """
+        if block and self.overflow_policy != OverflowPolicy.BLOCK:
+            return sum(self.put(item, True, timeout) for item in items)
+
+        items = [self.__pack(item) for item in items]
+        if self.__statistics is not None:
+            put_time = time.monotonic()
+            items = [(put_time, item) for item in items]
+
+        count = 0
+        try:
+            count = queue_backends.put_many(self.queue, items, block, timeout)
+        finally:
+            for item in items[count:]:
+                self.__release(item)
+
+        if count > 0:
+            if self.__statistics is not None:
+                self.__record_put(count)
+
+            self.__notify_listeners()
+
+        return count
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: "float | None" = None
+    ) -> "list[object]":
+        """
+        Waits for at least one item and then gets up to `max_items` that are already queued,
+        in a single round-trip where the backend supports it.
+
+        Returns the items, empty if the queue is still empty after the timeout.
+        """
+        items = queue_backends.get_many(self.queue, max_items, block, timeout)
+        if self.__statistics is not None:
+            items = [self.__unstamp(item) for item in items]
+
+        if self.__out_of_band_threshold <= 0:
+            return items
+
+        return [out_of_band.unpack(item) for item in items]
+
+    def get_consumed_count(self) -> "int | None":
+        """
+        Returns the number of items taken from the queue since creation, including sentinels
+        and items dropped by the overflow policy. None if not supported by the backend.
+        """
+        return queue_backends.get_count(self.queue)
+
+    def empty(self) -> bool:
+        """
+        Whether the queue is empty. Approximate.
+        """
+        return self.queue.empty()
+
+    def qsize(self) -> int:
+        """
+        Number of items in the queue. Approximate.
+        """
+        return self.queue.qsize()
 
     def fill_queue_with_sentinel(self, timeout: float = 0.0) -> None:
         """
@@ -47,7 +423,7 @@ class QueueProxyWrapper:
 
         try:
             for _ in range(self.maxsize):
-                self.queue.get(timeout=timeout)
+                self.__release(self.queue.get(timeout=timeout))
         except queue.Empty:
             return
 
@@ -0,0 +1,131 @@
+"""
+Waiting on several queues at once.
+"""
+
+import copy
+import multiprocessing as mp
+import time
+
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import sharded_queue
+from utilities.workers import worker_controller
+
+
+class QueueSelector:
+    """
+    Blocks until at least one of several queues has data, like select() for queues.
+
+    Producers signal the selector on every put, so it must be created
+    before the workers using these queues are started.
+
+    With sharded queues, each consumer worker gets a copy bound to its shard by its
+    worker manager, see bind_worker(), which is woken only by puts into that shard.
+    """
+
+    def __init__(
+        self,
+        queues: "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]",
+        controller: worker_controller.WorkerController | None = None,
+    ) -> None:
+        """
+        queues: Queues to wait on.
+        controller: If provided, an exit request also wakes the selector.
+        """
+        self.__queues = queues
+        self.__controller = controller
+        self.__event = mp.Event()
+
+        # One per shard, so that workers consuming different shards do not clear each other's
+        # wake ups
+        shard_count = max(
+            (
+                len(input_queue.get_shards())
+                for input_queue in queues
+                if isinstance(input_queue, sharded_queue.ShardedQueue)
+            ),
+            default=0,
+        )
+        self.__shard_events = [mp.Event() for _ in range(shard_count)]
+
+        for input_queue in queues:
+            input_queue.add_listener(self.__event)
+            if isinstance(input_queue, sharded_queue.ShardedQueue):
+                input_queue.add_shard_listeners(
+                    self.__shard_events[: len(input_queue.get_shards())]
+                )
+            else:
+                for event in self.__shard_events:
+                    input_queue.add_listener(event)
+
+        if controller is not None:
+            controller.add_exit_listener(self.__event)
+            for event in self.__shard_events:
+                controller.add_exit_listener(event)
+
+    def bind_worker(self, worker_index: int) -> "QueueSelector":
+        """
+        Creates a copy for a single worker which waits only on the worker's shard
+        of sharded queues. Returns this selector if there are no sharded queues.
+
+        worker_index: Index of the worker, which is also the index of its shard.
+
+        Returns the bound selector.
+        """
+        if len(self.__shard_events) == 0:
+            return self
+
+        bound_selector = copy.copy(self)
+        # Copy is the same class, which pylint cannot infer
+        # pylint: disable=protected-access,unused-private-member
+        bound_selector.__queues = [
+            (
+                input_queue.bind_worker(worker_index)
+                if isinstance(input_queue, sharded_queue.ShardedQueue)
+                else input_queue
+            )
+            for input_queue in self.__queues
+        ]
+        bound_selector.__event = self.__shard_events[worker_index % len(self.__shard_events)]
+        return bound_selector
+
+    def __ready_queues(
+        self,
+    ) -> "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]":
+        """
+        Queues which currently have data.
+        """
+        return [input_queue for input_queue in self.__queues if not input_queue.empty()]
+
+    def __is_exit_requested(self) -> bool:
+        """
+        Whether the controller, if any, has requested exit.
+        """
+        return self.__controller is not None and self.__controller.is_exit_requested()
+
+    def wait(
+        self, timeout: "float | None" = None
+    ) -> "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]":
+        """
+        Waits until at least one queue has data, the timeout expires, or exit is requested.
+
+        timeout: Seconds, None to wait forever.
+
+        Returns the queues which have data, empty on timeout or exit request.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            ready = self.__ready_queues()
+            if len(ready) > 0 or self.__is_exit_requested():
+                return ready
+
+            # Clear before checking again, so a put after the check sets it and wakes the wait
+            self.__event.clear()
+            ready = self.__ready_queues()
+            if len(ready) > 0 or self.__is_exit_requested():
+                return ready
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0.0:
+                return []
+
+            self.__event.wait(remaining)
@@ -0,0 +1,296 @@
+"""
+Queue instrumentation: depth, residence time and throughput.
+"""
+
+import ctypes
+import multiprocessing as mp
+import os
+import threading
+import time
+
+
+# Bucket i counts residence times below 2**i microseconds, the last bucket counts the rest
+RESIDENCE_BUCKET_COUNT = 28
+# Processes and threads recording to one queue at once, any further ones share the last slot
+MAX_SLOTS = 32
+
+# Layout of each slot in the shared counters
+_PUT_COUNT = 0
+_GET_COUNT = 1
+_DEPTH_HIGH_WATER = 2
+_RESIDENCE_TOTAL = 3  # microseconds
+_FIRST_BUCKET = 4
+_SLOT_SIZE = _FIRST_BUCKET + RESIDENCE_BUCKET_COUNT
+
+
+def get_bucket(microseconds: int) -> int:
+    """
+    Returns the histogram bucket of a duration, see RESIDENCE_BUCKET_COUNT.
+    """
+    return min(microseconds.bit_length(), RESIDENCE_BUCKET_COUNT - 1)
+
+
+def histogram_percentile(histogram: "list[int]", fraction: float) -> float:
+    """
+    Upper bound in seconds of the given fraction of durations, to the resolution of the buckets.
+    0 if the histogram is empty.
+
+    histogram: Counts by bucket, see RESIDENCE_BUCKET_COUNT.
+    fraction: Between 0 and 1, e.g. 0.99.
+    """
+    total = sum(histogram)
+    if total == 0:
+        return 0.0
+
+    cumulative = 0
+    for bucket, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= fraction * total:
+            return 2**bucket / 1e6
+
+    return 2 ** (len(histogram) - 1) / 1e6
+
+
+def _is_alive(pid: int, thread_ident: int) -> bool:
+    """
+    Returns whether the thread is running, or for threads of other processes the process.
+    """
+    if pid == os.getpid():
+        return any(thread.ident == thread_ident for thread in threading.enumerate())
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # Exists, owned by another user
+    except PermissionError:
+        pass
+
+    return True
+
+
+class SlotCounters:
+    """
+    Counters in shared memory with a slot for each process and thread recording into them.
+
+    Recording into an owned slot takes no lock. A slot whose owner has exited is claimed by the
+    next new recorder, which adds to the counts left in it. If every slot is owned,
+    further recorders share the last slot and record into it under a lock.
+    """
+
+    def __init__(self, slot_size: int) -> None:
+        """
+        slot_size: Counters in a slot.
+        """
+        self.__slot_size = slot_size
+        self.__counters = mp.RawArray(ctypes.c_uint64, MAX_SLOTS * slot_size)
+        # Process ID and thread ident of the owner of each slot but the last, 0 if unclaimed
+        self.__owners = mp.RawArray(ctypes.c_int64, 2 * (MAX_SLOTS - 1))
+        # Held while claiming, and while recording into the last slot
+        self.__lock = mp.Lock()
+
+        # Slots claimed by this copy, by process and thread
+        self.__slots: "dict[tuple[int, int], int]" = {}
+
+    def get_slot(self) -> "tuple[ctypes.Array, int, mp.synchronize.Lock | None]":
+        """
+        Claims a slot for the calling process and thread if it has none.
+
+        Returns the counters, the offset of the slot, and the lock to hold while recording,
+        None for an owned slot.
+        """
+        owner = (os.getpid(), threading.get_ident())
+        slot = self.__slots.get(owner)
+        if slot is None:
+            slot = self.__claim(owner)
+            self.__slots[owner] = slot
+
+        if slot == MAX_SLOTS - 1:
+            return self.__counters, slot * self.__slot_size, self.__lock
+
+        return self.__counters, slot * self.__slot_size, None
+
+    def __claim(self, owner: "tuple[int, int]") -> int:
+        """
+        Returns the first slot which is unclaimed or whose owner has exited, now owned by the
+        caller, or the last slot if there is none.
+        """
+        with self.__lock:
+            for slot in range(MAX_SLOTS - 1):
+                previous_owner = (self.__owners[2 * slot], self.__owners[2 * slot + 1])
+                if previous_owner[0] == 0 or not _is_alive(*previous_owner):
+                    self.__owners[2 * slot], self.__owners[2 * slot + 1] = owner
+                    # Thread started later with the ident of an exited one must claim its own
+                    self.__slots.pop(previous_owner, None)
+                    return slot
+
+        return MAX_SLOTS - 1
+
+    def get_slot_values(self) -> "list[list[int]]":
+        """
+        Returns the counters of every slot.
+        """
+        return [
+            self.__counters[slot * self.__slot_size : (slot + 1) * self.__slot_size]
+            for slot in range(MAX_SLOTS)
+        ]
+
+
+class QueueSummary:  # pylint: disable=too-many-instance-attributes
+    """
+    Statistics of a queue, aggregated over all producers and consumers.
+    """
+
+    def __init__(
+        self,
+        put_count: int,
+        get_count: int,
+        depth_high_water: int,
+        residence_total: float,
+        residence_histogram: "list[int]",
+        interval: float,
+        put_rate: float,
+        get_rate: float,
+    ) -> None:
+        """
+        put_count: Items put since creation, excluding sentinels.
+        get_count: Items got since creation, excluding sentinels.
+        depth_high_water: Maximum depth seen after a put.
+        residence_total: Seconds spent queued by all items got.
+        residence_histogram: Items got by residence bucket, see RESIDENCE_BUCKET_COUNT.
+        interval: Seconds since the previous summary, or creation.
+        put_rate: Items per second put during the interval.
+        get_rate: Items per second got during the interval.
+        """
+        self.put_count = put_count
+        self.get_count = get_count
+        self.depth_high_water = depth_high_water
+        self.residence_total = residence_total
+        self.residence_histogram = residence_histogram
+        self.interval = interval
+        self.put_rate = put_rate
+        self.get_rate = get_rate
+
+    def mean_residence(self) -> float:
+        """
+        Returns the mean residence time in seconds, 0 if no items were got.
+        """
+        if self.get_count == 0:
+            return 0.0
+
+        return self.residence_total / self.get_count
+
+    def residence_percentile(self, fraction: float) -> float:
+        """
+        Upper bound of the residence time in seconds of the given fraction of items,
+        to the resolution of the histogram buckets. 0 if no items were got.
+
+        fraction: Between 0 and 1, e.g. 0.99.
+        """
+        return histogram_percentile(self.residence_histogram, fraction)
+
+    def __str__(self) -> str:
+        """
+        To string.
+        """
+        return (
+            f"put: {self.put_count} ({self.put_rate:.1f}/s), "
+            f"get: {self.get_count} ({self.get_rate:.1f}/s), "
+            f"depth high water: {self.depth_high_water}, "
+            f"residence mean: {self.mean_residence() * 1e3:.3f}ms, "
+            f"p99 <= {self.residence_percentile(0.99) * 1e3:.3f}ms"
+        )
+
+
+class QueueStatistics:
+    """
+    Counters of a queue in shared memory, recorded by producers and consumers and read by main.
+
+    Every process and thread records into its own slot, see SlotCounters.
+    Summaries sum the slots, so they are approximate while items are being put and got.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor creates the shared counters.
+        """
+        self.__slot_counters = SlotCounters(_SLOT_SIZE)
+
+        # Previous summary, for rates
+        self.__last_summary_time = time.monotonic()
+        self.__last_put_count = 0
+        self.__last_get_count = 0
+
+    def record_put(self, depth: int) -> None:
+        """
+        Records a put.
+
+        depth: Items in the queue after the put.
+        """
+        counters, offset, lock = self.__slot_counters.get_slot()
+        if lock is not None:
+            lock.acquire()
+        try:
+            counters[offset + _PUT_COUNT] += 1
+            if depth > counters[offset + _DEPTH_HIGH_WATER]:
+                counters[offset + _DEPTH_HIGH_WATER] = depth
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def record_get(self, residence: float) -> None:
+        """
+        Records a get.
+
+        residence: Seconds the item spent in the queue.
+        """
+        microseconds = max(int(residence * 1e6), 0)
+        bucket = get_bucket(microseconds)
+        counters, offset, lock = self.__slot_counters.get_slot()
+        if lock is not None:
+            lock.acquire()
+        try:
+            counters[offset + _GET_COUNT] += 1
+            counters[offset + _RESIDENCE_TOTAL] += microseconds
+            counters[offset + _FIRST_BUCKET + bucket] += 1
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def get_summary(self, is_interval_restarted: bool = True) -> QueueSummary:
+        """
+        Sums all slots. Rates are over the interval since the previous summary of this copy,
+        so only one caller (usually main) should request summaries.
+
+        is_interval_restarted: Whether the next interval starts now, False for callers which
+            only read the counts (e.g. metrics_export) so that they do not change the rates.
+        """
+        totals = [0] * _SLOT_SIZE
+        depth_high_water = 0
+        for counters in self.__slot_counters.get_slot_values():
+            for index, value in enumerate(counters):
+                totals[index] += value
+            depth_high_water = max(depth_high_water, counters[_DEPTH_HIGH_WATER])
+
+        now = time.monotonic()
+        interval = max(now - self.__last_summary_time, 1e-9)
+        put_count = totals[_PUT_COUNT]
+        get_count = totals[_GET_COUNT]
+        put_rate = (put_count - self.__last_put_count) / interval
+        get_rate = (get_count - self.__last_get_count) / interval
+
+        if is_interval_restarted:
+            self.__last_summary_time = now
+            self.__last_put_count = put_count
+            self.__last_get_count = get_count
+
+        return QueueSummary(
+            put_count,
+            get_count,
+            depth_high_water,
+            totals[_RESIDENCE_TOTAL] / 1e6,
+            totals[_FIRST_BUCKET:],
+            interval,
+            put_rate,
+            get_rate,
+        )
@@ -0,0 +1,156 @@
+"""
+Restores source order of items which pass through parallel workers.
+"""
+
+import ctypes
+import heapq
+import multiprocessing as mp
+import time
+
+
+class SequencedItem:
+    """
+    Item tagged with its position in the source order.
+    """
+
+    __slots__ = ("sequence", "item")
+
+    def __init__(self, sequence: int, item: object) -> None:
+        """
+        sequence: Position in the source order, from SequenceCounter.
+        item: Payload, None if the item produced no output (it is skipped on release).
+        """
+        self.sequence = sequence
+        self.item = item
+
+    def with_item(self, item: object) -> "SequencedItem":
+        """
+        Returns the result of a worker for this item, in the same position.
+        Workers with no output for the item put `with_item(None)`, so the gap is not waited for.
+        """
+        return SequencedItem(self.sequence, item)
+
+
+class SequenceCounter:
+    """
+    Tags items at the source with consecutive sequence numbers.
+    Shared by all workers of the source stage, so pass it to them as a work argument.
+    """
+
+    def __init__(self) -> None:
+        self.__next_sequence = mp.Value(ctypes.c_uint64, 0)
+
+    def tag(self, item: object) -> SequencedItem:
+        """
+        Returns the item with the next sequence number.
+        """
+        with self.__next_sequence.get_lock():
+            sequence = self.__next_sequence.value
+            self.__next_sequence.value += 1
+
+        return SequencedItem(sequence, item)
+
+
+class ReorderBuffer:  # pylint: disable=too-many-instance-attributes
+    """
+    Buffers tagged items in the consumer and releases them in sequence order.
+
+    A missing sequence number (gap) is waited for until the gap timeout has passed since it
+    was found, or until the window is full, and is then skipped. Items arriving after their
+    position was released are counted as late and discarded, so the output stays in order.
+    Not shared between processes, use one in the single consumer (e.g. main).
+    """
+
+    def __init__(self, window: int, gap_timeout: float) -> None:
+        """
+        window: Most items buffered while waiting for a gap, which bounds memory and delay.
+        gap_timeout: Seconds to wait for a missing item, e.g. one lost to a dead worker
+            or dropped by an overflow policy.
+        """
+        assert window > 0
+        assert gap_timeout >= 0.0
+
+        self.__window = window
+        self.__gap_timeout = gap_timeout
+
+        self.__next_sequence = 0
+        # Items by sequence number, and their sequence numbers for the lowest
+        self.__items: "dict[int, object]" = {}
+        self.__sequences: "list[int]" = []
+        # When the current gap was found, None if there is no gap
+        self.__gap_time: "float | None" = None
+
+        self.__skipped_count = 0
+        self.__late_count = 0
+
+    def push(self, sequenced_item: SequencedItem) -> None:
+        """
+        Buffers an item. Call release() afterwards.
+        """
+        sequence = sequenced_item.sequence
+        if sequence < self.__next_sequence or sequence in self.__items:
+            self.__late_count += 1
+            return
+
+        self.__items[sequence] = sequenced_item.item
+        heapq.heappush(self.__sequences, sequence)
+
+        if sequence != self.__next_sequence and self.__gap_time is None:
+            self.__gap_time = time.monotonic()
+
+    def push_many(self, sequenced_items: "list[SequencedItem | None]") -> None:
+        """
+        Buffers items, skipping sentinels (None). Call release() afterwards.
+        """
+        for sequenced_item in sequenced_items:
+            if sequenced_item is not None:
+                self.push(sequenced_item)
+
+    def release(self) -> "list[object]":
+        """
+        Returns the items which are next in order, skipping gaps that have timed out
+        or that hold up a full window.
+        """
+        released = []
+        while len(self.__sequences) > 0:
+            lowest = self.__sequences[0]
+            if lowest != self.__next_sequence:
+                now = time.monotonic()
+                if self.__gap_time is None:
+                    self.__gap_time = now
+
+                if (
+                    len(self.__sequences) < self.__window
+                    and now - self.__gap_time < self.__gap_timeout
+                ):
+                    break
+
+                self.__skipped_count += lowest - self.__next_sequence
+                self.__next_sequence = lowest
+
+            heapq.heappop(self.__sequences)
+            item = self.__items.pop(lowest)
+            if item is not None:
+                released.append(item)
+
+            self.__next_sequence += 1
+            self.__gap_time = None
+
+        return released
+
+    def get_timeout(self) -> "float | None":
+        """
+        Returns the seconds until the current gap times out, for bounding a wait before
+        the next release(). None if there is no gap.
+        """
+        if self.__gap_time is None:
+            return None
+
+        return max(self.__gap_timeout - (time.monotonic() - self.__gap_time), 0.0)
+
+    def get_statistics(self) -> "tuple[int, int, int]":
+        """
+        Returns the number of buffered items, the sequence numbers skipped as gaps,
+        and the late items discarded.
+        """
+        return len(self.__sequences), self.__skipped_count, self.__late_count
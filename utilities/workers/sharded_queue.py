@@ -0,0 +1,254 @@
+"""
+Queue split into shards by item key, one shard per consumer worker.
+"""
+
+import copy
+import multiprocessing.synchronize
+import queue
+import time
+import zlib
+
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_statistics
+
+
+class ShardedQueue:
+    """
+    Queues, one per consumer worker, with items routed by key so that all items with the same
+    key go to the same worker in the order they were put (per producer).
+
+    Producers put into the unbound queue. Each consumer worker gets a copy bound to its shard
+    by its worker manager, see bind_worker(). The unbound queue reads all shards, for main.
+    Items without a key and sentinels go to the shards in turn, so one sentinel per worker
+    reaches every worker.
+    """
+
+    __POLL_PERIOD = 0.001  # seconds
+
+    def __init__(
+        self,
+        shards: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+        key_attribute: str,
+    ) -> None:
+        """
+        shards: Queue for each consumer worker.
+        key_attribute: Name of the item attribute to route by, e.g. a vehicle's system ID.
+            Items without it are routed in turn.
+        """
+        assert len(shards) > 0
+
+        self.__shards = shards
+        self.__key_attribute = key_attribute
+        self.maxsize = shards[0].maxsize
+
+        # Next shard for items without a key
+        self.__next_shard = 0
+
+        # Set only on copies bound to a worker, see bind_worker()
+        self.__shard_index: "int | None" = None
+
+    def bind_worker(self, worker_index: int) -> "ShardedQueue":
+        """
+        Creates a copy which gets only from the shard of the worker.
+
+        worker_index: Index of the worker, which is also the index of its shard.
+
+        Returns the bound queue.
+        """
+        bound_queue = copy.copy(self)
+        # Copy is the same class, which pylint cannot infer
+        # pylint: disable=protected-access,unused-private-member
+        bound_queue.__shard_index = worker_index % len(self.__shards)
+        return bound_queue
+
+    def get_shards(self) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":
+        """
+        Returns the queue of each shard.
+        """
+        return self.__shards
+
+    def get_shard_index(self, item: object) -> int:
+        """
+        Returns the index of the shard the item is routed to.
+        Integer keys are used directly and other keys hashed, so routing does not depend on
+        the hash seed of the process.
+        """
+        key = getattr(item, self.__key_attribute, None)
+        if key is None:
+            shard_index = self.__next_shard
+            self.__next_shard = (self.__next_shard + 1) % len(self.__shards)
+            return shard_index
+
+        if not isinstance(key, int):
+            key = zlib.crc32(str(key).encode())
+
+        return key % len(self.__shards)
+
+    def __read_shards(self) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":
+        """
+        Shards this copy gets from.
+        """
+        if self.__shard_index is None:
+            return self.__shards
+
+        return [self.__shards[self.__shard_index]]
+
+    def add_listener(self, event: multiprocessing.synchronize.Event, once: bool = False) -> None:
+        """
+        Registers an event that is set after every put into any shard, see
+        QueueProxyWrapper.add_listener(). With once, it is set after the first put into each shard.
+        Must be called before the queue is passed to workers.
+        """
+        for shard in self.__shards:
+            shard.add_listener(event, once)
+
+    def add_shard_listeners(self, events: "list[multiprocessing.synchronize.Event]") -> None:
+        """
+        Registers an event for each shard that is set after every put into that shard.
+        Must be called before the queue is passed to workers.
+        """
+        assert len(events) == len(self.__shards)
+
+        for shard, event in zip(self.__shards, events):
+            shard.add_listener(event)
+
+    def get_drop_count(self) -> int:
+        """
+        Returns the number of items dropped by the overflow policy of all shards.
+        """
+        return sum(shard.get_drop_count() for shard in self.__shards)
+
+    def get_statistics(
+        self, is_interval_restarted: bool = True
+    ) -> "queue_statistics.QueueSummary | None":
+        """
+        Returns the statistics of all shards combined, None if not instrumented.
+
+        is_interval_restarted: See queue_statistics.QueueStatistics.get_summary().
+        """
+        summaries = [shard.get_statistics(is_interval_restarted) for shard in self.__shards]
+        if summaries[0] is None:
+            return None
+
+        residence_histogram = [
+            sum(counts)
+            for counts in zip(*(summary.residence_histogram for summary in summaries))  # type: ignore
+        ]
+
+        return queue_statistics.QueueSummary(
+            sum(summary.put_count for summary in summaries),  # type: ignore
+            sum(summary.get_count for summary in summaries),  # type: ignore
+            max(summary.depth_high_water for summary in summaries),  # type: ignore
+            sum(summary.residence_total for summary in summaries),  # type: ignore
+            residence_histogram,
+            max(summary.interval for summary in summaries),  # type: ignore
+            sum(summary.put_rate for summary in summaries),  # type: ignore
+            sum(summary.get_rate for summary in summaries),  # type: ignore
+        )
+
+    def put(self, item: object, block: bool = True, timeout: "float | None" = None) -> bool:
+        """
+        Puts an item into the shard of its key, see QueueProxyWrapper.put().
+
+        Returns whether the item was queued.
+        """
+        return self.__shards[self.get_shard_index(item)].put(item, block, timeout)
+
+    def put_sentinel(self, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Puts a sentinel (None) into the next shard in turn, see QueueProxyWrapper.put_sentinel().
+        A sentinel which did not fit is retried on the same shard.
+
+        Raises queue.Full if the shard is full after the timeout.
+        """
+        self.__shards[self.__next_shard].put_sentinel(block, timeout)
+        self.__next_shard = (self.__next_shard + 1) % len(self.__shards)
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: "float | None" = None
+    ) -> int:
+        """
+        Puts items into the shards of their keys, in order within each shard.
+
+        Returns the number of items put.
+        """
+        shard_items: "list[list[object]]" = [[] for _ in self.__shards]
+        for item in items:
+            shard_items[self.get_shard_index(item)].append(item)
+
+        return sum(
+            shard.put_many(items_for_shard, block, timeout)
+            for shard, items_for_shard in zip(self.__shards, shard_items)
+            if len(items_for_shard) > 0
+        )
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Gets an item from the bound shard, or from any shard if unbound.
+
+        Raises queue.Empty if the shards are empty after the timeout.
+        """
+        read_shards = self.__read_shards()
+        if len(read_shards) == 1:
+            return read_shards[0].get(block, timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            for shard in read_shards:
+                try:
+                    return shard.get(False)
+                except queue.Empty:
+                    pass
+
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Empty
+
+            time.sleep(self.__POLL_PERIOD)
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: "float | None" = None
+    ) -> "list[object]":
+        """
+        Gets up to `max_items` from the bound shard, see QueueProxyWrapper.get_many().
+        If unbound, waits for an item in any shard and then gets from the shards in turn.
+
+        Returns the items, empty if the shards are still empty after the timeout.
+        """
+        read_shards = self.__read_shards()
+        if len(read_shards) == 1:
+            return read_shards[0].get_many(max_items, block, timeout)
+
+        try:
+            items = [self.get(block, timeout)]
+        except queue.Empty:
+            return []
+
+        for shard in read_shards:
+            if len(items) >= max_items:
+                break
+
+            items += shard.get_many(max_items - len(items), False)
+
+        return items
+
+    def get_consumed_count(self) -> "int | None":
+        """
+        Returns the number of items taken from all shards, None if not supported.
+        """
+        counts = [shard.get_consumed_count() for shard in self.__shards]
+        if None in counts:
+            return None
+
+        return sum(counts)  # type: ignore
+
+    def empty(self) -> bool:
+        """
+        Whether the bound shard, or all shards if unbound, are empty. Approximate.
+        """
+        return all(shard.empty() for shard in self.__read_shards())
+
+    def qsize(self) -> int:
+        """
+        Number of items in the bound shard, or all shards if unbound. Approximate.
+        """
+        return sum(shard.qsize() for shard in self.__read_shards())
@@ -0,0 +1,293 @@
+"""
+For scaling worker counts to the load.
+"""
+
+import threading
+import time
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_manager
+
+
+class StageScalingState:
+    """
+    Autoscaler bookkeeping for the workers of a single manager.
+    """
+
+    def __init__(self) -> None:
+        # Items taken from the input queues at the last check, for throughput
+        self.last_consumed_count: "int | None" = None
+        # Consecutive checks above the high or below the low watermark
+        self.high_count = 0
+        self.low_count = 0
+        self.last_change_time = time.monotonic()
+        # Throughput before the last scale up, None if scaling up is not being evaluated
+        self.throughput_before_scale_up: "float | None" = None
+        # Throughput while saturated (input queues above the high watermark), by worker count
+        self.capacity: "dict[int, float]" = {}
+
+
+class WorkerAutoscaler:  # pylint: disable=too-many-instance-attributes
+    """
+    Thread in main which adds or retires workers based on input queue depth and throughput,
+    which is items taken from the input queues per second. Loop iterations are not used,
+    as a worker taking batches makes fewer iterations under load.
+
+    A stage is scaled up when its input queues stay above the high watermark while it is
+    making progress, and scaled down when they stay below the low watermark. Changes are
+    followed by a cooldown, and a further scale up requires the previous one to have raised
+    throughput, so a stage limited elsewhere (e.g. CPU or a downstream stage) stops growing.
+    A stage is only scaled down if its throughput is below what one fewer worker was measured
+    to handle, so a stage that just keeps up does not oscillate.
+
+    Only managers with a worker count range and bounded input queues which count items taken
+    (not multiprocessing.Queue) are scaled, and not while paused.
+    Stop the autoscaler before requesting workers to exit.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        worker_managers: "list[worker_manager.WorkerManager]",
+        local_logger: logger.Logger,
+        check_period: float = 1.0,
+        high_watermark: float = 0.75,
+        low_watermark: float = 0.25,
+        sustain_checks: int = 3,
+        cooldown: float = 5.0,
+        min_throughput_gain: float = 0.1,
+        scale_down_headroom: float = 0.2,
+    ) -> "tuple[bool, WorkerAutoscaler | None]":
+        """
+        Creates the autoscaler, which is not started.
+
+        worker_managers: Managers of started workers.
+        local_logger: Existing logger from process.
+        check_period: Seconds between checks.
+        high_watermark: Input queue fill fraction at or above which to scale up.
+        low_watermark: Input queue fill fraction at or below which to scale down.
+        sustain_checks: Consecutive checks past a watermark before scaling.
+        cooldown: Seconds after a change before the stage is scaled again.
+        min_throughput_gain: Fraction by which the previous scale up must have raised
+            throughput before scaling up again.
+        scale_down_headroom: Fraction of the measured throughput of one fewer worker
+            to leave unused after scaling down.
+
+        Returns whether the autoscaler was created and the autoscaler.
+        """
+        if check_period <= 0.0 or sustain_checks <= 0 or cooldown < 0.0:
+            local_logger.error(
+                "Check period and sustain checks must be greater than zero, cooldown at least zero",
+                True,
+            )
+            return False, None
+
+        if not 0.0 <= low_watermark < high_watermark <= 1.0:
+            local_logger.error("Watermarks must satisfy 0 <= low < high <= 1", True)
+            return False, None
+
+        scaled_managers = []
+        for manager in worker_managers:
+            min_count, max_count = manager.get_worker_count_bounds()
+            if min_count == max_count:
+                continue
+
+            input_queues = manager.get_input_queues()
+            if len(input_queues) == 0 or any(
+                input_queue.maxsize <= 0 for input_queue in input_queues
+            ):
+                local_logger.warning(
+                    f"{manager.get_target_name()} has no bounded input queues, not scaling it",
+                    True,
+                )
+                continue
+
+            try:
+                for input_queue in input_queues:
+                    input_queue.qsize()
+            except NotImplementedError:
+                local_logger.warning(
+                    f"Queue size is not available for {manager.get_target_name()} on this "
+                    "platform, not scaling it",
+                    True,
+                )
+                continue
+
+            if any(input_queue.get_consumed_count() is None for input_queue in input_queues):
+                local_logger.warning(
+                    f"Input queues of {manager.get_target_name()} do not count items taken, "
+                    "not scaling it",
+                    True,
+                )
+                continue
+
+            scaled_managers.append(manager)
+
+        return True, WorkerAutoscaler(
+            cls.__create_key,
+            scaled_managers,
+            local_logger,
+            check_period,
+            high_watermark,
+            low_watermark,
+            sustain_checks,
+            cooldown,
+            min_throughput_gain,
+            scale_down_headroom,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        worker_managers: "list[worker_manager.WorkerManager]",
+        local_logger: logger.Logger,
+        check_period: float,
+        high_watermark: float,
+        low_watermark: float,
+        sustain_checks: int,
+        cooldown: float,
+        min_throughput_gain: float,
+        scale_down_headroom: float,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is WorkerAutoscaler.__create_key, "Use create() method"
+
+        self.__worker_managers = worker_managers
+        self.__local_logger = local_logger
+        self.__check_period = check_period
+        self.__high_watermark = high_watermark
+        self.__low_watermark = low_watermark
+        self.__sustain_checks = sustain_checks
+        self.__cooldown = cooldown
+        self.__min_throughput_gain = min_throughput_gain
+        self.__scale_down_headroom = scale_down_headroom
+
+        self.__states = [StageScalingState() for _ in worker_managers]
+
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="worker_autoscaler", daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts scaling.
+        """
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops scaling, waiting for any change in progress to finish.
+        """
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __run(self) -> None:
+        """
+        Autoscaler thread.
+        """
+        while not self.__stop_event.wait(self.__check_period):
+            for manager, state in zip(self.__worker_managers, self.__states):
+                self.__check_manager(manager, state)
+
+    def __throughput(
+        self, manager: worker_manager.WorkerManager, state: StageScalingState
+    ) -> float:
+        """
+        Items per second taken from the input queues since the last check.
+        """
+        consumed_count = sum(
+            input_queue.get_consumed_count() for input_queue in manager.get_input_queues()  # type: ignore
+        )
+        last_consumed_count = state.last_consumed_count
+        state.last_consumed_count = consumed_count
+        if last_consumed_count is None:
+            return 0.0
+
+        return (consumed_count - last_consumed_count) / self.__check_period
+
+    def __check_manager(
+        self, manager: worker_manager.WorkerManager, state: StageScalingState
+    ) -> None:
+        """
+        Updates the load of a manager's workers and scales them if required.
+        """
+        # Paused workers make no progress regardless of load, start over after resuming
+        if manager.get_controller().is_pause_requested():
+            self.__throughput(manager, state)
+            state.high_count = 0
+            state.low_count = 0
+            state.last_change_time = time.monotonic()
+            return
+
+        input_queues = manager.get_input_queues()
+        depth = sum(input_queue.qsize() for input_queue in input_queues) / sum(
+            input_queue.maxsize for input_queue in input_queues
+        )
+        throughput = self.__throughput(manager, state)
+        worker_count = manager.get_worker_count()
+
+        if depth >= self.__high_watermark and throughput > 0.0:
+            state.capacity[worker_count] = throughput
+
+        if depth >= self.__high_watermark:
+            state.high_count += 1
+            state.low_count = 0
+        elif depth <= self.__low_watermark:
+            state.high_count = 0
+            state.low_count += 1
+            state.throughput_before_scale_up = None
+        else:
+            state.high_count = 0
+            state.low_count = 0
+            state.throughput_before_scale_up = None
+
+        now = time.monotonic()
+        if now - state.last_change_time < self.__cooldown:
+            return
+
+        if state.high_count >= self.__sustain_checks:
+            # Paused or hung workers are not helped by more workers
+            if throughput == 0.0:
+                return
+
+            if (
+                state.throughput_before_scale_up is not None
+                and throughput
+                < state.throughput_before_scale_up * (1.0 + self.__min_throughput_gain)
+            ):
+                return
+
+            if not manager.scale_up():
+                return
+
+            state.throughput_before_scale_up = throughput
+            self.__local_logger.info(
+                f"Scaled up {manager.get_target_name()} to {worker_count + 1} workers, "
+                f"queue depth {depth:.0%}, throughput {throughput:.1f}/s",
+                True,
+            )
+        elif state.low_count >= self.__sustain_checks:
+            fewer_capacity = state.capacity.get(worker_count - 1)
+            if fewer_capacity is not None and throughput > fewer_capacity * (
+                1.0 - self.__scale_down_headroom
+            ):
+                return
+
+            if not manager.scale_down():
+                return
+
+            self.__local_logger.info(
+                f"Scaled down {manager.get_target_name()} to {worker_count - 1} workers, "
+                f"queue depth {depth:.0%}, throughput {throughput:.1f}/s",
+                True,
+            )
+        else:
+            return
+
+        state.high_count = 0
+        state.low_count = 0
+        state.last_change_time = now
@@ -2,71 +2,217 @@
 For controlling workers.
 """
 
+import copy
+import ctypes
 import multiprocessing as mp
-import time
+import multiprocessing.synchronize
 
 
-class WorkerController:
+# Layout of the shared state word: low bits are request flags,
+# high bits are a generation counter incremented on every change
+_EXIT_FLAG = 0x1
+_PAUSE_FLAG = 0x2
+_PROFILE_FLAG = 0x4
+_FLAG_BITS = 8
+_FLAG_MASK = (1 << _FLAG_BITS) - 1
+_GENERATION_MASK = (1 << 64) - 1
+
+
+class WorkerController:  # pylint: disable=too-many-instance-attributes
     """
     For interprocess communication from main to worker.
-    Contains exit and pause requests.
-    """
+    Contains exit, pause and profiling requests.
 
-    __QUEUE_DELAY = 0.1  # seconds
+    Requests are stored in a single shared memory word so the worker hot path
+    (`is_exit_requested()` and `check_pause()` when not paused) is a single memory read.
+    """
 
     def __init__(self) -> None:
         """
-        Constructor creates internal queue and semaphore.
+        Constructor creates the shared state word and events.
+        """
+        # Only main writes (under the lock), workers only read
+        self.__state = mp.RawValue(ctypes.c_uint64, 0)
+        self.__state_lock = mp.Lock()
+
+        # Set while running, cleared while paused
+        self.__resume_event = mp.Event()
+        self.__resume_event.set()
+
+        # Set while exit is requested, for workers that wait between iterations
+        self.__exit_event = mp.Event()
+
+        # Also set on exit request and cleared with it, e.g. for queue_select.QueueSelector
+        self.__exit_listeners: list[multiprocessing.synchronize.Event] = []
+
+        # Set only on copies bound to a worker, see bind_worker()
+        self.__worker_progress: "ctypes.Array | None" = None
+        self.__worker_retire: "ctypes.Array | None" = None
+        self.__worker_wake_event: "multiprocessing.synchronize.Event | None" = None
+        self.__worker_index = 0
+
+    def bind_worker(
+        self,
+        worker_progress: ctypes.Array,
+        worker_index: int,
+        worker_retire: "ctypes.Array | None" = None,
+        worker_wake_event: "multiprocessing.synchronize.Event | None" = None,
+    ) -> "WorkerController":
         """
-        self.__pause = mp.BoundedSemaphore(1)
-        self.__is_paused = False
-        self.__exit_queue = mp.Queue(1)
+        Creates a copy for a single worker which shares all requests with this controller,
+        and also counts the worker's loop iterations in `worker_progress[worker_index]`.
+
+        worker_progress: Shared array of progress counters, one per worker.
+        worker_index: Index of the worker.
+        worker_retire: Shared array of retire requests, one per worker.
+            A retire request is an exit request for this worker only.
+        worker_wake_event: Event which ends `wait_for_exit()` instead of the exit event,
+            set together with retire requests. Register it as an exit listener.
+
+        Returns the bound controller.
+        """
+        bound_controller = copy.copy(self)
+        # Copy is the same class, which pylint cannot infer
+        # pylint: disable=protected-access,unused-private-member
+        bound_controller.__worker_progress = worker_progress
+        bound_controller.__worker_retire = worker_retire
+        bound_controller.__worker_wake_event = worker_wake_event
+        bound_controller.__worker_index = worker_index
+        return bound_controller
+
+    def __update_state(self, set_flags: int, clear_flags: int) -> None:
+        """
+        Sets and clears flags, incrementing the generation if the flags changed.
+        Caller must hold the state lock.
+        """
+        state = self.__state.value
+        flags = ((state & _FLAG_MASK) | set_flags) & ~clear_flags
+        if flags == state & _FLAG_MASK:
+            return
+
+        generation = (state >> _FLAG_BITS) + 1
+        self.__state.value = ((generation << _FLAG_BITS) | flags) & _GENERATION_MASK
 
     def request_pause(self) -> None:
         """
         Requests worker processes to pause.
         """
-        if not self.__is_paused:
-            self.__pause.acquire()
-            self.__is_paused = True
+        with self.__state_lock:
+            self.__resume_event.clear()
+            self.__update_state(_PAUSE_FLAG, 0)
 
     def request_resume(self) -> None:
         """
         Requests worker processes to resume.
         """
-        if self.__is_paused:
-            self.__pause.release()
-            self.__is_paused = False
+        with self.__state_lock:
+            self.__update_state(0, _PAUSE_FLAG)
+            self.__resume_event.set()
+
+    def is_pause_requested(self) -> bool:
+        """
+        Returns whether main has requested worker processes to pause.
+        """
+        return bool(self.__state.value & _PAUSE_FLAG)
 
     def check_pause(self) -> None:
         """
         Blocks worker if main has requested it to pause, otherwise continues.
+        An exit request also releases a paused worker.
+
+        If bound to a worker, also reports one loop iteration of progress.
         """
-        self.__pause.acquire()
-        self.__pause.release()
+        if self.__worker_progress is not None:
+            self.__worker_progress[self.__worker_index] += 1
+
+        # Fast path: single memory read
+        if not self.__state.value & _PAUSE_FLAG:
+            return
+
+        while self.__state.value & _PAUSE_FLAG and not self.__state.value & _EXIT_FLAG:
+            self.__resume_event.wait()
 
     def request_exit(self) -> None:
         """
         Requests worker processes to exit.
         Does nothing if already requested.
         """
-        time.sleep(self.__QUEUE_DELAY)
-        if self.__exit_queue.empty():
-            self.__exit_queue.put(None)
+        with self.__state_lock:
+            self.__update_state(_EXIT_FLAG, 0)
+            self.__exit_event.set()
+            for event in self.__exit_listeners:
+                event.set()
+            # Release paused workers so they can see the exit request
+            self.__resume_event.set()
 
     def clear_exit(self) -> None:
         """
         Clears the exit request condition.
         Does nothing if already cleared.
         """
-        time.sleep(self.__QUEUE_DELAY)
-        if not self.__exit_queue.empty():
-            _ = self.__exit_queue.get()
+        with self.__state_lock:
+            self.__update_state(0, _EXIT_FLAG)
+            self.__exit_event.clear()
+            for event in self.__exit_listeners:
+                event.clear()
+            if self.__state.value & _PAUSE_FLAG:
+                self.__resume_event.clear()
+
+    def request_profile_start(self) -> None:
+        """
+        Requests workers to profile themselves, see worker_profiler.WorkerProfiler.
+        """
+        with self.__state_lock:
+            self.__update_state(_PROFILE_FLAG, 0)
+
+    def request_profile_stop(self) -> None:
+        """
+        Requests workers to stop profiling and write their profiles.
+        """
+        with self.__state_lock:
+            self.__update_state(0, _PROFILE_FLAG)
+
+    def is_profile_requested(self) -> bool:
+        """
+        Returns whether main has requested workers to profile themselves.
+        """
+        return bool(self.__state.value & _PROFILE_FLAG)
 
     def is_exit_requested(self) -> bool:
         """
         Returns whether main has requested the worker process to exit.
         There is a race condition, but it's fine because the worker process
         will do at most 1 additional loop.
+
+        If bound to a worker, also returns whether the worker has been asked to retire.
+        """
+        if self.__state.value & _EXIT_FLAG:
+            return True
+
+        return self.__worker_retire is not None and bool(self.__worker_retire[self.__worker_index])
+
+    def wait_for_exit(self, timeout: float) -> bool:
+        """
+        Sleeps for up to `timeout` seconds, waking immediately if exit is requested.
+        Use instead of `time.sleep()` between worker iterations.
+
+        Returns whether exit has been requested.
+        """
+        if self.__worker_wake_event is None:
+            return self.__exit_event.wait(timeout)
+
+        self.__worker_wake_event.wait(timeout)
+        return self.is_exit_requested()
+
+    def add_exit_listener(self, event: multiprocessing.synchronize.Event) -> None:
+        """
+        Registers an event that is set when exit is requested.
+        Must be called before the controller is passed to workers.
+        """
+        self.__exit_listeners.append(event)
+
+    def get_generation(self) -> int:
+        """
+        Returns the generation counter, which changes whenever a request changes.
         """
-        return not self.__exit_queue.empty()
+        return self.__state.value >> _FLAG_BITS
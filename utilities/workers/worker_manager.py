@@ -2,14 +2,35 @@
 For managing workers.
 """
 
+import ctypes
+import enum
 import multiprocessing as mp
+import multiprocessing.synchronize
+import queue
+import threading
+import time
 
 from modules.common.modules.logger import logger
 from utilities.workers import worker_controller
+from utilities.workers import worker_scheduling
 from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_select
+from utilities.workers import sharded_queue
 
 
-class WorkerProperties:
+class WorkerMode(enum.Enum):
+    """
+    How workers are run.
+    Values are the names used in configuration files.
+    """
+
+    # Separate process, for CPU bound workers
+    PROCESS = "process"
+    # Thread in main, for I/O bound workers. Cannot be terminated if hung
+    THREAD = "thread"
+
+
+class WorkerProperties:  # pylint: disable=too-many-instance-attributes
     """
     Worker Properties.
     """
@@ -22,10 +43,15 @@ class WorkerProperties:
         count: int,
         target: "(...) -> object",  # type: ignore
         work_arguments: "tuple",
-        input_queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
-        output_queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+        input_queues: "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]",
+        output_queues: "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]",
         controller: worker_controller.WorkerController,
         local_logger: logger.Logger,
+        hang_timeout: "float | None" = None,
+        min_count: "int | None" = None,
+        max_count: "int | None" = None,
+        mode: WorkerMode = WorkerMode.PROCESS,
+        scheduling: "worker_scheduling.WorkerScheduling | None" = None,
     ) -> "tuple[bool, WorkerProperties | None]":
         """
         Creates worker properties.
@@ -37,6 +63,15 @@ class WorkerProperties:
         output_queues: Output queues.
         controller: Worker controller.
         local_logger: Existing logger from process.
+        hang_timeout: Seconds without a loop iteration before a worker is considered hung,
+            None to disable. Workers report iterations through `controller.check_pause()`.
+            Process mode only, as a hung thread cannot be replaced.
+        min_count: Fewest workers when scaling down, defaults to count.
+        max_count: Most workers when scaling up, defaults to count.
+        mode: Whether workers are processes or threads in this process.
+            Queues and controller behave the same in both.
+        scheduling: CPU affinity and priority applied by each worker as it starts,
+            None to inherit from main.
 
         Returns the WorkerProperties object.
         """
@@ -47,6 +82,27 @@ class WorkerProperties:
             )
             return False, None
 
+        if hang_timeout is not None and hang_timeout <= 0.0:
+            local_logger.error("Hang timeout must be greater than zero", True)
+            return False, None
+
+        # Supervisor would retry the restart forever
+        if hang_timeout is not None and mode == WorkerMode.THREAD:
+            local_logger.error("Hang timeout is not supported for thread workers", True)
+            return False, None
+
+        if min_count is None:
+            min_count = count
+
+        if max_count is None:
+            max_count = count
+
+        if not 0 < min_count <= count <= max_count:
+            local_logger.error(
+                "Worker count bounds must satisfy 0 < min_count <= count <= max_count", True
+            )
+            return False, None
+
         return True, WorkerProperties(
             cls.__create_key,
             count,
@@ -55,6 +111,11 @@ class WorkerProperties:
             input_queues,
             output_queues,
             controller,
+            hang_timeout,
+            min_count,
+            max_count,
+            mode,
+            scheduling,
         )
 
     def __init__(
@@ -63,9 +124,14 @@ class WorkerProperties:
         count: int,
         target: "(...) -> object",  # type: ignore
         work_arguments: "tuple",
-        input_queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
-        output_queues: "list[queue_proxy_wrapper.QueueProxyWrapper]",
+        input_queues: "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]",
+        output_queues: "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]",
         controller: worker_controller.WorkerController,
+        hang_timeout: "float | None",
+        min_count: int,
+        max_count: int,
+        mode: WorkerMode,
+        scheduling: "worker_scheduling.WorkerScheduling | None",
     ) -> None:
         """
         Private constructor, use create() method.
@@ -78,19 +144,62 @@ class WorkerProperties:
         self.__input_queues = input_queues
         self.__output_queues = output_queues
         self.__controller = controller
+        self.__hang_timeout = hang_timeout
+        self.__min_count = min_count
+        self.__max_count = max_count
+        self.__mode = mode
+        self.__scheduling = scheduling
 
-    def get_worker_arguments(self) -> "tuple":
+    def get_worker_arguments(
+        self,
+        controller: worker_controller.WorkerController | None = None,
+        worker_index: "int | None" = None,
+    ) -> "tuple":
         """
         Concatenates the worker properties into a tuple.
 
+        controller: Replaces the worker controller, e.g. with one bound to a single worker.
+        worker_index: If provided, sharded input queues and selectors in the work arguments
+            are bound to the worker's shard.
+
         Returns the worker properties as a tuple.
         """
-        return (
-            self.__work_arguments
-            + tuple(self.__input_queues)
-            + tuple(self.__output_queues)
-            + (self.__controller,)
-        )
+        if controller is None:
+            controller = self.__controller
+
+        work_arguments = self.__work_arguments
+        input_queues = self.__input_queues
+        if worker_index is not None:
+            work_arguments = tuple(
+                (
+                    argument.bind_worker(worker_index)
+                    if isinstance(argument, queue_select.QueueSelector)
+                    else argument
+                )
+                for argument in work_arguments
+            )
+            input_queues = [
+                (
+                    input_queue.bind_worker(worker_index)
+                    if isinstance(input_queue, sharded_queue.ShardedQueue)
+                    else input_queue
+                )
+                for input_queue in input_queues
+            ]
+
+        return work_arguments + tuple(input_queues) + tuple(self.__output_queues) + (controller,)
+
+    def get_controller(self) -> worker_controller.WorkerController:
+        """
+        Returns the worker controller.
+        """
+        return self.__controller
+
+    def get_hang_timeout(self) -> "float | None":
+        """
+        Returns the hang timeout in seconds, None if disabled.
+        """
+        return self.__hang_timeout
 
     def get_worker_count(self) -> int:
         """
@@ -98,13 +207,39 @@ class WorkerProperties:
         """
         return self.__count
 
+    def get_min_worker_count(self) -> int:
+        """
+        Returns the fewest workers when scaling down.
+        """
+        return self.__min_count
+
+    def get_max_worker_count(self) -> int:
+        """
+        Returns the most workers when scaling up.
+        """
+        return self.__max_count
+
+    def get_worker_mode(self) -> WorkerMode:
+        """
+        Returns whether workers are processes or threads.
+        """
+        return self.__mode
+
+    def get_scheduling(self) -> "worker_scheduling.WorkerScheduling | None":
+        """
+        Returns the CPU affinity and priority of the workers, None if inherited.
+        """
+        return self.__scheduling
+
     def get_worker_target(self) -> "(...) -> object":  # type: ignore
         """
         Returns the worker target.
         """
         return self.__target
 
-    def get_input_queues(self) -> "list[queue_proxy_wrapper.QueueProxyWrapper]":
+    def get_input_queues(
+        self,
+    ) -> "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]":
         """
         Returns the input queues.
         """
@@ -117,7 +252,7 @@ class WorkerProperties:
         return self.__target.__name__
 
 
-class WorkerManager:
+class WorkerManager:  # pylint: disable=too-many-instance-attributes
     """
     For interprocess communication from main to worker.
     Contains exit and pause requests.
@@ -139,11 +274,27 @@ class WorkerManager:
 
         Returns whether the workers were able to be created and the Worker Manager.
         """
+        # Loop iteration counters and retire requests, one per worker slot up to the maximum,
+        # read by the worker's bound controller
+        worker_progress = mp.RawArray(ctypes.c_uint64, worker_properties.get_max_worker_count())
+        worker_retire = mp.RawArray(ctypes.c_bool, worker_properties.get_max_worker_count())
+
+        # Wakes the workers from controller.wait_for_exit() on close or exit request
+        close_event = mp.Event()
+        worker_properties.get_controller().add_exit_listener(close_event)
+
         workers = []
-        for _ in range(0, worker_properties.get_worker_count()):
+        for index in range(0, worker_properties.get_worker_count()):
             result, worker = WorkerManager.__create_single_worker(
+                worker_properties.get_worker_mode(),
                 worker_properties.get_worker_target(),
-                worker_properties.get_worker_arguments(),
+                worker_properties.get_worker_arguments(
+                    worker_properties.get_controller().bind_worker(
+                        worker_progress, index, worker_retire, close_event
+                    ),
+                    index,
+                ),
+                worker_properties.get_scheduling(),
                 local_logger,
             )
             if not result:
@@ -155,6 +306,9 @@ class WorkerManager:
         return True, WorkerManager(
             cls.__create_key,
             workers,
+            worker_progress,
+            worker_retire,
+            close_event,
             worker_properties,
             local_logger,
         )
@@ -162,7 +316,10 @@ class WorkerManager:
     def __init__(
         self,
         class_private_create_key: object,
-        workers: "list[mp.Process]",
+        workers: "list[mp.Process | threading.Thread]",
+        worker_progress: ctypes.Array,
+        worker_retire: ctypes.Array,
+        close_event: multiprocessing.synchronize.Event,
         worker_properties: WorkerProperties,
         local_logger: logger.Logger,
     ) -> None:
@@ -172,22 +329,46 @@ class WorkerManager:
         assert class_private_create_key is WorkerManager.__create_key, "Use create() method"
 
         self.__workers = workers
+        self.__worker_progress = worker_progress
+        self.__worker_retire = worker_retire
+        self.__close_event = close_event
         self.__worker_properties = worker_properties
         self.__local_logger = local_logger
 
+        # Set by request_close(), no workers are added or restarted afterwards
+        self.__is_closing = False
+        # Close sentinels not yet put into each input queue, because the queue was full
+        self.__pending_sentinels: "list[int]" = []
+
+        # Scaled down workers finishing their current iteration, by slot index
+        self.__retiring_workers: "dict[int, mp.Process | threading.Thread]" = {}
+
+        # Workers may be replaced by a supervisor thread or scaled by an autoscaler thread
+        self.__workers_lock = threading.Lock()
+
     @staticmethod
-    def __create_single_worker(target: "(...) -> object", args: "tuple", local_logger: logger.Logger) -> "tuple[bool, mp.Process | None]":  # type: ignore
+    def __create_single_worker(mode: WorkerMode, target: "(...) -> object", args: "tuple", scheduling: "worker_scheduling.WorkerScheduling | None", local_logger: logger.Logger) -> "tuple[bool, mp.Process | threading.Thread | None]":  # type: ignore
         """
         Creates a single worker.
 
+        mode: Process or thread.
         target: Function.
         args: Target function arguments.
+        scheduling: Applied by the worker before running the target, None to inherit.
         local_logger: Existing logger from process.
 
         Returns whether a worker was created and the worker.
         """
+        if scheduling is not None:
+            args = (scheduling, target) + args
+            target = worker_scheduling.run_with_scheduling
+
         try:
-            worker = mp.Process(target=target, args=args)
+            if mode == WorkerMode.THREAD:
+                # Daemon so that a hung thread does not prevent main from exiting
+                worker = threading.Thread(target=target, args=args, daemon=True)
+            else:
+                worker = mp.Process(target=target, args=args)
         # Catching all exceptions for library call
         # pylint: disable-next=broad-exception-caught
         except Exception as e:
@@ -200,15 +381,267 @@ class WorkerManager:
         """
         Start workers.
         """
-        for worker in self.__workers:
-            worker.start()
+        with self.__workers_lock:
+            for worker in self.__workers:
+                worker.start()
+
+    def join_workers(self, timeout: "float | None" = None) -> bool:
+        """
+        Join workers, including scaled down workers which have not yet exited.
+
+        timeout: Seconds for all workers together, None to wait forever.
+
+        Returns whether all workers have exited.
+        """
+        with self.__workers_lock:
+            workers = list(self.__workers) + list(self.__retiring_workers.values())
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in workers:
+            worker.join(None if deadline is None else max(deadline - time.monotonic(), 0.0))
+
+        return not any(worker.is_alive() for worker in workers)
+
+    def request_close(self) -> None:
+        """
+        Asks every worker to exit once its input queues are drained.
+        A sentinel (None) per worker is put after the queued items, and once the input queues
+        are empty, the workers are asked to retire and woken by another sentinel each.
+        Upstream stages should be closed first so that no more items arrive.
+
+        Call repeatedly until the workers have exited, to put sentinels which did not fit
+        into a full input queue and to retire the workers once drained.
+        """
+        input_queues = self.__worker_properties.get_input_queues()
+        with self.__workers_lock:
+            worker_count = len(self.__workers) + len(self.__retiring_workers)
+            if not self.__is_closing:
+                self.__is_closing = True
+                self.__pending_sentinels = [worker_count for _ in input_queues]
+
+            if not self.__close_event.is_set() and all(
+                input_queue.empty() for input_queue in input_queues
+            ):
+                self.__worker_retire[:] = [True] * len(self.__worker_retire)
+                self.__close_event.set()
+                # Wakes workers blocked on an input queue which skip sentinels
+                self.__pending_sentinels = [worker_count for _ in input_queues]
+
+            for queue_index, input_queue in enumerate(input_queues):
+                while self.__pending_sentinels[queue_index] > 0:
+                    try:
+                        input_queue.put_sentinel(False)
+                    except queue.Full:
+                        break
+
+                    self.__pending_sentinels[queue_index] -= 1
+
+    def terminate_workers(self, grace_period: float) -> None:
+        """
+        Terminates worker processes that are still alive, killing them if they have not
+        exited after the grace period. Threads cannot be terminated and are left running.
+
+        grace_period: Seconds between terminate and kill.
+        """
+        with self.__workers_lock:
+            workers = list(self.__workers) + list(self.__retiring_workers.values())
+
+        for worker in workers:
+            if not worker.is_alive():
+                continue
+
+            if not isinstance(worker, mp.Process):
+                self.__local_logger.error(
+                    f"{self.get_target_name()} thread {worker.name} did not exit", True
+                )
+                continue
+
+            self.__local_logger.warning(
+                f"Terminating {self.get_target_name()} worker {worker.name}", True
+            )
+            worker.terminate()
+            worker.join(grace_period)
+            if worker.is_alive():
+                self.__local_logger.warning(
+                    f"Killing {self.get_target_name()} worker {worker.name}", True
+                )
+                worker.kill()
+                worker.join()
+
+    def get_target_name(self) -> str:
+        """
+        Returns the name of the worker target.
+        """
+        return self.__worker_properties.get_target_name()
+
+    def get_hang_timeout(self) -> "float | None":
+        """
+        Returns the hang timeout in seconds, None if disabled.
+        """
+        return self.__worker_properties.get_hang_timeout()
+
+    def get_worker_count_bounds(self) -> "tuple[int, int]":
+        """
+        Returns the fewest and most workers when scaling.
+        """
+        return (
+            self.__worker_properties.get_min_worker_count(),
+            self.__worker_properties.get_max_worker_count(),
+        )
 
-    def join_workers(self) -> None:
+    def get_controller(self) -> worker_controller.WorkerController:
         """
-        Join workers.
+        Returns the worker controller.
+        """
+        return self.__worker_properties.get_controller()
+
+    def get_input_queues(
+        self,
+    ) -> "list[queue_proxy_wrapper.QueueProxyWrapper | sharded_queue.ShardedQueue]":
+        """
+        Returns the input queues of the workers.
+        """
+        return self.__worker_properties.get_input_queues()
+
+    def get_worker_status(self) -> "list[tuple[bool, int]]":
+        """
+        Returns whether each worker is alive and its loop iteration count.
+        """
+        with self.__workers_lock:
+            return [
+                (worker.is_alive(), self.__worker_progress[index])
+                for index, worker in enumerate(self.__workers)
+            ]
+
+    def restart_worker(self, index: int, grace_period: float = 1.0) -> bool:
         """
-        for worker in self.__workers:
-            worker.join()
+        Replaces a worker with a new one and starts it.
+        A process which is still alive (e.g. hung) is terminated first, and killed if it has not
+        exited after the grace period. A thread which is still alive cannot be restarted.
+
+        index: Index of the worker.
+        grace_period: Seconds between terminate and kill.
+
+        Returns whether the worker was able to be restarted.
+        """
+        with self.__workers_lock:
+            # Scaled down since the index was read
+            if self.__is_closing or index >= len(self.__workers):
+                return False
+
+            worker = self.__workers[index]
+            target_and_worker_name = f"{self.get_target_name()} {worker.name}"
+
+            if worker.is_alive():
+                if not isinstance(worker, mp.Process):
+                    self.__local_logger.error(
+                        f"Cannot restart {target_and_worker_name}, threads cannot be terminated",
+                        True,
+                    )
+                    return False
+
+                worker.terminate()
+                worker.join(grace_period)
+                if worker.is_alive():
+                    self.__local_logger.warning(f"Killing {target_and_worker_name}", True)
+                    worker.kill()
+                    worker.join()
+
+            result, new_worker = self.__start_worker_in_slot(index)
+            if not result:
+                self.__local_logger.error(f"Failed to restart {target_and_worker_name}", True)
+                return False
+
+            self.__workers[index] = new_worker
+
+        return True
+
+    def __start_worker_in_slot(
+        self, index: int
+    ) -> "tuple[bool, mp.Process | threading.Thread | None]":
+        """
+        Creates and starts a worker using the progress counter and retire request at the index.
+        Caller must hold the workers lock.
+
+        Returns whether the worker was started and the worker.
+        """
+        result, new_worker = WorkerManager.__create_single_worker(
+            self.__worker_properties.get_worker_mode(),
+            self.__worker_properties.get_worker_target(),
+            self.__worker_properties.get_worker_arguments(
+                self.__worker_properties.get_controller().bind_worker(
+                    self.__worker_progress, index, self.__worker_retire, self.__close_event
+                ),
+                index,
+            ),
+            self.__worker_properties.get_scheduling(),
+            self.__local_logger,
+        )
+        if not result:
+            return False, None
+
+        # Reset progress so the new worker's iterations are counted from zero
+        self.__worker_progress[index] = 0
+        self.__worker_retire[index] = False
+        new_worker.start()
+        return True, new_worker
+
+    def get_worker_count(self) -> int:
+        """
+        Returns the number of workers, excluding scaled down workers which have not yet exited.
+        """
+        with self.__workers_lock:
+            return len(self.__workers)
+
+    def scale_up(self) -> bool:
+        """
+        Starts one more worker.
+        The slot of a scaled down worker is reused only after that worker has exited.
+
+        Returns whether a worker was started.
+        """
+        with self.__workers_lock:
+            index = len(self.__workers)
+            if self.__is_closing or index >= self.__worker_properties.get_max_worker_count():
+                return False
+
+            retiring_worker = self.__retiring_workers.get(index)
+            if retiring_worker is not None:
+                if retiring_worker.is_alive():
+                    self.__local_logger.warning(
+                        f"{self.get_target_name()} worker {index} has not finished retiring",
+                        True,
+                    )
+                    return False
+
+                retiring_worker.join()
+                self.__retiring_workers.pop(index)
+
+            result, new_worker = self.__start_worker_in_slot(index)
+            if not result:
+                self.__local_logger.error(f"Failed to scale up {self.get_target_name()}", True)
+                return False
+
+            self.__workers.append(new_worker)
+
+        return True
+
+    def scale_down(self) -> bool:
+        """
+        Asks the most recently added worker to exit after its current iteration.
+        A worker blocked on an empty input queue exits after its next item.
+
+        Returns whether a worker was asked to exit.
+        """
+        with self.__workers_lock:
+            index = len(self.__workers) - 1
+            if index < self.__worker_properties.get_min_worker_count():
+                return False
+
+            self.__worker_retire[index] = True
+            self.__retiring_workers[index] = self.__workers.pop()
+
+        return True
 
     def check_and_restart_dead_workers(self) -> bool:
         """
@@ -216,32 +649,17 @@ class WorkerManager:
 
         Returns whether the dead workers were able to be restarted.
         """
-        new_workers = []
-        for worker in self.__workers:
-            if worker.is_alive():
-                new_workers.append(worker)
+        for index, (is_alive, _) in enumerate(self.get_worker_status()):
+            if is_alive:
                 continue
 
             # Log dead worker
-            target_and_worker_name = f"{self.__worker_properties.get_target_name()} {worker.name}"
             self.__local_logger.warning(
-                f"Worker died, restarting {target_and_worker_name}",
+                f"Worker died, restarting {self.get_target_name()} worker {index}",
                 True,
             )
 
-            # Create a new worker
-            result, new_worker = WorkerManager.__create_single_worker(
-                self.__worker_properties.get_worker_target(),
-                self.__worker_properties.get_worker_arguments(),
-                self.__local_logger,
-            )
-            if not result:
-                self.__local_logger.error(f"Failed to restart {target_and_worker_name}", True)
+            if not self.restart_worker(index):
                 return False
 
-            # Append the new worker
-            new_workers.append(new_worker)
-
-        self.__workers = new_workers
-
         return True
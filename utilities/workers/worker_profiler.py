@@ -0,0 +1,91 @@
+"""
+Profiles a running worker on request from main, see WorkerController.request_profile_start().
+"""
+
+import cProfile
+import os
+import pathlib
+import time
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_controller
+
+
+PROFILE_DIRECTORY = pathlib.Path("logs")
+
+
+class WorkerProfiler:
+    """
+    Starts cProfile in the worker when main requests profiling, and writes the profile to
+    `<directory>/profile_<worker name>_<pid>_<time>.prof` when the request is withdrawn or the
+    worker exits. Read it with `python -m pstats <file>` or snakeviz.
+
+    Profiles only the thread which calls check(), so a worker in thread mode is profiled without
+    the rest of main.
+    """
+
+    def __init__(
+        self,
+        controller: worker_controller.WorkerController,
+        worker_name: str,
+        local_logger: logger.Logger,
+        directory: pathlib.Path = PROFILE_DIRECTORY,
+    ) -> None:
+        """
+        controller: Controller of the worker.
+        worker_name: For the file name, e.g. `telemetry_worker`.
+        local_logger: Logger of the worker.
+        directory: Where profiles are written.
+        """
+        self.__controller = controller
+        self.__worker_name = worker_name
+        self.__local_logger = local_logger
+        self.__directory = directory
+
+        # None while not profiling
+        self.__profile: "cProfile.Profile | None" = None
+
+    def check(self) -> None:
+        """
+        Starts or stops profiling if the request has changed. Call every loop iteration,
+        next to `controller.check_pause()`. A single memory read while the request is unchanged.
+        """
+        is_requested = self.__controller.is_profile_requested()
+        if is_requested == (self.__profile is not None):
+            return
+
+        if is_requested:
+            self.__profile = cProfile.Profile()
+            self.__profile.enable()
+            self.__local_logger.info("Profiling started", True)
+            return
+
+        self.stop()
+
+    def stop(self) -> "pathlib.Path | None":
+        """
+        Stops profiling and writes the profile, call before the worker exits.
+        Does nothing if not profiling.
+
+        Returns the path of the profile, None if not profiling or it could not be written.
+        """
+        if self.__profile is None:
+            return None
+
+        profile = self.__profile
+        self.__profile = None
+        profile.disable()
+
+        path = (
+            self.__directory / f"profile_{self.__worker_name}_{os.getpid()}_"
+            f"{time.strftime('%Y%m%d_%H%M%S')}.prof"
+        )
+        try:
+            self.__directory.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(path)
+        except OSError as e:
+            self.__local_logger.error(f"Failed to write profile: {e}", True)
+            return None
+
+        self.__local_logger.info(f"Profile written to {path}", True)
+        return path
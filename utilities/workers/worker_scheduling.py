@@ -0,0 +1,203 @@
+"""
+For pinning workers to CPUs and setting their scheduling priority.
+"""
+
+import os
+import resource
+
+from modules.common.modules.logger import logger
+
+
+class WorkerScheduling:
+    """
+    CPU affinity, nice value and real-time (SCHED_FIFO) priority, applied by each worker
+    as it starts. Linux only.
+
+    On Linux these apply to the calling thread, so also to workers in thread mode.
+    Lowering the nice value or a real-time priority requires CAP_SYS_NICE or an
+    RLIMIT_NICE/RLIMIT_RTPRIO allowance, otherwise the worker runs without that setting.
+    """
+
+    __create_key = object()
+
+    # Bit of CAP_SYS_NICE in the capability sets of /proc/<pid>/status
+    __CAP_SYS_NICE = 23
+
+    @classmethod
+    def create(
+        cls,
+        cpu_affinity: "set[int] | None",
+        nice: "int | None",
+        realtime_priority: "int | None",
+        local_logger: logger.Logger,
+    ) -> "tuple[bool, WorkerScheduling | None]":
+        """
+        Validates the settings. Settings which this process is not permitted to apply are
+        logged and left out, as workers inherit its permissions.
+
+        cpu_affinity: CPUs the worker may run on, None for any.
+        nice: Nice value from -20 (highest priority) to 19, None to inherit.
+        realtime_priority: SCHED_FIFO priority from 1 to 99, None for the normal scheduler.
+            A real-time worker which never blocks starves everything else on its CPUs.
+
+        Returns whether the settings are valid and the scheduling.
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            local_logger.error("Worker scheduling is not supported on this platform", True)
+            return False, None
+
+        if cpu_affinity is not None:
+            available_cpus = os.sched_getaffinity(0)
+            if len(cpu_affinity) == 0 or not cpu_affinity.issubset(available_cpus):
+                local_logger.error(
+                    f"CPU affinity {sorted(cpu_affinity)} is not a non-empty subset "
+                    f"of the available CPUs {sorted(available_cpus)}",
+                    True,
+                )
+                return False, None
+
+        if nice is not None and not -20 <= nice <= 19:
+            local_logger.error("Nice value must be from -20 to 19", True)
+            return False, None
+
+        if realtime_priority is not None and not (
+            os.sched_get_priority_min(os.SCHED_FIFO)
+            <= realtime_priority
+            <= os.sched_get_priority_max(os.SCHED_FIFO)
+        ):
+            local_logger.error("Real-time priority is out of range", True)
+            return False, None
+
+        if nice is not None and not WorkerScheduling.__is_nice_permitted(nice):
+            local_logger.warning(
+                f"Not permitted to lower the nice value to {nice}, workers keep their nice value",
+                True,
+            )
+            nice = None
+
+        if realtime_priority is not None and not WorkerScheduling.__is_realtime_permitted(
+            realtime_priority
+        ):
+            local_logger.warning(
+                f"Not permitted to set SCHED_FIFO priority {realtime_priority}, "
+                "workers use the normal scheduler",
+                True,
+            )
+            realtime_priority = None
+
+        return True, WorkerScheduling(cls.__create_key, cpu_affinity, nice, realtime_priority)
+
+    @staticmethod
+    def __has_cap_sys_nice() -> bool:
+        """
+        Whether this process has CAP_SYS_NICE, which lifts the nice and real-time limits.
+        """
+        try:
+            with open("/proc/self/status", encoding="utf-8") as status_file:
+                for line in status_file:
+                    if line.startswith("CapEff:"):
+                        capabilities = int(line.split()[1], 16)
+                        return bool(capabilities >> WorkerScheduling.__CAP_SYS_NICE & 1)
+        except (OSError, ValueError):
+            pass
+
+        return False
+
+    @staticmethod
+    def __is_nice_permitted(nice: int) -> bool:
+        """
+        Whether this process may set the nice value. Raising it is always permitted.
+        """
+        if nice >= os.getpriority(os.PRIO_PROCESS, 0):
+            return True
+
+        # Limit is 20 - the lowest permitted nice value
+        limit, _ = resource.getrlimit(resource.RLIMIT_NICE)
+        if limit == resource.RLIM_INFINITY or 20 - limit <= nice:
+            return True
+
+        return WorkerScheduling.__has_cap_sys_nice()
+
+    @staticmethod
+    def __is_realtime_permitted(realtime_priority: int) -> bool:
+        """
+        Whether this process may set the SCHED_FIFO priority.
+        """
+        limit, _ = resource.getrlimit(resource.RLIMIT_RTPRIO)
+        if limit == resource.RLIM_INFINITY or realtime_priority <= limit:
+            return True
+
+        return WorkerScheduling.__has_cap_sys_nice()
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        cpu_affinity: "set[int] | None",
+        nice: "int | None",
+        realtime_priority: "int | None",
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is WorkerScheduling.__create_key, "Use create() method"
+
+        self.__cpu_affinity = cpu_affinity
+        self.__nice = nice
+        self.__realtime_priority = realtime_priority
+
+    def apply(self) -> "list[str]":
+        """
+        Applies the settings to the calling thread.
+        Settings which fail are skipped.
+
+        Returns a message for each skipped setting.
+        """
+        failures = []
+
+        if self.__cpu_affinity is not None:
+            try:
+                os.sched_setaffinity(0, self.__cpu_affinity)
+            except OSError as e:
+                failures.append(f"CPU affinity {sorted(self.__cpu_affinity)}: {e}")
+
+        if self.__nice is not None:
+            try:
+                # Process 0 is the calling thread on Linux
+                os.setpriority(os.PRIO_PROCESS, 0, self.__nice)
+            except OSError as e:
+                failures.append(f"Nice value {self.__nice}: {e}")
+
+        if self.__realtime_priority is not None:
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.__realtime_priority))
+            except OSError as e:
+                failures.append(f"SCHED_FIFO priority {self.__realtime_priority}: {e}")
+
+        return failures
+
+    def __str__(self) -> str:
+        """
+        To string.
+        """
+        affinity = "any" if self.__cpu_affinity is None else sorted(self.__cpu_affinity)
+        return (
+            f"CPU affinity: {affinity}, nice: {self.__nice}, "
+            f"real-time priority: {self.__realtime_priority}"
+        )
+
+
+def run_with_scheduling(
+    scheduling: WorkerScheduling, target: "(...) -> object", *args: object  # type: ignore
+) -> None:
+    """
+    Worker entry point which applies the scheduling and then runs the worker.
+    Permissions were checked by WorkerScheduling.create(), which logged any settings left out,
+    so a setting which still fails (e.g. a CPU taken offline since) is skipped.
+
+    scheduling: Settings for this worker.
+    target: Worker function.
+    args: Worker function arguments.
+    """
+    scheduling.apply()
+
+    target(*args)
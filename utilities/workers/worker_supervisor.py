@@ -0,0 +1,236 @@
+"""
+For keeping workers running.
+"""
+
+import threading
+import time
+
+from modules.common.modules.logger import logger
+from utilities.workers import worker_manager
+
+
+class WorkerState:  # pylint: disable=too-many-instance-attributes
+    """
+    Supervisor bookkeeping for a single worker.
+    """
+
+    def __init__(self) -> None:
+        self.last_progress = 0
+        self.last_progress_time = time.monotonic()
+        # Last check which found the worker alive
+        self.last_alive_time = time.monotonic()
+        # Consecutive failures, for backoff
+        self.failure_count = 0
+        # When the failure was detected and when to restart, None if healthy
+        self.failure_time: "float | None" = None
+        # When the worker last worked before the failure, None if healthy
+        self.failure_onset: "float | None" = None
+        self.restart_time: "float | None" = None
+        self.running_since = time.monotonic()
+
+
+class WorkerSupervisor:  # pylint: disable=too-many-instance-attributes
+    """
+    Thread in main which restarts dead or hung workers with exponential backoff.
+
+    A worker is dead if its process has exited, and hung if its manager has a hang timeout
+    and the worker has not reported a loop iteration (`controller.check_pause()`) within it.
+    Stop the supervisor before requesting workers to exit, otherwise exiting workers are restarted.
+    """
+
+    __create_key = object()
+
+    @classmethod
+    def create(
+        cls,
+        worker_managers: "list[worker_manager.WorkerManager]",
+        local_logger: logger.Logger,
+        check_period: float = 0.5,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        stable_period: float = 60.0,
+    ) -> "tuple[bool, WorkerSupervisor | None]":
+        """
+        Creates the supervisor, which is not started.
+
+        worker_managers: Managers of started workers.
+        local_logger: Existing logger from process.
+        check_period: Seconds between health checks.
+        initial_backoff: Seconds before the first restart of a failed worker.
+        max_backoff: Maximum seconds before a restart, the delay doubles on repeated failures.
+        stable_period: Seconds a worker must run to reset its backoff.
+
+        Returns whether the supervisor was created and the supervisor.
+        """
+        if check_period <= 0.0 or initial_backoff <= 0.0 or max_backoff < initial_backoff:
+            local_logger.error(
+                "Check period and backoff must be greater than zero, max backoff at least initial",
+                True,
+            )
+            return False, None
+
+        return True, WorkerSupervisor(
+            cls.__create_key,
+            worker_managers,
+            local_logger,
+            check_period,
+            initial_backoff,
+            max_backoff,
+            stable_period,
+        )
+
+    def __init__(
+        self,
+        class_private_create_key: object,
+        worker_managers: "list[worker_manager.WorkerManager]",
+        local_logger: logger.Logger,
+        check_period: float,
+        initial_backoff: float,
+        max_backoff: float,
+        stable_period: float,
+    ) -> None:
+        """
+        Private constructor, use create() method.
+        """
+        assert class_private_create_key is WorkerSupervisor.__create_key, "Use create() method"
+
+        self.__worker_managers = worker_managers
+        self.__local_logger = local_logger
+        self.__check_period = check_period
+        self.__initial_backoff = initial_backoff
+        self.__max_backoff = max_backoff
+        self.__stable_period = stable_period
+
+        self.__worker_states = [
+            [WorkerState() for _ in manager.get_worker_status()] for manager in worker_managers
+        ]
+
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="worker_supervisor", daemon=True)
+
+        # Statistics, read by main
+        self.__statistics_lock = threading.Lock()
+        self.__restart_count = 0
+        self.__total_recovery_time = 0.0
+
+    def start(self) -> None:
+        """
+        Starts supervising.
+        """
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops supervising, waiting for any restart in progress to finish.
+        """
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def get_statistics(self) -> "tuple[int, float]":
+        """
+        Returns the number of restarts and the mean time to recovery in seconds,
+        measured from the failure until the replacement worker is started. A hung worker failed at
+        its last progress, an exited one at the last check which found it alive, so the time
+        includes detecting the failure (up to the hang timeout or the check period).
+        """
+        with self.__statistics_lock:
+            if self.__restart_count == 0:
+                return 0, 0.0
+
+            return self.__restart_count, self.__total_recovery_time / self.__restart_count
+
+    def __backoff(self, failure_count: int) -> float:
+        """
+        Delay before restarting after the given number of consecutive failures.
+        """
+        return min(self.__initial_backoff * 2 ** (failure_count - 1), self.__max_backoff)
+
+    def __run(self) -> None:
+        """
+        Supervisor thread.
+        """
+        while not self.__stop_event.wait(self.__check_period):
+            for manager, states in zip(self.__worker_managers, self.__worker_states):
+                self.__check_manager(manager, states)
+
+    def __check_manager(
+        self, manager: worker_manager.WorkerManager, states: "list[WorkerState]"
+    ) -> None:
+        """
+        Checks every worker of a manager and restarts those whose backoff has elapsed.
+        """
+        hang_timeout = manager.get_hang_timeout()
+        worker_status = manager.get_worker_status()
+
+        # Worker count changes when the manager is scaled
+        del states[len(worker_status) :]
+        states.extend(WorkerState() for _ in range(len(worker_status) - len(states)))
+
+        for index, (is_alive, progress) in enumerate(worker_status):
+            state = states[index]
+            now = time.monotonic()
+
+            # Failed and waiting for backoff
+            if state.restart_time is not None:
+                if now >= state.restart_time:
+                    self.__restart(manager, index, state)
+                continue
+
+            if progress != state.last_progress:
+                state.last_progress = progress
+                state.last_progress_time = now
+
+            if not is_alive:
+                reason = "exited"
+                failure_onset = state.last_alive_time
+            elif hang_timeout is not None and now - state.last_progress_time > hang_timeout:
+                reason = f"made no progress for {now - state.last_progress_time:.1f}s"
+                failure_onset = state.last_progress_time
+            else:
+                state.last_alive_time = now
+                if now - state.running_since > self.__stable_period:
+                    state.failure_count = 0
+                continue
+
+            state.failure_count += 1
+            state.failure_time = now
+            state.failure_onset = failure_onset
+            backoff = self.__backoff(state.failure_count)
+            state.restart_time = now + backoff
+            self.__local_logger.warning(
+                f"{manager.get_target_name()} worker {index} {reason}, "
+                f"restarting in {backoff:.1f}s (failure {state.failure_count})",
+                True,
+            )
+
+    def __restart(
+        self, manager: worker_manager.WorkerManager, index: int, state: WorkerState
+    ) -> None:
+        """
+        Restarts a failed worker and records the recovery time.
+        """
+        if not manager.restart_worker(index):
+            # Try again after another backoff
+            state.failure_count += 1
+            state.restart_time = time.monotonic() + self.__backoff(state.failure_count)
+            return
+
+        now = time.monotonic()
+        assert state.failure_onset is not None
+        recovery_time = now - state.failure_onset
+        with self.__statistics_lock:
+            self.__restart_count += 1
+            self.__total_recovery_time += recovery_time
+
+        state.last_progress = 0
+        state.last_progress_time = now
+        state.last_alive_time = now
+        state.running_since = now
+        state.failure_time = None
+        state.failure_onset = None
+        state.restart_time = None
+        self.__local_logger.info(
+            f"Restarted {manager.get_target_name()} worker {index} {recovery_time:.2f}s after it failed",
+            True,
+        )